@@ -0,0 +1,209 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Run from anywhere: the scanners and reporting modules are in the parent directory
+ORG_SCAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ORG_SCAN_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from synthetic_findings import SyntheticFindings, write_synthetic_reports
+from reporting.csv_coalesce import merge_csv_all_tools
+from reporting.findings_store import FindingsStore
+from reporting.html_report_writer import output_to_html
+from reporting.merged_metrics import MergedReportMetrics
+from reporting.report_metrics import analyze_merged_results
+from reporting.secret_correlator import correlate_findings
+from reporting.secret_hasher import SecretHasher
+from reporting.secret_matcher import find_matches
+from utils.tracing import Tracer
+
+# Stages of the reporting pipeline, in the order they run. Each stage reads the files the
+# stages before it wrote.
+BENCHMARK_STAGES = ['merge_csv_all_tools', 'find_matches', 'correlate_findings', 'analyze_merged_results',
+                    'output_to_html', 'output_to_html_paginated']
+
+# A stage is a regression when it is slower than in the baseline by more than this share
+REGRESSION_TOLERANCE = 0.2
+
+# Peak resident memory of this process in MB. ru_maxrss is in KB on Linux and in bytes on macOS.
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _stage_paths(work_dir):
+    return {
+        'merged': os.path.join(work_dir, 'merged_scan_results_report.csv'),
+        'findings_db': os.path.join(work_dir, 'findings.db'),
+        'matches': os.path.join(work_dir, 'scanning_tool_matches_only.csv'),
+        'correlated': os.path.join(work_dir, 'correlated_findings.csv'),
+        'error_log': os.path.join(work_dir, 'error_log.log'),
+        'metrics': os.path.join(work_dir, 'metrics.pkl'),
+        'html': os.path.join(work_dir, 'report.html'),
+        'html_paginated': os.path.join(work_dir, 'report_paginated.html')
+    }
+
+# Runs one stage of the pipeline the way secretsynth.py runs it, with secrets hashed
+def run_stage(stage, reports, work_dir, workers):
+    paths = _stage_paths(work_dir)
+    if stage == 'merge_csv_all_tools':
+        hasher = SecretHasher(workers=workers)
+        findings_store = FindingsStore(paths['findings_db'])
+        merge_csv_all_tools(False, reports['trufflehog'], reports['gitleaks'], reports['ghas'], reports['noseyparker'],
+                            paths['merged'], None, hasher, findings_store, MergedReportMetrics())
+        findings_store.close()
+        hasher.shutdown()
+    elif stage == 'find_matches':
+        find_matches(paths['merged'], paths['matches'], 90, workers)
+    elif stage == 'correlate_findings':
+        correlate_findings(paths['merged'], paths['correlated'])
+    elif stage == 'analyze_merged_results':
+        # From the merged report file, the metrics counted during the merge are timed with merge_csv_all_tools
+        open(paths['error_log'], 'a').close()
+        matches = paths['matches'] if os.path.exists(paths['matches']) else paths['correlated']
+        pd.to_pickle(analyze_merged_results(paths['merged'], matches, paths['error_log']), paths['metrics'])
+    elif stage in ('output_to_html', 'output_to_html_paginated'):
+        metrics, repo_metrics, detector_metrics = pd.read_pickle(paths['metrics'])
+        paginated = stage == 'output_to_html_paginated'
+        output_to_html(metrics, repo_metrics, detector_metrics, Tracer().timing_table(),
+                       paths['merged'], reports['ghas'], paths['matches'], paths['error_log'],
+                       paths['html_paginated'] if paginated else paths['html'], paginated)
+
+# Runs a stage in this process and sends its seconds and peak memory to result_queue
+def _stage_process(stage, reports, work_dir, workers, result_queue):
+    try:
+        baseline_rss = peak_rss_mb()
+        start = time.perf_counter()
+        run_stage(stage, reports, work_dir, workers)
+        result_queue.put({'seconds': time.perf_counter() - start,
+                          'baseline_rss_mb': round(baseline_rss, 1),
+                          'peak_rss_mb': round(peak_rss_mb(), 1)})
+    except Exception as e:
+        result_queue.put({'error': f"{type(e).__name__}: {str(e)}"})
+
+# Summary
+# Times a stage in a new process, so its peak memory is not hidden by the stages before it
+# Output:
+#   dict with seconds, baseline_rss_mb (after imports) and peak_rss_mb, or error
+def time_stage(stage, reports, work_dir, workers):
+    context = multiprocessing.get_context('spawn')
+    result_queue = context.Queue()
+    process = context.Process(target=_stage_process, args=(stage, reports, work_dir, workers, result_queue))
+    process.start()
+    while True:
+        try:
+            result = result_queue.get(timeout=1)
+            break
+        except queue.Empty:
+            # Killed, for example by the OOM killer, before it could send a result
+            if not process.is_alive():
+                result = {'error': f"stage process exited with code {process.exitcode}"}
+                break
+    process.join()
+    return result
+
+def git_commit():
+    result = subprocess.run(["git", "-C", ORG_SCAN_DIR, "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+# Returns the runs of results that are slower than the same findings count and stage of
+# baseline_results by more than tolerance
+def find_regressions(results, baseline_results, tolerance=REGRESSION_TOLERANCE):
+    baseline = {(run['findings'], run['stage']): run for run in baseline_results['runs'] if 'seconds' in run}
+    regressions = []
+    for run in results['runs']:
+        previous = baseline.get((run['findings'], run['stage']))
+        if previous is None or 'seconds' not in run or previous['seconds'] <= 0:
+            continue
+        ratio = run['seconds'] / previous['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append({'findings': run['findings'], 'stage': run['stage'], 'seconds': run['seconds'],
+                                'baseline_seconds': previous['seconds'], 'ratio': round(ratio, 2)})
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the secretsynth reporting pipeline on synthetic findings")
+    parser.add_argument("--findings", type=str, default="1000,10000,100000", help="Comma-delimited list of findings counts to benchmark (1000 to 5000000)")
+    parser.add_argument("--repos", type=int, default=100, help="Number of repositories of the synthetic findings")
+    parser.add_argument("--owners", type=int, default=1, help="Number of owners of the synthetic findings")
+    parser.add_argument("--detector-skew", type=float, default=1.2, help="Zipf exponent of the detector mix, 0 for an even mix")
+    parser.add_argument("--repo-skew", type=float, default=1.0, help="Zipf exponent of the findings per repository, 0 for an even spread")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic findings")
+    parser.add_argument("--stages", type=str, default=",".join(BENCHMARK_STAGES), help=f"Comma-delimited list of stages to time. Defaults to all: {','.join(BENCHMARK_STAGES)}")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Threads used to hash and match secrets")
+    parser.add_argument("--work-dir", type=str, default="./_benchmarks/work", help="Directory of the synthetic reports and the reports of every stage, removed at the end")
+    parser.add_argument("--output", type=str, help="JSON file of the results. Defaults to ./_benchmarks/reporting_<timestamp>.json")
+    parser.add_argument("--baseline", type=str, help="JSON results of an earlier run to compare with. Stages more than 20%% slower are reported as regressions.")
+    parser.add_argument("--keep-files", action="store_true", help="Keep the work directory")
+    args = parser.parse_args()
+
+    findings_counts = [int(count) for count in args.findings.split(",")]
+    stages = args.stages.split(",")
+    for stage in stages:
+        if stage not in BENCHMARK_STAGES:
+            parser.error(f"Unknown stage {stage}, use one of {','.join(BENCHMARK_STAGES)}")
+    if min(findings_counts) < 1 or args.repos < 1 or args.workers < 1:
+        parser.error("--findings, --repos and --workers must be 1 or greater")
+
+    timestamp = datetime.now().strftime('%Y%m%d%H%M')
+    output = args.output or f"./_benchmarks/reporting_{timestamp}.json"
+    results = {
+        'created_at': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'parameters': {'repos': args.repos, 'owners': args.owners, 'detector_skew': args.detector_skew,
+                       'repo_skew': args.repo_skew, 'seed': args.seed, 'workers': args.workers},
+        'runs': []
+    }
+
+    for findings in findings_counts:
+        work_dir = os.path.join(args.work_dir, f"findings_{findings}")
+        if os.path.exists(work_dir):
+            shutil.rmtree(work_dir)
+        print(f"Generating {findings} synthetic findings in {work_dir}...")
+        start = time.perf_counter()
+        synthetic = SyntheticFindings(findings, args.repos, args.owners, detector_skew=args.detector_skew, repo_skew=args.repo_skew, seed=args.seed)
+        reports = write_synthetic_reports(synthetic, work_dir)
+        print(f"Generated in {time.perf_counter() - start:.2f} seconds")
+
+        for stage in BENCHMARK_STAGES:
+            if stage not in stages:
+                continue
+            result = time_stage(stage, reports, work_dir, args.workers)
+            run = {'findings': findings, 'stage': stage}
+            run.update(result)
+            if 'seconds' in result:
+                run['findings_per_second'] = round(findings / result['seconds'], 1) if result['seconds'] > 0 else None
+                print(f"{findings:>9} findings  {stage:<26} {result['seconds']:9.2f} s  {run['findings_per_second'] or 0:12.0f} findings/s  peak {result['peak_rss_mb']:8.1f} MB")
+            else:
+                print(f"{findings:>9} findings  {stage:<26} failed: {result['error']}")
+            results['runs'].append(run)
+
+        if not args.keep_files:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            results['regressions'] = find_regressions(results, json.load(f))
+        for regression in results['regressions']:
+            print(f"REGRESSION: {regression['stage']} with {regression['findings']} findings took {regression['seconds']:.2f} s, {regression['ratio']}x the baseline {regression['baseline_seconds']:.2f} s")
+        if not results['regressions']:
+            print(f"No regressions against {args.baseline}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Benchmark results written to {output}")
@@ -0,0 +1,479 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import resource
+import shlex
+import shutil
+import stat
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_scanners import STUB_RULES, STUB_SCANNERS
+
+ORG_SCAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRETSYNTH = os.path.join(ORG_SCAN_DIR, "secretsynth.py")
+STUB_SCANNERS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_scanners.py")
+
+# Bump when the repositories create_local_repos writes change, so older ones are not reused
+LOCAL_REPOS_VERSION = 1
+
+# Line of filler text in the files of the local repositories
+FILLER_LINE = 'value_{:05d} = "lorem ipsum dolor sit amet consectetur adipiscing"\n'
+
+# Share of the planted secrets that a later commit removes again, so only a scan of the
+# git history finds them
+REMOVED_LEAK_RATIO = 0.3
+
+# Most items GitHub returns in one page
+GITHUB_MAX_PER_PAGE = 100
+
+# Summary
+# Plans the history of one local repository: the files, and which commit plants and which
+# commit removes every secret.
+# Output:
+#   list of leak dicts (rule, secret, file, line, added_in, removed_in or None)
+def plan_leaks(rng, commits, files, file_lines, leaks):
+    planned = []
+    for number in range(leaks):
+        rule = rng.randrange(len(STUB_RULES))
+        added_in = rng.randrange(commits)
+        removed_in = None
+        if added_in < commits - 1 and rng.random() < REMOVED_LEAK_RATIO:
+            removed_in = rng.randrange(added_in + 1, commits)
+        planned.append({'rule': rule, 'secret': STUB_RULES[rule]['make'](rng), 'file': f"src/module{number % files}.py",
+                        'line': rng.randrange(2, file_lines + 1), 'added_in': added_in, 'removed_in': removed_in})
+    return planned
+
+def _file_content(file_number, commit, file_lines, leaks):
+    lines = [f"# module {file_number}, revision {commit}\n"] + [FILLER_LINE.format(line) for line in range(1, file_lines)]
+    for leak in leaks:
+        if leak['added_in'] <= commit and (leak['removed_in'] is None or commit < leak['removed_in']):
+            lines[leak['line'] - 1] = f'api_key_{leak["line"]:05d} = "{leak["secret"]}"\n'
+    return ''.join(lines).encode()
+
+def _data(content):
+    return b"data %d\n%s\n" % (len(content), content)
+
+# Summary
+# Creates one bare git repository with git fast-import, with commits commits on main. The
+# first commit adds files files of file_kb KB, every later commit changes files_per_commit
+# of them, and the leaks are added and removed in the commits plan_leaks picked.
+# Output:
+#   size of the repository in KB
+def create_local_repo(repo_path, rng, commits, files, file_kb, files_per_commit, leaks):
+    file_lines = max(2, file_kb * 1024 // len(FILLER_LINE.format(0)))
+    leaks_by_file = {}
+    for leak in leaks:
+        leaks_by_file.setdefault(leak['file'], []).append(leak)
+
+    subprocess.run(["git", "init", "-q", "--bare", repo_path], check=True)
+    subprocess.run(["git", "-C", repo_path, "symbolic-ref", "HEAD", "refs/heads/main"], check=True)
+    process = subprocess.Popen(["git", "-C", repo_path, "fast-import", "--quiet"], stdin=subprocess.PIPE)
+    for commit in range(commits):
+        if commit == 0:
+            changed = set(range(files))
+        else:
+            changed = set(rng.sample(range(files), min(files, files_per_commit)))
+            changed.update(int(re.search(r'\d+', leak['file']).group()) for leak in leaks
+                           if leak['added_in'] == commit or leak['removed_in'] == commit)
+        timestamp = 1704067200 + commit * 3600
+        stream = [b"commit refs/heads/main\n",
+                  b"author Load Harness <dev@example.com> %d +0000\n" % timestamp,
+                  b"committer Load Harness <dev@example.com> %d +0000\n" % timestamp,
+                  _data(b"commit %d" % commit)]
+        for file_number in sorted(changed):
+            path = f"src/module{file_number}.py"
+            stream.append(b"M 100644 inline %s\n" % path.encode())
+            stream.append(_data(_file_content(file_number, commit, file_lines, leaks_by_file.get(path, []))))
+        process.stdin.write(b"".join(stream))
+    process.stdin.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"git fast-import failed for {repo_path}")
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(repo_path) for name in names) // 1024
+
+# Summary
+# Creates the local repositories of a load test under remotes_dir, one directory per owner,
+# and writes their manifest (manifest.json) the GitHub API stand-in serves them from.
+# Repositories created earlier with the same parameters are reused.
+# Input:
+#   owners: list of owner names, repos are spread over them in turn
+#   repos: number of repositories of all owners
+#   commits: commits of the history of every repository
+#   files, file_kb, files_per_commit: files of every repository, their size, files changed by every commit
+#   leaks_per_repo: secrets planted in the history of every repository
+#   ghas_disabled_ratio: share of the repositories with secret scanning disabled
+# Output:
+#   manifest dict: parameters, and owner to the list of its repositories
+def create_local_repos(remotes_dir, owners, repos, commits, files=20, file_kb=4, files_per_commit=2,
+                       leaks_per_repo=5, ghas_disabled_ratio=0.1, seed=0):
+    parameters = {'version': LOCAL_REPOS_VERSION, 'owners': owners, 'repos': repos, 'commits': commits, 'files': files,
+                  'file_kb': file_kb, 'files_per_commit': files_per_commit, 'leaks_per_repo': leaks_per_repo,
+                  'ghas_disabled_ratio': ghas_disabled_ratio, 'seed': seed}
+    manifest_path = os.path.join(remotes_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest['parameters'] == parameters:
+            print(f"Reusing the {repos} local repositories in {remotes_dir}")
+            return manifest
+        shutil.rmtree(remotes_dir)
+
+    print(f"Creating {repos} local repositories with {commits} commits each in {remotes_dir}...")
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    file_lines = max(2, file_kb * 1024 // len(FILLER_LINE.format(0)))
+    manifest = {'parameters': parameters, 'owners': {owner: [] for owner in owners}}
+    for repo_number in range(repos):
+        owner = owners[repo_number % len(owners)]
+        name = f"repo{repo_number:05d}"
+        repo_path = os.path.abspath(os.path.join(remotes_dir, owner, f"{name}.git"))
+        leaks = plan_leaks(rng, commits, files, file_lines, leaks_per_repo)
+        size_kb = create_local_repo(repo_path, rng, commits, files, file_kb, files_per_commit, leaks)
+        manifest['owners'][owner].append({'name': name, 'path': repo_path, 'size_kb': size_kb,
+                                          'secret_scanning': 'disabled' if rng.random() < ghas_disabled_ratio else 'enabled',
+                                          'leaks': leaks})
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    print(f"Created in {time.perf_counter() - start:.2f} seconds")
+    return manifest
+
+# Summary
+# Local stand-in for the GitHub REST endpoints secretsynth.py calls: the repository lists of
+# users and orgs, repository metadata, and the repository and org secret scanning alerts,
+# served from a create_local_repos manifest. The alerts of a repository are the secrets
+# planted in it. Latency, page size and rate limits can be injected to see how the scan
+# behaves under them. Runs an HTTP server on a thread of this process.
+# Input:
+#   manifest: see create_local_repos
+#   latency_ms, latency_jitter_ms: delay of every response, plus a random delay up to the jitter
+#   page_size: most alerts per page, the repository lists follow per_page up to 100 like GitHub
+#   rate_limit, rate_limit_window: requests allowed per window of seconds. Once used up, requests
+#     get 403 responses with X-RateLimit-Remaining 0 until the window resets. 0 for no limit.
+#   secondary_rate_limit_every: every Nth request gets a 429 response with Retry-After (0 for never)
+#   retry_after: seconds of the Retry-After header of those 429 responses
+class FakeGitHubApi:
+    def __init__(self, manifest, latency_ms=0, latency_jitter_ms=0, page_size=GITHUB_MAX_PER_PAGE, rate_limit=5000,
+                 rate_limit_window=3600, secondary_rate_limit_every=0, retry_after=1, seed=0):
+        self.owners = manifest['owners']
+        self.repos = {(owner, repo['name']): repo for owner, repos in self.owners.items() for repo in repos}
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.page_size = max(1, min(page_size, GITHUB_MAX_PER_PAGE))
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.secondary_rate_limit_every = secondary_rate_limit_every
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_reset = int(time.time()) + rate_limit_window
+        self._remaining = rate_limit
+        self._counted_requests = 0
+        self.stats = {'requests': 0, 'not_modified': 0, 'rate_limited': 0, 'secondary_rate_limited': 0, 'by_endpoint': {}}
+        self.server = None
+        self.url = None
+
+    def start(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                api._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def _repo_json(self, owner, repo):
+        return {'id': int(hashlib.sha1(f"{owner}/{repo['name']}".encode()).hexdigest()[:8], 16), 'name': repo['name'],
+                'full_name': f"{owner}/{repo['name']}", 'private': False, 'owner': {'login': owner},
+                'html_url': f"{self.url}/{owner}/{repo['name']}", 'clone_url': f"file://{repo['path']}",
+                'default_branch': 'main', 'size': repo['size_kb'], 'visibility': 'public',
+                'security_and_analysis': {'secret_scanning': {'status': repo['secret_scanning']}}}
+
+    def _alerts(self, owner, repo, with_repository=False):
+        alerts = []
+        for number, leak in enumerate(repo['leaks'], 1):
+            secret_type, display_name = STUB_RULES[leak['rule']]['ghas']
+            alert_url = f"{self.url}/repos/{owner}/{repo['name']}/secret-scanning/alerts/{number}"
+            alert = {'number': number, 'created_at': '2024-01-01T00:00:00Z', 'updated_at': '2024-01-01T00:00:00Z',
+                     'url': alert_url, 'html_url': f"{self.url}/{owner}/{repo['name']}/security/secret-scanning/{number}",
+                     'locations_url': f"{alert_url}/locations", 'state': 'open', 'secret_type': secret_type,
+                     'secret_type_display_name': display_name, 'secret': leak['secret'], 'validity': 'unknown',
+                     'resolution': None, 'resolved_by': None, 'resolved_at': None, 'resolution_comment': None,
+                     'push_protection_bypassed': False, 'push_protection_bypassed_by': None,
+                     'push_protection_bypassed_at': None}
+            if with_repository:
+                alert['repository'] = {'name': repo['name'], 'full_name': f"{owner}/{repo['name']}", 'owner': {'login': owner}}
+            alerts.append(alert)
+        return alerts
+
+    # Returns (status, body, next page or None) of a GET path
+    def _route(self, path, query):
+        parts = path.strip('/').split('/')
+        page = int(query.get('page', ['1'])[0])
+        if len(parts) == 3 and parts[0] in ('users', 'orgs') and parts[2] == 'repos':
+            if parts[1] not in self.owners:
+                return 404, {'message': 'Not Found'}, None
+            per_page = max(1, min(int(query.get('per_page', ['30'])[0]), GITHUB_MAX_PER_PAGE))
+            repos = self.owners[parts[1]]
+            items = [self._repo_json(parts[1], repo) for repo in repos[(page - 1) * per_page:page * per_page]]
+            return 200, items, page + 1 if page * per_page < len(repos) else None
+        if len(parts) == 3 and parts[0] == 'repos':
+            repo = self.repos.get((parts[1], parts[2]))
+            return (200, self._repo_json(parts[1], repo), None) if repo else (404, {'message': 'Not Found'}, None)
+        if len(parts) == 5 and parts[0] == 'repos' and parts[3:] == ['secret-scanning', 'alerts']:
+            repo = self.repos.get((parts[1], parts[2]))
+            if repo is None:
+                return 404, {'message': 'Not Found'}, None
+            if repo['secret_scanning'] == 'disabled':
+                return 404, {'message': 'Secret scanning is disabled on this repository.'}, None
+            alerts = self._alerts(parts[1], repo)
+        elif len(parts) == 4 and parts[0] == 'orgs' and parts[2:] == ['secret-scanning', 'alerts']:
+            if parts[1] not in self.owners:
+                return 404, {'message': 'Not Found'}, None
+            alerts = [alert for repo in self.owners[parts[1]] if repo['secret_scanning'] == 'enabled'
+                      for alert in self._alerts(parts[1], repo, with_repository=True)]
+        else:
+            return 404, {'message': 'Not Found'}, None
+        per_page = max(1, min(int(query.get('per_page', ['30'])[0]), self.page_size))
+        return 200, alerts[(page - 1) * per_page:page * per_page], page + 1 if page * per_page < len(alerts) else None
+
+    # Returns (status, rate limit headers) of a request, using up the rate limit
+    def _rate_limit(self):
+        with self._lock:
+            self.stats['requests'] += 1
+            self._counted_requests += 1
+            now = time.time()
+            if now >= self._window_reset:
+                self._window_reset = int(now) + self.rate_limit_window
+                self._remaining = self.rate_limit
+            headers = {}
+            if self.rate_limit:
+                headers = {'X-RateLimit-Limit': str(self.rate_limit), 'X-RateLimit-Reset': str(self._window_reset)}
+                if self._remaining <= 0:
+                    self.stats['rate_limited'] += 1
+                    headers['X-RateLimit-Remaining'] = '0'
+                    return 403, headers
+                self._remaining -= 1
+                headers['X-RateLimit-Remaining'] = str(self._remaining)
+            if self.secondary_rate_limit_every and self._counted_requests % self.secondary_rate_limit_every == 0:
+                self.stats['secondary_rate_limited'] += 1
+                headers['Retry-After'] = str(self.retry_after)
+                return 429, headers
+            return 200, headers
+
+    def _handle(self, handler):
+        delay = self.latency_ms + (self._rng.uniform(0, self.latency_jitter_ms) if self.latency_jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+
+        url = urlparse(handler.path)
+        query = parse_qs(url.query)
+        status, headers = self._rate_limit()
+        next_page = None
+        if status == 403:
+            body = {'message': 'API rate limit exceeded for user.', 'documentation_url': 'https://docs.github.com/rest/overview/resources-in-the-rest-api#rate-limiting'}
+        elif status == 429:
+            body = {'message': 'You have exceeded a secondary rate limit. Please wait a few minutes before you try again.'}
+        else:
+            status, body, next_page = self._route(url.path, query)
+            endpoint = re.sub(r'/(users|orgs|repos)/[^/]+(/[^/]+)?', r'/\1/{owner}\2', url.path)
+            endpoint = re.sub(r'/repos/\{owner\}/[^/]+', '/repos/{owner}/{repo}', endpoint)
+            with self._lock:
+                self.stats['by_endpoint'][endpoint] = self.stats['by_endpoint'].get(endpoint, 0) + 1
+
+        content = json.dumps(body).encode()
+        etag = '"' + hashlib.sha1(content).hexdigest() + '"'
+        if status == 200 and handler.headers.get('If-None-Match') == etag:
+            with self._lock:
+                self.stats['not_modified'] += 1
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            for name, value in headers.items():
+                handler.send_header(name, value)
+            handler.end_headers()
+            return
+
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json; charset=utf-8')
+        handler.send_header('Content-Length', str(len(content)))
+        handler.send_header('ETag', etag)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        if next_page:
+            query['page'] = [str(next_page)]
+            handler.send_header('Link', f'<{self.url}{url.path}?{urlencode(query, doseq=True)}>; rel="next"')
+        handler.end_headers()
+        handler.wfile.write(content)
+
+# Summary
+# Writes executables named gitleaks, trufflehog and noseyparker to bin_dir that run the stub
+# scanners (stub_scanners.py) at the given speed. Put bin_dir first on PATH to use them.
+def write_stub_scanners(bin_dir, startup_seconds=0.0, mb_per_second=0.0):
+    os.makedirs(bin_dir, exist_ok=True)
+    for tool in STUB_SCANNERS:
+        path = os.path.join(bin_dir, tool)
+        with open(path, 'w') as f:
+            f.write("#!/bin/sh\n"
+                    f"STUB_SCANNER_STARTUP_SECONDS={startup_seconds} STUB_SCANNER_MB_PER_SECOND={mb_per_second} "
+                    f"exec {shlex.quote(sys.executable)} {shlex.quote(STUB_SCANNERS_SCRIPT)} {tool} \"$@\"\n")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return bin_dir
+
+# Environment of secretsynth.py that uses the stub scanners and the GitHub API stand-in
+def harness_env(bin_dir, api_url):
+    env = dict(os.environ)
+    env['PATH'] = os.path.abspath(bin_dir) + os.pathsep + env.get('PATH', '')
+    env['GITHUB_API_URL'] = api_url
+    env['GITHUB_ACCESS_TOKEN'] = 'load-harness-token'
+    return env
+
+# Largest resident memory of the child processes waited for, in MB
+def peak_child_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+# Summary
+# Runs secretsynth.py in run_dir against the stub scanners and the GitHub API stand-in,
+# with its output in run_dir/secretsynth.log.
+# Input:
+#   secretsynth_args: list of secretsynth.py arguments, e.g. ['--org-type', 'orgs', '--owners', 'org0']
+#   profile_file (optional): write a cProfile profile of secretsynth.py to this file
+# Output:
+#   dict with the exit code, seconds and log file of the run
+def run_secretsynth(run_dir, bin_dir, api_url, secretsynth_args, profile_file=None):
+    os.makedirs(run_dir, exist_ok=True)
+    shutil.copy(os.path.join(ORG_SCAN_DIR, ".gitleaks.toml"), run_dir)
+    command = [sys.executable]
+    if profile_file:
+        command += ["-m", "cProfile", "-o", os.path.abspath(profile_file)]
+    command += [SECRETSYNTH] + secretsynth_args
+    log_file = os.path.join(run_dir, "secretsynth.log")
+    print(f"Running {' '.join(command)} in {run_dir}...")
+    start = time.perf_counter()
+    with open(log_file, 'w') as log:
+        result = subprocess.run(command, cwd=run_dir, env=harness_env(bin_dir, api_url), stdout=log, stderr=subprocess.STDOUT)
+    return {'exit_code': result.returncode, 'seconds': round(time.perf_counter() - start, 3), 'log_file': log_file}
+
+# Rows of the reports of the latest secretsynth.py run in run_dir, by report file name
+def report_rows(run_dir):
+    reports_root = os.path.join(run_dir, "_reports")
+    if not os.path.isdir(reports_root):
+        return {}
+    latest = os.path.join(reports_root, sorted(os.listdir(reports_root))[-1])
+    rows = {}
+    for name in sorted(os.listdir(latest)):
+        if name.endswith('.csv'):
+            with open(os.path.join(latest, name), 'rb') as f:
+                rows[name] = max(0, sum(1 for _ in f) - 1)
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run secretsynth.py end to end against local repositories, a local GitHub API stand-in and stub scanners, with no network")
+    parser.add_argument("--repos", type=int, default=20, help="Number of local repositories")
+    parser.add_argument("--owners", type=int, default=1, help="Number of owners the repositories are spread over")
+    parser.add_argument("--org-type", choices=["users", "orgs"], default="orgs", help="Owner type secretsynth.py is run with")
+    parser.add_argument("--commits", type=int, default=50, help="Commits of the history of every repository")
+    parser.add_argument("--files", type=int, default=20, help="Files of every repository")
+    parser.add_argument("--file-kb", type=int, default=4, help="Size of every file in KB")
+    parser.add_argument("--files-per-commit", type=int, default=2, help="Files changed by every commit after the first")
+    parser.add_argument("--leaks-per-repo", type=int, default=5, help="Secrets planted in the history of every repository")
+    parser.add_argument("--ghas-disabled-ratio", type=float, default=0.1, help="Share of the repositories with secret scanning disabled")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the repositories and the injected latency")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay of every GitHub API response in milliseconds")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0, help="Random extra delay of every GitHub API response, up to this many milliseconds")
+    parser.add_argument("--page-size", type=int, default=GITHUB_MAX_PER_PAGE, help="Most secret scanning alerts per page. Repository lists follow per_page up to 100 like GitHub.")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="GitHub API requests allowed per rate limit window, 0 for no limit")
+    parser.add_argument("--rate-limit-window", type=int, default=3600, help="Seconds of the rate limit window")
+    parser.add_argument("--secondary-rate-limit-every", type=int, default=0, help="Answer every Nth GitHub API request with a 429 secondary rate limit, 0 for never")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds of the 429 responses")
+    parser.add_argument("--scanner-startup-seconds", type=float, default=0.05, help="Seconds every stub scanner run takes at least")
+    parser.add_argument("--scanner-mb-per-second", type=float, default=0, help="MB per second the stub scanners scan, 0 for as fast as they can")
+    parser.add_argument("--secretsynth-args", type=str, default="", help="More arguments of secretsynth.py, e.g. \"--jobs 4 --paginated-report\"")
+    parser.add_argument("--work-dir", type=str, default="./_benchmarks/load", help="Directory of the local repositories (reused when the parameters match), the stub scanners and the secretsynth.py run")
+    parser.add_argument("--profile", action="store_true", help="Write a cProfile profile of secretsynth.py next to the results")
+    parser.add_argument("--serve-only", action="store_true", help="Only serve the GitHub API stand-in and print the environment to run secretsynth.py with, until interrupted")
+    parser.add_argument("--output", type=str, help="JSON file of the results. Defaults to ./_benchmarks/load_<timestamp>.json")
+    args = parser.parse_args()
+
+    if args.repos < 1 or args.owners < 1 or args.commits < 1 or args.files < 1 or args.file_kb < 1:
+        parser.error("--repos, --owners, --commits, --files and --file-kb must be 1 or greater")
+
+    owners = [f"load-{args.org_type[:-1]}{number}" for number in range(args.owners)]
+    manifest = create_local_repos(os.path.join(args.work_dir, "remotes"), owners, args.repos, args.commits, args.files,
+                                  args.file_kb, args.files_per_commit, args.leaks_per_repo, args.ghas_disabled_ratio, args.seed)
+    bin_dir = write_stub_scanners(os.path.join(args.work_dir, "bin"), args.scanner_startup_seconds, args.scanner_mb_per_second)
+    api = FakeGitHubApi(manifest, args.latency_ms, args.latency_jitter_ms, args.page_size, args.rate_limit,
+                        args.rate_limit_window, args.secondary_rate_limit_every, args.retry_after, args.seed)
+    api_url = api.start()
+
+    if args.serve_only:
+        print(f"GitHub API stand-in serving {args.repos} repositories of {','.join(owners)} at {api_url}")
+        print(f"export PATH={os.path.abspath(bin_dir)}:$PATH GITHUB_API_URL={api_url} GITHUB_ACCESS_TOKEN=load-harness-token")
+        print(f"python {SECRETSYNTH} --org-type {args.org_type} --owners {','.join(owners)}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            api.stop()
+        sys.exit(0)
+
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    output = args.output or f"./_benchmarks/load_{timestamp}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    profile_file = os.path.splitext(output)[0] + ".prof" if args.profile else None
+    run_dir = os.path.join(args.work_dir, "run")
+    if os.path.exists(run_dir):
+        shutil.rmtree(run_dir)
+
+    secretsynth_args = ["--org-type", args.org_type, "--owners", ",".join(owners)] + shlex.split(args.secretsynth_args)
+    try:
+        run = run_secretsynth(run_dir, bin_dir, api_url, secretsynth_args, profile_file)
+    finally:
+        api.stop()
+
+    results = {
+        'created_at': datetime.now().isoformat(),
+        'parameters': dict(vars(args), secretsynth_args=secretsynth_args),
+        'repos_kb': sum(repo['size_kb'] for repos in manifest['owners'].values() for repo in repos),
+        'planted_secrets': sum(len(repo['leaks']) for repos in manifest['owners'].values() for repo in repos),
+        'exit_code': run['exit_code'],
+        'seconds': run['seconds'],
+        'peak_rss_mb': round(peak_child_rss_mb(), 1),
+        'github_api': api.stats,
+        'report_rows': report_rows(run_dir),
+        'log_file': run['log_file'],
+        'profile_file': profile_file
+    }
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"secretsynth.py exited with {run['exit_code']} after {run['seconds']:.2f} seconds, peak {results['peak_rss_mb']:.1f} MB (log: {run['log_file']})")
+    print(f"GitHub API stand-in: {api.stats['requests']} requests, {api.stats['rate_limited']} rate limited, "
+          f"{api.stats['secondary_rate_limited']} secondary rate limited, {api.stats['not_modified']} not modified")
+    for name, rows in results['report_rows'].items():
+        print(f"{rows:>9} rows  {name}")
+    if profile_file:
+        print(f"Profile written to {profile_file}, see python -m pstats {profile_file}")
+    print(f"Load test results written to {output}")
+    sys.exit(0 if run['exit_code'] == 0 else 1)
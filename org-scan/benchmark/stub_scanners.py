@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Summary
+# Stand-ins for the gitleaks, trufflehog and noseyparker command lines secretsynth.py runs,
+# for load tests without the real scanners (see load_harness.py). They really read the
+# repository, the git history or the files on disk, and report the secrets of STUB_RULES
+# in the output formats of the real tools, so the findings of the three tools match like
+# real findings do. The speed of a scan is set with environment variables:
+#   STUB_SCANNER_STARTUP_SECONDS: seconds every scan takes at least (default 0)
+#   STUB_SCANNER_MB_PER_SECOND: MB scanned per second, 0 for as fast as possible (default 0)
+#   STUB_<TOOL>_STARTUP_SECONDS, STUB_<TOOL>_MB_PER_SECOND: the same for one tool (e.g. STUB_GITLEAKS_MB_PER_SECOND)
+# Usage:
+#   python stub_scanners.py gitleaks detect -f json -r <report> --source <repo> [--log-opts <opts>]
+#   python stub_scanners.py trufflehog filesystem <path> --json | trufflehog git file://<repo> --json [--since-commit <commit>]
+#   python stub_scanners.py noseyparker scan <repo> --datastore <dir> | noseyparker report --datastore <dir> --format=jsonl
+
+# Secrets the stub scanners find, with the rule or detector name of every tool and the GHAS
+# secret type. make(rng) returns a new secret for the load harness to plant in repositories.
+STUB_RULES = [
+    {'regex': re.compile(r'AKIA[0-9A-Z]{16}'),
+     'gitleaks': 'aws-access-token', 'trufflehog': 'AWS', 'noseyparker': 'AWS API Key',
+     'ghas': ('aws_access_key_id', 'Amazon AWS Access Key ID'),
+     'make': lambda rng: 'AKIA' + ''.join(rng.choice('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(16))},
+    {'regex': re.compile(r'ghp_[0-9A-Za-z]{36}'),
+     'gitleaks': 'github-pat', 'trufflehog': 'Github', 'noseyparker': 'GitHub Personal Access Token',
+     'ghas': ('github_personal_access_token', 'GitHub Personal Access Token'),
+     'make': lambda rng: 'ghp_' + ''.join(rng.choice('0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(36))},
+    {'regex': re.compile(r'xoxb-[0-9]{12}-[0-9]{12}-[0-9A-Za-z]{24}'),
+     'gitleaks': 'slack-bot-token', 'trufflehog': 'Slack', 'noseyparker': 'Slack Bot Token',
+     'ghas': ('slack_api_token', 'Slack API Token'),
+     'make': lambda rng: 'xoxb-{}-{}-{}'.format(rng.randrange(10 ** 11, 10 ** 12), rng.randrange(10 ** 11, 10 ** 12),
+                                                ''.join(rng.choice('0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(24)))},
+    {'regex': re.compile(r'sk_live_[0-9A-Za-z]{24}'),
+     'gitleaks': 'stripe-access-token', 'trufflehog': 'Stripe', 'noseyparker': 'Stripe API Key',
+     'ghas': ('stripe_api_key', 'Stripe API Key'),
+     'make': lambda rng: 'sk_live_' + ''.join(rng.choice('0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(24))}
+]
+
+# Yields (rule, secret, start column) of the secrets in a line of text
+def find_secrets(line):
+    for rule in STUB_RULES:
+        for match in rule['regex'].finditer(line):
+            yield rule, match.group(0), match.start() + 1
+
+def _setting(tool, name, default):
+    return float(os.environ.get(f"STUB_{tool.upper()}_{name}", os.environ.get(f"STUB_SCANNER_{name}", default)))
+
+# Summary
+# Keeps a scan running at the configured speed: after bytes_scanned bytes, sleeps until the
+# scan has taken the startup seconds plus the time the configured MB per second allow.
+class ScanPace:
+    def __init__(self, tool):
+        self.start = time.perf_counter()
+        self.startup_seconds = _setting(tool, 'STARTUP_SECONDS', 0)
+        self.mb_per_second = _setting(tool, 'MB_PER_SECOND', 0)
+        self.bytes_scanned = 0
+
+    def scanned(self, size):
+        self.bytes_scanned += size
+        if self.mb_per_second > 0:
+            self._sleep_until(self.bytes_scanned / (self.mb_per_second * 1024 * 1024))
+
+    def finish(self):
+        self._sleep_until(self.startup_seconds + (self.bytes_scanned / (self.mb_per_second * 1024 * 1024) if self.mb_per_second > 0 else 0))
+
+    def _sleep_until(self, seconds):
+        remaining = seconds - (time.perf_counter() - self.start)
+        if remaining > 0:
+            time.sleep(remaining)
+
+# Summary
+# Yields the lines added by the commits of a repository, from git log -p, newest commit first.
+# Input:
+#   repo_path: path to the repository
+#   revisions: git log revision arguments, e.g. ['--all'] or ['<commit>..HEAD']
+# Output:
+#   (commit, author, email, date, message, file, line number, line) for every added line
+def iter_added_lines(repo_path, revisions, pace):
+    command = ["git", "-C", repo_path, "log", "-p", "-U0", "--no-color", "--no-renames",
+               "--format=%x00%H%x09%an%x09%ae%x09%aI%x09%s"] + revisions
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, errors='replace')
+    commit = author = email = date = message = file = None
+    line_number = 0
+    for line in process.stdout:
+        pace.scanned(len(line))
+        if line.startswith('\0'):
+            commit, author, email, date, message = (line[1:].rstrip('\n').split('\t', 4) + [''] * 5)[:5]
+            file = None
+        elif line.startswith('diff --git '):
+            file = None
+        elif line.startswith('+++ ') and file is None:
+            file = line[6:].rstrip('\n') if line.startswith('+++ b/') else None
+        elif line.startswith('@@ '):
+            # @@ -a,b +c,d @@: the added lines of the hunk start at line c
+            line_number = int(line.split(' ')[2][1:].split(',')[0])
+        elif line.startswith('+') and file is not None:
+            yield commit, author, email, date, message, file, line_number, line[1:].rstrip('\n')
+            line_number += 1
+    process.wait()
+
+# Yields (file path, line number, line) of the files of a directory, without the .git directory
+def iter_file_lines(path, pace):
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d != '.git')
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            try:
+                with open(file_path, 'r', errors='replace') as f:
+                    for line_number, line in enumerate(f, 1):
+                        pace.scanned(len(line))
+                        yield file_path, line_number, line
+            except OSError:
+                continue
+
+def _arg(args, name, default=None):
+    return args[args.index(name) + 1] if name in args else default
+
+# gitleaks detect -f json|csv -r <report> --source <repo> [--log-opts <opts>]
+# Exits with 1 when there are findings, like gitleaks
+def gitleaks(args):
+    pace = ScanPace('gitleaks')
+    report_path = _arg(args, '-r')
+    report_format = _arg(args, '-f', 'json')
+    log_opts = _arg(args, '--log-opts')
+    revisions = log_opts.split() if log_opts else ['--all']
+
+    findings = []
+    for commit, author, email, date, message, file, line_number, line in iter_added_lines(_arg(args, '--source'), revisions, pace):
+        for rule, secret, column in find_secrets(line):
+            findings.append({'Description': rule['gitleaks'], 'StartLine': line_number, 'EndLine': line_number,
+                             'StartColumn': column, 'EndColumn': column + len(secret) - 1, 'Match': line.strip(),
+                             'Secret': secret, 'File': file, 'SymlinkFile': '', 'Commit': commit, 'Entropy': 4.5,
+                             'Author': author, 'Email': email, 'Date': date, 'Message': message, 'Tags': [],
+                             'RuleID': rule['gitleaks'], 'Fingerprint': f"{commit}:{file}:{rule['gitleaks']}:{line_number}"})
+    pace.finish()
+
+    with open(report_path, 'w', newline='') as f:
+        if report_format == 'csv':
+            import csv
+            columns = ['RuleID', 'Commit', 'File', 'SymlinkFile', 'Secret', 'Match', 'StartLine', 'EndLine', 'StartColumn',
+                       'EndColumn', 'Author', 'Message', 'Date', 'Email', 'Fingerprint', 'Tags']
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+            for finding in findings:
+                writer.writerow(dict(finding, Tags=''))
+        else:
+            json.dump(findings, f, indent=1)
+    sys.stderr.write(f"leaks found: {len(findings)}\n")
+    return 1 if findings else 0
+
+def _trufflehog_finding(rule, secret, source_type, source_name, data):
+    return {'SourceMetadata': {'Data': data}, 'SourceID': 1, 'SourceType': source_type, 'SourceName': source_name,
+            'DetectorType': STUB_RULES.index(rule) + 1, 'DetectorName': rule['trufflehog'], 'DecoderName': 'PLAIN',
+            'Verified': False, 'Raw': secret, 'RawV2': '', 'Redacted': secret[:8], 'ExtraData': None,
+            'StructuredData': None}
+
+# trufflehog filesystem <path> --json | trufflehog git file://<repo> --json [--since-commit <commit>]
+# Findings are printed as they are found, one JSON object per line
+def trufflehog(args):
+    pace = ScanPace('trufflehog')
+    if args[0] == 'git':
+        repo_path = args[1][len('file://'):]
+        since_commit = _arg(args, '--since-commit')
+        revisions = [f"{since_commit}..HEAD"] if since_commit else ['HEAD']
+        for commit, author, email, date, message, file, line_number, line in iter_added_lines(repo_path, revisions, pace):
+            for rule, secret, _ in find_secrets(line):
+                data = {'Git': {'commit': commit, 'file': file, 'email': f"{author} <{email}>", 'repository': args[1],
+                                'timestamp': date, 'line': line_number}}
+                print(json.dumps(_trufflehog_finding(rule, secret, 16, 'trufflehog - git', data)), flush=True)
+    else:
+        for file_path, line_number, line in iter_file_lines(args[1], pace):
+            for rule, secret, _ in find_secrets(line):
+                data = {'Filesystem': {'file': file_path, 'line': line_number}}
+                print(json.dumps(_trufflehog_finding(rule, secret, 15, 'trufflehog - filesystem', data)), flush=True)
+    pace.finish()
+    return 0
+
+# noseyparker scan <repo> --datastore <dir> keeps the findings of the git history in the
+# datastore, noseyparker report --datastore <dir> --format=jsonl prints them grouped by
+# rule and secret, one finding per line
+def noseyparker(args):
+    datastore = _arg(args, '--datastore')
+    findings_path = os.path.join(datastore, 'findings.json')
+    if args[0] == 'scan':
+        pace = ScanPace('noseyparker')
+        repo_path = args[1]
+        findings = {}
+        for commit, author, email, date, message, file, line_number, line in iter_added_lines(repo_path, ['--all'], pace):
+            for rule, secret, column in find_secrets(line):
+                blob_id = hashlib.sha1(f"{commit}:{file}".encode()).hexdigest()
+                match = {'provenance': [{'kind': 'git_repo', 'repo_path': f"{repo_path}/.git",
+                                         'commit_provenance': {'commit_kind': 'first_seen', 'blob_path': file,
+                                                               'commit_metadata': {'commit_id': commit, 'author_name': author,
+                                                                                   'author_email': email, 'message': message}}}],
+                         'blob_metadata': {'id': blob_id, 'num_bytes': len(line), 'mime_essence': 'text/plain', 'charset': None},
+                         'blob_id': blob_id,
+                         'location': {'offset_span': {'start': column - 1, 'end': column - 1 + len(secret)},
+                                      'source_span': {'start': {'line': line_number, 'column': column},
+                                                      'end': {'line': line_number, 'column': column + len(secret) - 1}}},
+                         'capture_group_index': 1, 'match_content': secret,
+                         'snippet': {'before': line[:column - 1], 'matching': secret, 'after': line[column - 1 + len(secret):]},
+                         'rule_name': rule['noseyparker']}
+                findings.setdefault((rule['noseyparker'], secret), []).append(match)
+        pace.finish()
+        os.makedirs(datastore, exist_ok=True)
+        with open(findings_path, 'w') as f:
+            json.dump([{'type': 'finding', 'rule_name': rule_name, 'num_matches': len(matches), 'matches': matches}
+                       for (rule_name, _), matches in findings.items()], f)
+        print(f"Scanned {pace.bytes_scanned} bytes, {sum(len(matches) for matches in findings.values())} matches")
+        return 0
+
+    if not os.path.exists(findings_path):
+        sys.stderr.write(f"error: no datastore at {datastore}\n")
+        return 2
+    with open(findings_path, 'r') as f:
+        for finding in json.load(f):
+            print(json.dumps(finding))
+    return 0
+
+STUB_SCANNERS = {'gitleaks': gitleaks, 'trufflehog': trufflehog, 'noseyparker': noseyparker}
+
+if __name__ == "__main__":
+    tool = sys.argv[1]
+    args = sys.argv[2:]
+    # gitleaks takes a 'detect' subcommand before its flags
+    if tool == 'gitleaks' and args and args[0] == 'detect':
+        args = args[1:]
+    sys.exit(STUB_SCANNERS[tool](args))
@@ -0,0 +1,178 @@
+import argparse
+import csv
+import hashlib
+import os
+import random
+import sys
+
+# Run from anywhere: the scanners and reporting modules are in the parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scanners.gitleaks_scan import GITLEAKS_REPORT_COLUMNS
+from scanners.noseyparker_scan import NOSEYPARKER_CSV_COLUMNS
+from scanners.ghas_secret_alerts_fetch import GHAS_ALERTS_FIELDNAMES
+
+# Columns of the trufflehog report secretsynth writes (see trufflehog_column_headers in secretsynth.py)
+TRUFFLEHOG_COLUMNS = ['target', 'repo_name', 'file', 'line', 'source_id', 'source_type', 'source_name', 'detector_type',
+                      'detector_name', 'decoder_name', 'verified', 'raw', 'raw_v2', 'redacted']
+
+# Detectors of every tool, most common first. Findings are spread over them with Zipf
+# weights (see detector_skew), so a few detectors have most of the findings, like in real scans.
+SYNTHETIC_DETECTORS = {
+    'gitleaks': ['generic-api-key', 'aws-access-token', 'private-key', 'github-pat', 'slack-bot-token', 'jwt',
+                 'stripe-access-token', 'gcp-api-key', 'sendgrid-api-token', 'twilio-api-key', 'npm-access-token',
+                 'openai-api-key'],
+    'trufflehog': ['PrivateKey', 'AWS', 'URI', 'Github', 'Slack', 'JDBC', 'Stripe', 'Postgres', 'SendGrid',
+                   'Twilio', 'NpmToken', 'OpenAI'],
+    'noseyparker': ['Generic Secret', 'Generic Password', 'AWS API Key', 'PEM-Encoded Private Key',
+                    'GitHub Personal Access Token', 'JSON Web Token (base64url-encoded)', 'Slack Bot Token',
+                    'Google API Key', 'SendGrid API Key', 'Stripe API Key'],
+    'ghas': ['GitHub Personal Access Token', 'Amazon AWS Access Key ID', 'Slack API Token', 'Google API Key',
+             'Stripe API Key', 'OpenAI API Key']
+}
+
+# Share of the findings reported by each tool
+SYNTHETIC_TOOL_SHARES = {'gitleaks': 0.35, 'trufflehog': 0.3, 'noseyparker': 0.3, 'ghas': 0.05}
+
+def _zipf_cum_weights(count, skew):
+    cum_weights = []
+    total = 0.0
+    for rank in range(count):
+        total += 1.0 / (rank + 1) ** skew
+        cum_weights.append(total)
+    return cum_weights
+
+# Summary
+# Deterministic synthetic findings of several tools over several repositories. Each
+# finding is one of a fixed set of leaks (a secret at a file and line of a repository)
+# reported by one tool, so the tools report the same leaks as real scanners do and the
+# matches and correlation stages have work to do. The same seed and parameters always
+# give the same findings.
+# Input:
+#   findings: number of findings of all tools
+#   repos: number of repositories, findings are spread over them with Zipf weights (repo_skew)
+#   owners: number of owners the repositories belong to
+#   distinct_ratio: number of distinct leaks as a share of the findings, the rest are found by more than one tool
+#   detector_skew, repo_skew: Zipf exponents, 0 spreads the findings evenly
+#   seed: seed of the random generator
+class SyntheticFindings:
+    def __init__(self, findings, repos=100, owners=1, distinct_ratio=0.6, detector_skew=1.2, repo_skew=1.0, seed=0):
+        self.findings = findings
+        self.repos = max(1, repos)
+        self.owners = max(1, owners)
+        self.seed = seed
+        self.detector_skew = detector_skew
+        self.leaks_per_repo = max(1, int(findings * distinct_ratio) // self.repos)
+        self.repo_cum_weights = _zipf_cum_weights(self.repos, repo_skew)
+
+    def owner_name(self, repo_number):
+        return f"owner{repo_number % self.owners}"
+
+    def repo_name(self, repo_number):
+        return f"repo{repo_number:05d}"
+
+    # Returns (file, line, secret) of one leak of a repository
+    def leak(self, repo_number, leak_number):
+        digest = hashlib.blake2b(f"{self.seed}:{repo_number}:{leak_number}".encode(), digest_size=20).hexdigest()
+        file = f"src/module{leak_number % 97}/file{leak_number}.py"
+        line = (leak_number * 7919) % 500 + 1
+        return file, line, f"AKIA{digest.upper()[:16]}{digest[16:]}"
+
+    # Yields (tool, owner, repo_name, detector, file, line, secret) for every finding, in tool order
+    def iter_findings(self):
+        rng = random.Random(self.seed)
+        repo_numbers = range(self.repos)
+        for tool, share in SYNTHETIC_TOOL_SHARES.items():
+            detectors = SYNTHETIC_DETECTORS[tool]
+            detector_cum_weights = _zipf_cum_weights(len(detectors), self.detector_skew)
+            tool_findings = int(round(self.findings * share))
+            for _ in range(tool_findings):
+                repo_number = rng.choices(repo_numbers, cum_weights=self.repo_cum_weights)[0]
+                leak_number = rng.randrange(self.leaks_per_repo)
+                detector = rng.choices(detectors, cum_weights=detector_cum_weights)[0]
+                file, line, secret = self.leak(repo_number, leak_number)
+                yield tool, self.owner_name(repo_number), self.repo_name(repo_number), detector, file, line, secret
+
+# Report rows of one finding of every tool, in the formats the scanner modules write them
+def trufflehog_row(owner, repo_name, detector, file, line, secret, number):
+    return {'target': owner, 'repo_name': repo_name, 'file': f"./_checkout/{repo_name}/{file}", 'line': line,
+            'source_id': 0, 'source_type': 15, 'source_name': 'trufflehog - filesystem', 'detector_type': 2,
+            'detector_name': detector, 'decoder_name': 'PLAIN', 'verified': number % 10 == 0,
+            'raw': secret, 'raw_v2': '', 'redacted': ''}
+
+def gitleaks_row(owner, repo_name, detector, file, line, secret, number):
+    commit = hashlib.sha1(f"{repo_name}:{number}".encode()).hexdigest()
+    return {'Owner': owner, 'Repository': repo_name, 'RuleID': detector, 'Commit': commit, 'File': file,
+            'SymlinkFile': '', 'Secret': secret, 'Match': f"key = \"{secret}\"", 'StartLine': line, 'EndLine': line,
+            'StartColumn': 7, 'EndColumn': 7 + len(secret), 'Author': 'dev', 'Message': f"commit {number}",
+            'Date': '2024-01-01T00:00:00Z', 'Email': 'dev@example.com',
+            'Fingerprint': f"{commit}:{file}:{detector}:{line}", 'Tags': ''}
+
+def noseyparker_row(owner, repo_name, detector, file, line, secret, number):
+    blob_id = hashlib.sha1(f"{repo_name}:{file}".encode()).hexdigest()
+    return {'provenance': '', 'blob_id': blob_id, 'capture_group_index': 1, 'match_content': secret,
+            'rule_name': detector, 'blob_metadata.id': blob_id, 'blob_metadata.num_bytes': 2048,
+            'blob_metadata.mime_essence': 'text/x-python', 'blob_metadata.charset': '',
+            'location.offset_span.start': line * 40, 'location.offset_span.end': line * 40 + len(secret),
+            'location.source_span.start.line': line, 'location.source_span.start.column': 7,
+            'location.source_span.end.line': line, 'location.source_span.end.column': 7 + len(secret),
+            'snippet.before': 'key = "', 'snippet.matching': secret, 'snippet.after': '"\n',
+            'owner': owner, 'blob_path': file, 'repo_path': repo_name}
+
+def ghas_row(owner, repo_name, detector, file, line, secret, number):
+    return {'repo': repo_name, 'rule': detector.lower().replace(' ', '_'), 'owner': owner, 'number': number,
+            'created_at': '2024-01-01T00:00:00Z', 'updated_at': '2024-01-01T00:00:00Z',
+            'url': f"https://api.github.com/repos/{owner}/{repo_name}/secret-scanning/alerts/{number}",
+            'html_url': f"https://github.com/{owner}/{repo_name}/security/secret-scanning/{number}",
+            'locations_url': f"https://api.github.com/repos/{owner}/{repo_name}/secret-scanning/alerts/{number}/locations",
+            'state': 'open', 'secret_type': detector.lower().replace(' ', '_'), 'secret_type_display_name': detector,
+            'secret': secret, 'validity': 'unknown', 'resolution': None, 'resolved_by': None, 'resolved_at': None,
+            'resolution_comment': None, 'push_protection_bypassed': False, 'push_protection_bypassed_by': None,
+            'push_protection_bypassed_at': None}
+
+SYNTHETIC_REPORTS = {
+    'trufflehog': ('trufflehog_results.csv', TRUFFLEHOG_COLUMNS, trufflehog_row),
+    'gitleaks': ('gitleaks_report_merged.csv', GITLEAKS_REPORT_COLUMNS, gitleaks_row),
+    'noseyparker': ('noseyparker_results.csv', NOSEYPARKER_CSV_COLUMNS, noseyparker_row),
+    'ghas': ('ghas_secret_alerts.csv', GHAS_ALERTS_FIELDNAMES, ghas_row)
+}
+
+# Summary
+# Writes the trufflehog, gitleaks, noseyparker and GHAS alerts reports of synthetic_findings
+# to output_dir, in the formats merge_csv_all_tools reads. Rows are written as they are
+# generated, so any number of findings can be written in bounded memory.
+# Output:
+#   dict of tool to the path of its report
+def write_synthetic_reports(synthetic_findings, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    files = {}
+    writers = {}
+    paths = {}
+    try:
+        for tool, (file_name, columns, _) in SYNTHETIC_REPORTS.items():
+            paths[tool] = os.path.join(output_dir, file_name)
+            files[tool] = open(paths[tool], 'w', newline='')
+            writers[tool] = csv.DictWriter(files[tool], fieldnames=columns, lineterminator='\n')
+            writers[tool].writeheader()
+        for number, (tool, owner, repo_name, detector, file, line, secret) in enumerate(synthetic_findings.iter_findings()):
+            writers[tool].writerow(SYNTHETIC_REPORTS[tool][2](owner, repo_name, detector, file, line, secret, number))
+    finally:
+        for f in files.values():
+            f.close()
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic trufflehog, gitleaks, noseyparker and GHAS alerts reports")
+    parser.add_argument("--findings", type=int, default=10000, help="Number of findings of all tools")
+    parser.add_argument("--repos", type=int, default=100, help="Number of repositories")
+    parser.add_argument("--owners", type=int, default=1, help="Number of owners")
+    parser.add_argument("--distinct-ratio", type=float, default=0.6, help="Distinct leaks as a share of the findings")
+    parser.add_argument("--detector-skew", type=float, default=1.2, help="Zipf exponent of the detector mix, 0 for an even mix")
+    parser.add_argument("--repo-skew", type=float, default=1.0, help="Zipf exponent of the findings per repository, 0 for an even spread")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator")
+    parser.add_argument("--output-dir", type=str, default="./_benchmarks/synthetic", help="Directory of the reports")
+    args = parser.parse_args()
+
+    synthetic = SyntheticFindings(args.findings, args.repos, args.owners, args.distinct_ratio, args.detector_skew, args.repo_skew, args.seed)
+    for tool, path in write_synthetic_reports(synthetic, args.output_dir).items():
+        print(f"{tool}: {path}")
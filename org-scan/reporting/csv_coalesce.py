@@ -1,17 +1,25 @@
 import csv
-import hashlib
 import sys
 import os
+from reporting.secret_hasher import *
+from reporting.merged_metrics import MetricsRowWriter
 
 csv.field_size_limit(sys.maxsize)
 
-# Result is deterministic, but not reversible
-def hash_secret(secret):
-    # Create a hash object
-    hash_object = hashlib.sha256()
-    # Update the hash object with the bytes of the 'secret' value
-    hash_object.update(secret.encode())
-    return hash_object.hexdigest()
+# Columns of the merged report that hold secrets, per source. Unless secrets are kept
+# in the reports, they are replaced with their hash.
+TRUFFLEHOG_HASHED_FIELDS = ['secret', 'match', 'th_raw', 'th_raw_v2', 'th_redacted']
+GITLEAKS_HASHED_FIELDS = ['secret', 'match', 'gl_secret', 'gl_match']
+GHAS_HASHED_FIELDS = ['secret']
+NOSEYPARKER_HASHED_FIELDS = ['match', 'secret', 'np_snippet_before', 'np_snippet_after']
+
+# Columns of the merged report
+MERGED_REPORT_HEADERS = ['source', 'owner', 'repo_name', 'file', 'line', 'secret', 'match', 'detector',
+                         'th_source_id', 'th_source_type', 'th_source_name', 'th_detector_type', 'th_detector_name', 'th_decoder_name', 'th_verified', 'th_raw', 'th_raw_v2', 'th_redacted', 
+                         'gl_owner', 'gl_commit', 'gl_symlink_file', 'gl_secret', 'gl_match', 'gl_start_line', 'gl_end_line', 'gl_start_column', 'gl_end_column', 'gl_author', 'gl_message', 'gl_date', 'gl_email', 'gl_fingerprint', 'gl_tags',
+                         'ghas_number', 'ghas_rule', 'ghas_state', 'ghas_created_at', 'ghas_html_url',
+                         'np_provenance', 'np_blob_id', 'np_capture_group_index', 'np_match_content', 'np_blob_metadata_id', 'np_blob_metadata_num_bytes', 'np_blob_metadata_mime_essence', 'np_blob_metadata_charset', 'np_location_offset_span_start', 'np_location_offset_span_end', 'np_location_source_span_start_line', 'np_location_source_span_start_column', 'np_location_source_span_end_line', 'np_location_source_span_end_column', 'np_snippet_before', 'np_snippet_after'
+                        ]
 
 # Summary
 # Merge all CSV files from all tools into a single CSV file. If the input files do not exist, they will be skipped.
@@ -22,6 +30,9 @@ def hash_secret(secret):
 #   ghas_alerts_file: path to the GHAS secrets CSV file
 #   np_report_filename: path to the NoseyParker report CSV file
 #   output_file: path to the output CSV file
+#   hasher (optional): reporting.secret_hasher.SecretHasher used to hash the secrets, a plain SHA-256 one by default
+#   findings_store (optional): reporting.findings_store.FindingsStore the rows are inserted into. The CSV file is then exported from it.
+#   metrics (optional): reporting.merged_metrics.MergedReportMetrics the rows are counted in as they are written
 # Output:
 #   None
 def merge_csv_all_tools(keep_secrets,
@@ -29,20 +40,25 @@ def merge_csv_all_tools(keep_secrets,
                         gitleaks_file, 
                         ghas_alerts_file,
                         np_report_filename, 
-                        output_file, logger=None):
-    unified_headers = ['source', 'owner', 'repo_name', 'file', 'line', 'secret', 'match', 'detector',
-                        'th_source_id', 'th_source_type', 'th_source_name', 'th_detector_type', 'th_detector_name', 'th_decoder_name', 'th_verified', 'th_raw', 'th_raw_v2', 'th_redacted', 
-                        'gl_owner', 'gl_commit', 'gl_symlink_file', 'gl_secret', 'gl_match', 'gl_start_line', 'gl_end_line', 'gl_start_column', 'gl_end_column', 'gl_author', 'gl_message', 'gl_date', 'gl_email', 'gl_fingerprint', 'gl_tags',
-                        'ghas_number', 'ghas_rule', 'ghas_state', 'ghas_created_at', 'ghas_html_url',
-                        'np_provenance', 'np_blob_id', 'np_capture_group_index', 'np_match_content', 'np_blob_metadata_id', 'np_blob_metadata_num_bytes', 'np_blob_metadata_mime_essence', 'np_blob_metadata_charset', 'np_location_offset_span_start', 'np_location_offset_span_end', 'np_location_source_span_start_line', 'np_location_source_span_start_column', 'np_location_source_span_end_line', 'np_location_source_span_end_column', 'np_snippet_before', 'np_snippet_after'
-                       ]
+                        output_file, logger=None, hasher=None, findings_store=None, metrics=None):
+    hasher = hasher or SecretHasher()
+
+    # Returns a writer that hashes the secret fields of the rows of one source
+    def source_writer(hashed_fields):
+        return HashingRowWriter(writer, hasher, [] if keep_secrets else hashed_fields)
 
     with open(output_file, 'w', newline='') as f_out:
-        writer = csv.DictWriter(f_out, fieldnames=unified_headers, extrasaction='ignore')
+        writer = csv.DictWriter(f_out, fieldnames=MERGED_REPORT_HEADERS, extrasaction='ignore')
         writer.writeheader()
+        if findings_store:
+            # Insert the rows into the findings database, and export the CSV from it once all sources are merged
+            writer = findings_store
+        if metrics:
+            writer = MetricsRowWriter(writer, metrics)
 
         if os.path.exists(trufflehog_file):
             # Trufflehog CSV
+            rows_writer = source_writer(TRUFFLEHOG_HASHED_FIELDS)
             with open(trufflehog_file, 'r') as f_in:
                 reader = csv.DictReader(f_in)
                 for row in reader:
@@ -51,12 +67,8 @@ def merge_csv_all_tools(keep_secrets,
                     row['repo_name'] = row.pop('repo_name', '')
                     row['file'] = row.pop('file', '')
                     row['line'] = row.pop('line', '')
-                    if not keep_secrets:
-                        row['secret'] = hash_secret(row.pop('raw', ''))
-                        row['match'] = hash_secret(row.pop('raw_v2', ''))
-                    else:
-                        row['secret'] = row.pop('raw', '')
-                        row['match'] = row.pop('raw_v2', '') 
+                    row['secret'] = row.pop('raw', '')
+                    row['match'] = row.pop('raw_v2', '')
                     row['detector'] = row.pop('detector_name', '')
                     # only in trufflehog
                     row['th_source_id'] = row.pop('source_id', '')
@@ -66,18 +78,15 @@ def merge_csv_all_tools(keep_secrets,
                     row['th_detector_name'] = row.pop('detector_name', '')
                     row['th_decoder_name'] = row.pop('decoder_name', '')
                     row['th_verified'] = row.pop('verified', '')
-                    if not keep_secrets:
-                        row['th_raw'] = hash_secret(row.pop('raw', ''))
-                        row['th_raw_v2'] = hash_secret(row.pop('raw_v2', ''))
-                        row['th_redacted'] = hash_secret(row.pop('redacted', ''))
-                    else:
-                        row['th_raw'] = row.pop('raw', '')
-                        row['th_raw_v2'] = row.pop('raw_v2', '')    
-                        row['th_redacted'] = row.pop('redacted', '')
-                    writer.writerow(row)
+                    row['th_raw'] = row.pop('raw', '')
+                    row['th_raw_v2'] = row.pop('raw_v2', '')
+                    row['th_redacted'] = row.pop('redacted', '')
+                    rows_writer.writerow(row)
+                rows_writer.flush()
 
         if os.path.exists(gitleaks_file):
             # Gitleaks CSV
+            rows_writer = source_writer(GITLEAKS_HASHED_FIELDS)
             with open(gitleaks_file, 'r') as f_in:
                 reader = csv.DictReader(f_in)
                 for row in reader:
@@ -86,24 +95,16 @@ def merge_csv_all_tools(keep_secrets,
                     row['repo_name'] = row.pop('Repository', '')
                     row['file'] = row.pop('File', '')
                     row['line'] = row.pop('StartLine', '')
-                    if not keep_secrets:
-                        row['secret'] = hash_secret(row.pop('Secret', ''))
-                        row['match'] = hash_secret(row.pop('Match', ''))
-                    else:
-                        row['secret'] = row.pop('Secret', '')
-                        row['match'] = row.pop('Match', '')
+                    row['secret'] = row.pop('Secret', '')
+                    row['match'] = row.pop('Match', '')
                     row['detector'] = row.pop('RuleID', '')
                     # only in gitleaks
                     row['gl_endline'] = row.pop('EndLine', '')
                     # write these to row Commit,File,SymlinkFile,Secret,Match,StartLine,EndLine,StartColumn,EndColumn,Author,Message,Date,Email,Fingerprint,Tags
                     row['gl_commit'] = row.pop('Commit', '')
                     row['gl_symlink_file'] = row.pop('SymlinkFile', '')
-                    if not keep_secrets:
-                        row['gl_secret'] = hash_secret(row.pop('Secret', ''))
-                        row['gl_match'] = hash_secret(row.pop('Match', ''))
-                    else:
-                        row['gl_secret'] = row.pop('Secret', '')
-                        row['gl_match'] = row.pop('Match', '')
+                    row['gl_secret'] = row.pop('Secret', '')
+                    row['gl_match'] = row.pop('Match', '')
                     row['gl_start_line'] = row.pop('StartLine', '')
                     row['gl_end_line'] = row.pop('EndLine', '')
                     row['gl_start_column'] = row.pop('StartColumn', '')
@@ -115,10 +116,12 @@ def merge_csv_all_tools(keep_secrets,
                     row['gl_fingerprint'] = row.pop('Fingerprint', '')
                     row['gl_tags'] = row.pop('Tags', '')
 
-                    writer.writerow(row)
+                    rows_writer.writerow(row)
+                rows_writer.flush()
 
         if os.path.exists(ghas_alerts_file):
             # GHAS Secrets CSV
+            rows_writer = source_writer(GHAS_HASHED_FIELDS)
             with open(ghas_alerts_file, 'r') as f_in:
                 reader = csv.DictReader(f_in)
                 for row in reader:
@@ -128,10 +131,7 @@ def merge_csv_all_tools(keep_secrets,
                     row['repo_name'] = row.pop('repo', '')
                     row['file'] = row.pop('html_url', '')
                     row['line'] = row.pop('unavailable - see alert in Github', '')
-                    if not keep_secrets:
-                        row['secret'] = hash_secret(row.pop('secret', ''))
-                    else:
-                        row['secret'] = row.pop('secret', '')
+                    row['secret'] = row.pop('secret', '')
                     row['match'] = row.pop('unavailable - see alert in Github', '')
                     row['detector'] = row.pop('secret_type_display_name', '')
                     
@@ -157,10 +157,12 @@ def merge_csv_all_tools(keep_secrets,
 
                     
 
-                    writer.writerow(row)
+                    rows_writer.writerow(row)
+                rows_writer.flush()
         
         if os.path.exists(np_report_filename):
             # NoseyParker CSV
+            rows_writer = source_writer(NOSEYPARKER_HASHED_FIELDS)
             try:
                 with open(np_report_filename, 'rb') as f_in:
                     data = f_in.read().replace(b'\x00', b'') # guard against null values
@@ -172,12 +174,8 @@ def merge_csv_all_tools(keep_secrets,
                         row['repo_name'] = row.pop('repo_path', '')
                         row['file'] = row.pop('blob_path', '')
                         row['line'] = row.pop('location.source_span.start.line', '')
-                        if not keep_secrets:
-                            row['match'] = hash_secret(row.pop('snippet.matching', ''))
-                            row['secret'] = hash_secret(row.pop('match_content', ''))
-                        else:
-                            row['match'] = row.pop('snippet.matching', '')
-                            row['secret'] = row.pop('match_content', '')
+                        row['match'] = row.pop('snippet.matching', '')
+                        row['secret'] = row.pop('match_content', '')
                         row['detector'] = row.pop('rule_name', '')
                         # only in noseyparker
                         row['np_provenance'] = row.pop('provenance', '')
@@ -195,19 +193,16 @@ def merge_csv_all_tools(keep_secrets,
                         row['np_location_source_span_start_column'] = row.pop('location.source_span.start.column', '')
                         row['np_location_source_span_end_line'] = row.pop('location.source_span.end.line', '')
                         row['np_location_source_span_end_column'] = row.pop('location.source_span.end.column', '')
-                        if not keep_secrets:
-                            row['np_snippet_before'] = hash_secret(row.pop('snippet.before', ''))
-                            row['np_snippet_after'] = hash_secret(row.pop('snippet.after', ''))
-                        else: # keep secrets
-                            row['np_snippet_before'] = row.pop('snippet.before', '')
-                            row['np_snippet_after'] = row.pop('snippet.after', '')
+                        row['np_snippet_before'] = row.pop('snippet.before', '')
+                        row['np_snippet_after'] = row.pop('snippet.after', '')
 
-                        writer.writerow(row)
+                        rows_writer.writerow(row)
+                    rows_writer.flush()
             except TypeError as e:
                 if logger:
                     print(f"Failed to process file {np_report_filename}: {str(e)}")
                     logger.error(f"Failed to process file {np_report_filename}: {str(e)}")
 
-
-
-
+        if findings_store:
+            findings_store.finish()
+            findings_store.export_csv(f_out)
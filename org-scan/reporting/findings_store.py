@@ -0,0 +1,61 @@
+import csv
+import os
+import sqlite3
+from reporting.csv_coalesce import MERGED_REPORT_HEADERS
+
+# Indexes created once the merge is done, for lookups by secret hash, repository,
+# detector and source
+FINDINGS_INDEXES = {
+    "idx_findings_secret": ["secret"],
+    "idx_findings_owner_repo": ["owner", "repo_name"],
+    "idx_findings_detector": ["detector"],
+    "idx_findings_source": ["source"]
+}
+
+# Summary
+# SQLite database of the findings of a run, with one row per row of the merged report
+# and the same columns. merge_csv_all_tools inserts the rows into it and exports the
+# merged CSV from it. The database is kept next to the reports for ad-hoc lookups with
+# the indexes below, for example all findings of a secret hash or of one repository:
+#   sqlite3 findings_<timestamp>.db "SELECT source, file, line FROM findings WHERE secret = '<hash>'"
+# Input:
+#   db_path: path to the database file, replaced if it exists
+class FindingsStore:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        self.connection = sqlite3.connect(db_path)
+        # The database is rebuilt from the scanner reports when a run fails, so skip the journal
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        columns = ", ".join(f'"{name}" TEXT' for name in MERGED_REPORT_HEADERS)
+        self.connection.execute(f"CREATE TABLE findings (id INTEGER PRIMARY KEY, {columns})")
+        self._insert_sql = f"INSERT INTO findings ({', '.join(MERGED_REPORT_HEADERS)}) VALUES ({', '.join('?' * len(MERGED_REPORT_HEADERS))})"
+
+    # Same as csv.DictWriter.writerows, fields that are not merged report columns are ignored.
+    # Empty values are stored as NULL, like pandas reads them from the CSV.
+    def writerows(self, rows):
+        self.connection.executemany(self._insert_sql, ([row.get(name) if row.get(name) != '' else None for name in MERGED_REPORT_HEADERS] for row in rows))
+
+    def writerow(self, row):
+        self.writerows([row])
+
+    # Creates the indexes and commits the rows. Indexes are built after the inserts, which is faster than updating them row by row.
+    def finish(self):
+        for index_name, columns in FINDINGS_INDEXES.items():
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON findings ({', '.join(columns)})")
+        self.connection.commit()
+
+    # Writes all findings in insertion order to an open CSV file, without a header row
+    def export_csv(self, f_out):
+        writer = csv.writer(f_out)
+        cursor = self.connection.execute(f"SELECT {', '.join(MERGED_REPORT_HEADERS)} FROM findings ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            writer.writerows(rows)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,440 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+
+csv.field_size_limit(sys.maxsize)
+
+# GHAS secret scanning secret types, from
+# https://docs.github.com/en/enterprise-cloud@latest/code-security/secret-scanning/secret-scanning-patterns#supported-secrets
+GHAS_SECRET_TYPES = [
+    "adafruit_io_key", "adobe_client_secret", "adobe_device_token", "adobe_pac_token", "adobe_refresh_token",
+    "adobe_service_token", "adobe_short_lived_access_token", "aiven_auth_token", "aiven_service_password",
+    "alibaba_cloud_access_key_id", "alibaba_cloud_access_key_secret", "amazon_oauth_client_id",
+    "amazon_oauth_client_secret", "aws_access_key_id", "aws_secret_access_key", "aws_session_token",
+    "aws_temporary_access_key_id", "anthropic_api_key", "asana_personal_access_token", "atlassian_api_token",
+    "atlassian_jwt", "bitbucket_server_personal_access_token", "authress_service_client_access_key",
+    "azure_active_directory_application_secret", "azure_batch_key_identifiable", "azure_cache_for_redis_access_key",
+    "azure_container_registry_key_identifiable", "azure_cosmosdb_key_identifiable",
+    "azure_devops_personal_access_token", "azure_function_key", "azure_ml_web_service_classic_identifiable_key",
+    "azure_sas_token", "azure_search_admin_key", "azure_search_query_key", "azure_management_certificate",
+    "azure_sql_connection_string", "azure_sql_password", "azure_storage_account_key", "baiducloud_api_accesskey",
+    "beamer_api_key", "cds_canada_notify_api_key", "canva_connect_api_secret", "cashfree_api_key",
+    "checkout_production_secret_key", "checkout_test_secret_key", "chief_tools_token", "clojars_deploy_token",
+    "cratesio_api_token", "databricks_access_token", "datadog_api_key", "defined_networking_nebula_api_key",
+    "devcycle_client_api_key", "devcycle_mobile_api_key", "devcycle_server_api_key", "digitalocean_oauth_token",
+    "digitalocean_personal_access_token", "digitalocean_refresh_token", "digitalocean_system_token",
+    "discord_api_token_v2", "discord_bot_token", "docker_personal_access_token", "doppler_audit_token",
+    "doppler_cli_token", "doppler_personal_token", "doppler_scim_token", "doppler_service_token",
+    "doppler_service_account_token", "dropbox_access_token", "dropbox_short_lived_access_token",
+    "duffel_live_access_token", "duffel_test_access_token", "dynatrace_access_token", "dynatrace_internal_token",
+    "easypost_production_api_key", "easypost_test_api_key", "ebay_production_client_id",
+    "ebay_production_client_secret", "ebay_sandbox_client_id", "ebay_sandbox_client_secret", "fastly_api_token",
+    "figma_pat", "finicity_app_key", "flutterwave_live_api_secret_key", "flutterwave_test_api_secret_key",
+    "frameio_developer_token", "frameio_jwt", "fullstory_api_key", "github_app_installation_access_token",
+    "github_oauth_access_token", "github_personal_access_token", "github_refresh_token", "github_ssh_private_key",
+    "gitlab_access_token", "gocardless_live_access_token", "gocardless_sandbox_access_token",
+    "google_cloud_storage_service_account_access_key_id", "google_cloud_storage_access_key_secret",
+    "google_cloud_storage_user_access_key_id", "google_oauth_access_token", "google_oauth_client_id",
+    "google_oauth_client_secret", "google_oauth_refresh_token", "google_api_key", "google_cloud_private_key_id",
+    "grafana_cloud_api_key", "grafana_cloud_api_token", "grafana_project_api_key",
+    "grafana_project_service_account_token", "hashicorp_vault_batch_token", "hashicorp_vault_root_service_token",
+    "hashicorp_vault_service_token", "terraform_api_token", "highnote_rk_live_key", "highnote_rk_test_key",
+    "highnote_sk_live_key", "highnote_sk_test_key", "hop_bearer", "hop_pat", "hop_ptk", "hubspot_api_key",
+    "hubspot_api_personal_access_key", "intercom_access_token", "ionic_personal_access_token", "ionic_refresh_token",
+    "jd_cloud_access_key", "jfrog_platform_access_token", "jfrog_platform_api_key", "jfrog_platform_reference_token",
+    "linear_api_key", "linear_oauth_access_token", "lob_live_api_key", "lob_test_api_key", "localstack_api_key",
+    "logicmonitor_bearer_token", "logicmonitor_lmv1_access_key", "mailchimp_api_key", "mandrill_api",
+    "mailgun_api_key", "mapbox_secret_access_token", "maxmind_license_key", "mercury_non_production_api_token",
+    "mercury_production_api_token", "messagebird_api_key", "facebook_access_token", "midtrans_production_server_key",
+    "midtrans_sandbox_server_key", "new_relic_insights_query_key", "new_relic_license_key",
+    "new_relic_personal_api_key", "new_relic_rest_api_key", "notion_integration_token", "notion_oauth_client_secret",
+    "npm_access_token", "nuget_api_key", "octopus_deploy_api_key", "oculus_very_tiny_encrypted_session",
+    "onechronos_api_key", "onechronos_eb_api_key", "onechronos_eb_encryption_key", "onechronos_oauth_token",
+    "onechronos_refresh_token", "onfido_live_api_token", "onfido_sandbox_api_token", "openai_api_key",
+    "openai_api_key_v2", "palantir_jwt", "persona_production_api_key", "persona_sandbox_api_key",
+    "pinterest_access_token", "pinterest_refresh_token", "planetscale_database_password", "planetscale_oauth_token",
+    "planetscale_service_token", "plivo_auth_id", "plivo_auth_token", "postman_api_key", "postman_collection_key",
+    "prefect_server_api_key", "prefect_user_api_key", "pulumi_access_token", "pypi_api_token",
+    "readmeio_api_access_token", "redirect_pizza_api_token", "rootly_api_key", "rubygems_api_key",
+    "samsara_api_token", "samsara_oauth_access_token", "segment_public_api_token", "sendgrid_api_key",
+    "sendinblue_api_key", "sendinblue_smtp_key", "shippo_live_api_token", "shippo_test_api_token",
+    "shopify_access_token", "shopify_app_client_credentials", "shopify_app_client_secret",
+    "shopify_app_shared_secret", "shopify_custom_app_access_token", "shopify_marketplace_token",
+    "shopify_merchant_token", "shopify_partner_api_token", "shopify_private_app_password", "slack_api_token",
+    "slack_incoming_webhook_url", "slack_workflow_webhook_url", "square_access_token",
+    "square_production_application_secret", "square_sandbox_application_secret", "sslmate_api_key",
+    "sslmate_cluster_secret", "stripe_live_restricted_key", "stripe_api_key", "stripe_legacy_api_key",
+    "stripe_test_restricted_key", "stripe_test_secret_key", "stripe_webhook_signing_secret", "supabase_service_key",
+    "tableau_personal_access_token", "telegram_bot_token", "telnyx_api_v2_key", "tencent_cloud_secret_id",
+    "tencent_wechat_api_app_id", "twilio_access_token", "twilio_account_sid", "twilio_api_key",
+    "typeform_personal_access_token", "uniwise_api_key", "wakatime_pp_secret", "wakatime_oauth_access_token",
+    "wakatime_oauth_refresh_token", "workato_developer_api_token", "workos_production_api_key",
+    "workos_staging_api_key", "yandex_iam_access_secret", "yandex_cloud_api_key", "yandex_cloud_iam_cookie",
+    "yandex_cloud_iam_token", "yandex_cloud_smartcaptcha_server_key", "yandex_dictionary_api_key",
+    "yandex_passport_oauth_token", "yandex_predictor_api_key", "yandex_translate_api_key", "zuplo_consumer_api_key"
+]
+
+# Detectors of the other tools that find the same secrets as a GHAS secret type. Names are
+# the gitleaks rule id, the trufflehog detector name and the noseyparker rule name, as they
+# appear in the detector column of the merged report.
+DETECTOR_TO_GHAS_SECRET_TYPE = {
+    "gitleaks": {
+        "adafruit-api-key": "adafruit_io_key",
+        "alibaba-access-key-id": "alibaba_cloud_access_key_id",
+        "alibaba-secret-key": "alibaba_cloud_access_key_secret",
+        "atlassian-api-token": "atlassian_api_token",
+        "aws-access-token": "aws_access_key_id",
+        "azure-ad-client-secret": "azure_active_directory_application_secret",
+        "clojars-api-token": "clojars_deploy_token",
+        "databricks-api-token": "databricks_access_token",
+        "datadog-access-token": "datadog_api_key",
+        "digitalocean-access-token": "digitalocean_oauth_token",
+        "digitalocean-pat": "digitalocean_personal_access_token",
+        "digitalocean-refresh-token": "digitalocean_refresh_token",
+        "doppler-api-token": "doppler_personal_token",
+        "dropbox-api-token": "dropbox_access_token",
+        "dropbox-short-lived-api-token": "dropbox_short_lived_access_token",
+        "duffel-api-token": "duffel_live_access_token",
+        "dynatrace-api-token": "dynatrace_access_token",
+        "easypost-api-token": "easypost_production_api_key",
+        "easypost-test-api-token": "easypost_test_api_key",
+        "fastly-api-token": "fastly_api_token",
+        "flutterwave-secret-key": "flutterwave_live_api_secret_key",
+        "frameio-api-token": "frameio_developer_token",
+        "gcp-api-key": "google_api_key",
+        "github-app-token": "github_app_installation_access_token",
+        "github-fine-grained-pat": "github_personal_access_token",
+        "github-oauth": "github_oauth_access_token",
+        "github-pat": "github_personal_access_token",
+        "github-refresh-token": "github_refresh_token",
+        "gitlab-pat": "gitlab_access_token",
+        "grafana-api-key": "grafana_cloud_api_key",
+        "grafana-cloud-api-token": "grafana_cloud_api_token",
+        "grafana-service-account-token": "grafana_project_service_account_token",
+        "hashicorp-tf-api-token": "terraform_api_token",
+        "intercom-api-key": "intercom_access_token",
+        "jfrog-api-key": "jfrog_platform_api_key",
+        "jfrog-identity-token": "jfrog_platform_access_token",
+        "linear-api-key": "linear_api_key",
+        "lob-api-key": "lob_live_api_key",
+        "mailchimp-api-key": "mailchimp_api_key",
+        "mailgun-private-api-token": "mailgun_api_key",
+        "mapbox-api-token": "mapbox_secret_access_token",
+        "npm-access-token": "npm_access_token",
+        "openai-api-key": "openai_api_key",
+        "planetscale-api-token": "planetscale_service_token",
+        "planetscale-oauth-token": "planetscale_oauth_token",
+        "planetscale-password": "planetscale_database_password",
+        "postman-api-token": "postman_api_key",
+        "prefect-api-token": "prefect_user_api_key",
+        "pulumi-api-token": "pulumi_access_token",
+        "pypi-upload-token": "pypi_api_token",
+        "readme-api-token": "readmeio_api_access_token",
+        "rubygems-api-token": "rubygems_api_key",
+        "sendgrid-api-token": "sendgrid_api_key",
+        "sendinblue-api-token": "sendinblue_api_key",
+        "shippo-api-token": "shippo_live_api_token",
+        "shopify-access-token": "shopify_access_token",
+        "shopify-custom-access-token": "shopify_custom_app_access_token",
+        "shopify-private-app-access-token": "shopify_private_app_password",
+        "shopify-shared-secret": "shopify_app_shared_secret",
+        "slack-app-token": "slack_api_token",
+        "slack-bot-token": "slack_api_token",
+        "slack-legacy-bot-token": "slack_api_token",
+        "slack-legacy-token": "slack_api_token",
+        "slack-user-token": "slack_api_token",
+        "slack-webhook-url": "slack_incoming_webhook_url",
+        "square-access-token": "square_access_token",
+        "stripe-access-token": "stripe_api_key",
+        "telegram-bot-api-token": "telegram_bot_token",
+        "twilio-api-key": "twilio_api_key",
+        "typeform-api-token": "typeform_personal_access_token"
+    },
+    "trufflehog": {
+        "Anthropic": "anthropic_api_key",
+        "AsanaPersonalAccessToken": "asana_personal_access_token",
+        "AWS": "aws_access_key_id",
+        "AWSSessionKey": "aws_session_token",
+        "Azure": "azure_active_directory_application_secret",
+        "AzureBatch": "azure_batch_key_identifiable",
+        "Clojars": "clojars_deploy_token",
+        "DatadogToken": "datadog_api_key",
+        "DigitalOceanV2": "digitalocean_personal_access_token",
+        "DiscordBotToken": "discord_bot_token",
+        "DockerHub": "docker_personal_access_token",
+        "Doppler": "doppler_personal_token",
+        "Dropbox": "dropbox_access_token",
+        "FastlyPersonalToken": "fastly_api_token",
+        "FigmaPersonalAccessToken": "figma_pat",
+        "Frameio": "frameio_developer_token",
+        "Github": "github_personal_access_token",
+        "GitHubOauth2": "github_oauth_access_token",
+        "Gitlab": "gitlab_access_token",
+        "GoogleOauth2": "google_oauth_access_token",
+        "Grafana": "grafana_cloud_api_token",
+        "GrafanaServiceAccount": "grafana_project_service_account_token",
+        "HubSpotApiKey": "hubspot_api_key",
+        "Intercom": "intercom_access_token",
+        "JiraToken": "atlassian_api_token",
+        "LinearAPI": "linear_api_key",
+        "MailChimp": "mailchimp_api_key",
+        "Mailgun": "mailgun_api_key",
+        "Mapbox": "mapbox_secret_access_token",
+        "NewRelicPersonalApiKey": "new_relic_personal_api_key",
+        "Notion": "notion_integration_token",
+        "NpmToken": "npm_access_token",
+        "NpmTokenV2": "npm_access_token",
+        "OpenAI": "openai_api_key",
+        "PlanetScale": "planetscale_service_token",
+        "Postman": "postman_api_key",
+        "Pulumi": "pulumi_access_token",
+        "PyPI": "pypi_api_token",
+        "Rootly": "rootly_api_key",
+        "RubyGems": "rubygems_api_key",
+        "SendGrid": "sendgrid_api_key",
+        "Shopify": "shopify_access_token",
+        "Slack": "slack_api_token",
+        "SlackWebhook": "slack_incoming_webhook_url",
+        "Square": "square_access_token",
+        "Stripe": "stripe_api_key",
+        "TelegramBotToken": "telegram_bot_token",
+        "TerraformCloudPersonalToken": "terraform_api_token",
+        "Twilio": "twilio_account_sid",
+        "Typeform": "typeform_personal_access_token"
+    },
+    "noseyparker": {
+        "Anthropic API Key": "anthropic_api_key",
+        "AWS API Key": "aws_access_key_id",
+        "AWS Secret Access Key": "aws_secret_access_key",
+        "AWS Session Token": "aws_session_token",
+        "Databricks Personal Access Token": "databricks_access_token",
+        "Docker Hub Personal Access Token": "docker_personal_access_token",
+        "Doppler Audit Token": "doppler_audit_token",
+        "Doppler CLI Token": "doppler_cli_token",
+        "Doppler Personal Token": "doppler_personal_token",
+        "Doppler SCIM Token": "doppler_scim_token",
+        "Doppler Service Account Token": "doppler_service_account_token",
+        "Doppler Service Token": "doppler_service_token",
+        "Dynatrace Token": "dynatrace_access_token",
+        "Figma Personal Access Token": "figma_pat",
+        "GitHub App Token": "github_app_installation_access_token",
+        "GitHub OAuth Access Token": "github_oauth_access_token",
+        "GitHub Personal Access Token": "github_personal_access_token",
+        "GitHub Personal Access Token (fine-grained permissions)": "github_personal_access_token",
+        "GitHub Refresh Token": "github_refresh_token",
+        "GitLab Personal Access Token": "gitlab_access_token",
+        "Google API Key": "google_api_key",
+        "Google OAuth Access Token": "google_oauth_access_token",
+        "Google OAuth Client Secret": "google_oauth_client_secret",
+        "Linear API Key": "linear_api_key",
+        "MailChimp API Key": "mailchimp_api_key",
+        "Mailgun API Key": "mailgun_api_key",
+        "Mapbox Secret Access Token": "mapbox_secret_access_token",
+        "New Relic API Service Key": "new_relic_rest_api_key",
+        "New Relic License Key": "new_relic_license_key",
+        "npm Access Token": "npm_access_token",
+        "NuGet API Key": "nuget_api_key",
+        "OpenAI API Key": "openai_api_key",
+        "Postman API Key": "postman_api_key",
+        "Pulumi API Key": "pulumi_access_token",
+        "PyPI Upload Token": "pypi_api_token",
+        "RubyGems API Key": "rubygems_api_key",
+        "SendGrid API Key": "sendgrid_api_key",
+        "Shopify Access Token": "shopify_access_token",
+        "Shopify App Secret": "shopify_app_client_secret",
+        "Slack App Token": "slack_api_token",
+        "Slack Bot Token": "slack_api_token",
+        "Slack Legacy Bot Token": "slack_api_token",
+        "Slack User Token": "slack_api_token",
+        "Slack Webhook": "slack_incoming_webhook_url",
+        "Square Access Token": "square_access_token",
+        "Stripe API Key": "stripe_api_key",
+        "Stripe API Test Key": "stripe_test_secret_key",
+        "Telegram Bot Token": "telegram_bot_token",
+        "Twilio API Key": "twilio_api_key"
+    }
+}
+
+# Words that appear in most detector names and secret types, they don't tell secret types apart
+GENERIC_TOKENS = {"api", "key", "keys", "token", "tokens", "access", "secret", "secrets", "personal", "pat",
+                  "client", "id", "auth", "oauth", "oauth2", "v2", "private", "service", "account", "live",
+                  "test", "production", "sandbox", "password", "credential", "credentials", "generic"}
+
+# Minimum trigram similarity (Dice coefficient) of a detector name and a secret type to classify
+# the detector when it is not in the mapping table
+MIN_TRIGRAM_SIMILARITY = 0.5
+
+# Change when the classification logic changes, so cached classifications are redone
+CLASSIFIER_VERSION = 1
+
+# Splits a detector name or secret type into lowercase words:
+# "GitHubOauth2" -> ["github", "oauth2"], "aws-access-token" -> ["aws", "access", "token"]
+def normalize_detector_tokens(name):
+    name = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', name or '')
+    name = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1 \2', name)
+    return [token for token in re.split(r'[^a-z0-9]+', name.lower()) if token]
+
+def _distinctive_tokens(tokens):
+    return [token for token in tokens if token not in GENERIC_TOKENS]
+
+def _trigrams(text):
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+# Summary
+# Classifies the detectors of gitleaks, trufflehog and noseyparker to the GHAS secret type
+# they most likely correspond to. A detector is looked up in the explicit mapping table
+# first. Otherwise only the distinctive words of the names are compared (the vendor, like
+# "mailchimp", not "api key"): the secret types that share a word with the detector are
+# candidates, found through a word index, and with no shared word, the secret types that
+# share a trigram, found through a trigram index. The candidate with the highest trigram
+# similarity wins if it is at least MIN_TRIGRAM_SIMILARITY.
+# Every detector is classified once. Classifications are kept in cache_file across runs.
+# Input:
+#   cache_file (optional): JSON file of the classifications of earlier runs
+class GhasClassifier:
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self.mapping = {source: {" ".join(normalize_detector_tokens(name)): secret_type for name, secret_type in detectors.items()}
+                        for source, detectors in DETECTOR_TO_GHAS_SECRET_TYPE.items()}
+
+        self.type_trigrams = {}
+        self.token_index = {}
+        self.trigram_index = {}
+        for secret_type in GHAS_SECRET_TYPES:
+            tokens = _distinctive_tokens(normalize_detector_tokens(secret_type))
+            trigrams = _trigrams(" ".join(tokens))
+            self.type_trigrams[secret_type] = trigrams
+            for token in tokens:
+                self.token_index.setdefault(token, set()).add(secret_type)
+            for trigram in trigrams:
+                self.trigram_index.setdefault(trigram, set()).add(secret_type)
+
+        self.version = self._version()
+        self.cache = self._load_cache()
+        self._cache_changed = False
+
+    # Identifies the classifier logic and tables the cached classifications were made with
+    def _version(self):
+        tables = json.dumps([CLASSIFIER_VERSION, GHAS_SECRET_TYPES, DETECTOR_TO_GHAS_SECRET_TYPE, sorted(GENERIC_TOKENS), MIN_TRIGRAM_SIMILARITY], sort_keys=True)
+        return hashlib.sha256(tables.encode()).hexdigest()
+
+    def _load_cache(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != self.version:
+            return {}
+        return data.get("detectors", {})
+
+    def save_cache(self):
+        if not self.cache_file or not self._cache_changed:
+            return
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        temp_file = f"{self.cache_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump({"version": self.version, "detectors": self.cache}, f, indent=2, sort_keys=True)
+        os.replace(temp_file, self.cache_file)
+        self._cache_changed = False
+
+    def _best_by_trigrams(self, name, candidates):
+        trigrams = _trigrams(name)
+        best_type, best_score = None, 0.0
+        for secret_type in sorted(candidates):
+            type_trigrams = self.type_trigrams[secret_type]
+            score = 2 * len(trigrams & type_trigrams) / (len(trigrams) + len(type_trigrams))
+            if score > best_score:
+                best_type, best_score = secret_type, score
+        if best_score < MIN_TRIGRAM_SIMILARITY:
+            return None, best_score
+        return best_type, best_score
+
+    def _classify(self, source, detector):
+        tokens = normalize_detector_tokens(detector)
+        name = " ".join(tokens)
+        if not name:
+            return None, None, 0.0
+
+        secret_type = self.mapping.get(source, {}).get(name)
+        if secret_type:
+            return secret_type, "mapping", 1.0
+
+        # Detectors named only with generic words (generic-api-key, PrivateKey) are not classified
+        tokens = _distinctive_tokens(tokens)
+        if not tokens:
+            return None, None, 0.0
+        name = " ".join(tokens)
+
+        candidates = set()
+        for token in tokens:
+            candidates |= self.token_index.get(token, set())
+        method = "token"
+        if not candidates:
+            for trigram in _trigrams(name):
+                candidates |= self.trigram_index.get(trigram, set())
+            method = "trigram"
+
+        secret_type, score = self._best_by_trigrams(name, candidates)
+        if secret_type is None:
+            return None, None, round(score, 3)
+        return secret_type, method, round(score, 3)
+
+    # Returns a tuple of the GHAS secret type of the detector (None if there is none), the
+    # method it was found with (mapping, token or trigram) and the similarity score
+    def classify(self, source, detector):
+        cache_key = f"{source}:{detector}"
+        if cache_key not in self.cache:
+            self.cache[cache_key] = list(self._classify(source, detector))
+            self._cache_changed = True
+        return tuple(self.cache[cache_key])
+
+# Summary
+# Writes the findings of the merged report from gitleaks, trufflehog and noseyparker whose
+# detector corresponds to a GHAS secret type, so these are secrets GHAS secret scanning would
+# likely have found too. Adds the columns ghas_secret_type, ghas_classification (mapping,
+# token or trigram) and ghas_classification_score to the merged report columns.
+# Input:
+#   merged_report: path to the merged report CSV file
+#   output_file: path to the likely GHAS matches CSV file
+#   cache_file (optional): JSON file of the classifications kept across runs
+# Output:
+#   tuple of the number of findings written and the number of findings read
+def classify_ghas_matches(merged_report, output_file, cache_file=None, logger=None):
+    classifier = GhasClassifier(cache_file)
+    match_count = 0
+    total_rows = 0
+
+    with open(merged_report, 'r', newline='') as f_in, open(output_file, 'w', newline='') as f_out:
+        reader = csv.DictReader(f_in)
+        fieldnames = (reader.fieldnames or []) + ['ghas_secret_type', 'ghas_classification', 'ghas_classification_score']
+        writer = csv.DictWriter(f_out, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for row in reader:
+            total_rows += 1
+            if row.get('source') not in DETECTOR_TO_GHAS_SECRET_TYPE:
+                continue
+            secret_type, method, score = classifier.classify(row['source'], row.get('detector'))
+            if secret_type is None:
+                continue
+            row['ghas_secret_type'] = secret_type
+            row['ghas_classification'] = method
+            row['ghas_classification_score'] = score
+            writer.writerow(row)
+            match_count += 1
+
+    try:
+        classifier.save_cache()
+    except OSError as e:
+        print(f"Failed to save the GHAS classifier cache {cache_file}: {str(e)}")
+        if logger:
+            logger.error(f"Failed to save the GHAS classifier cache {cache_file}: {str(e)}")
+
+    return match_count, total_rows
@@ -1,5 +1,89 @@
+import json
+import os
+import shutil
 import pandas as pd
 
+# Rows per data file of a paginated table, and rows shown per page in the browser
+HTML_CHUNK_ROWS = 5000
+HTML_PAGE_ROWS = 50
+
+# Client side pagination, sorting and filtering of the tables of a paginated report. The
+# rows are loaded from .js data files with <script> tags rather than fetched as JSON, since
+# browsers block fetch() of local files opened with file://. Only the rows of the current
+# page are put in the DOM.
+PAGINATED_TABLE_SCRIPT = """
+<script>
+var secretsynthTables = {};
+function secretsynthTable(id, columns) {
+  secretsynthTables[id] = {columns: columns, rows: [], view: [], page: 0, sortColumn: null, sortAscending: true, filter: ''};
+}
+function secretsynthAddRows(id, rows) {
+  var table = secretsynthTables[id];
+  table.rows = table.rows.concat(rows);
+  secretsynthRefresh(id);
+}
+function secretsynthRefresh(id) {
+  var table = secretsynthTables[id];
+  var filter = table.filter.toLowerCase();
+  table.view = table.rows.filter(function (row) {
+    return !filter || row.some(function (value) { return value !== null && String(value).toLowerCase().indexOf(filter) >= 0; });
+  });
+  if (table.sortColumn !== null) {
+    var column = table.sortColumn, direction = table.sortAscending ? 1 : -1;
+    table.view.sort(function (a, b) {
+      var x = a[column], y = b[column];
+      if (x === y) return 0;
+      if (x === null) return 1;
+      if (y === null) return -1;
+      if (typeof x === 'number' && typeof y === 'number') return (x - y) * direction;
+      return String(x).localeCompare(String(y)) * direction;
+    });
+  }
+  table.page = Math.min(table.page, Math.max(0, Math.ceil(table.view.length / %(page_rows)d) - 1));
+  secretsynthRender(id);
+}
+function secretsynthRender(id) {
+  var table = secretsynthTables[id];
+  var head = document.querySelector('#' + id + ' thead tr');
+  head.innerHTML = '';
+  table.columns.forEach(function (name, column) {
+    var th = document.createElement('th');
+    th.textContent = name + (table.sortColumn === column ? (table.sortAscending ? ' \\u25B2' : ' \\u25BC') : '');
+    th.onclick = function () {
+      table.sortAscending = table.sortColumn === column ? !table.sortAscending : true;
+      table.sortColumn = column;
+      secretsynthRefresh(id);
+    };
+    head.appendChild(th);
+  });
+  var body = document.querySelector('#' + id + ' tbody');
+  body.innerHTML = '';
+  table.view.slice(table.page * %(page_rows)d, (table.page + 1) * %(page_rows)d).forEach(function (row) {
+    var tr = document.createElement('tr');
+    row.forEach(function (value) {
+      var td = document.createElement('td');
+      td.textContent = value === null ? '' : value;
+      tr.appendChild(td);
+    });
+    body.appendChild(tr);
+  });
+  var pages = Math.max(1, Math.ceil(table.view.length / %(page_rows)d));
+  document.getElementById(id + '-status').textContent = 'Page ' + (table.page + 1) + ' of ' + pages + ' (' + table.view.length + ' of ' + table.rows.length + ' rows)';
+}
+function secretsynthPage(id, step) {
+  var table = secretsynthTables[id];
+  var pages = Math.max(1, Math.ceil(table.view.length / %(page_rows)d));
+  table.page = Math.min(pages - 1, Math.max(0, table.page + step));
+  secretsynthRender(id);
+}
+function secretsynthFilter(id, value) {
+  secretsynthTables[id].filter = value;
+  secretsynthTables[id].page = 0;
+  secretsynthRefresh(id);
+}
+</script>
+""" % {"page_rows": HTML_PAGE_ROWS}
+
 def get_table_style(table_links):
     # Style the DataFrame
     styled_table_links =  table_links.style.set_table_styles([
@@ -9,25 +93,69 @@ def get_table_style(table_links):
         {'selector': 'th', 'props': [('background', '#606060'), ('color', 'white'), ('font-weight', 'bold')]}
     ])
 
-    # Hide the index
-    styled_table_links.hide_index()
+    # Show floats with 2 decimals
+    styled_table_links = styled_table_links.format(precision=2)
+
+    # Hide the index. Styler.hide_index was replaced by Styler.hide in pandas 1.4
+    if hasattr(styled_table_links, 'hide'):
+        styled_table_links = styled_table_links.hide(axis="index")
+    else:
+        styled_table_links.hide_index()
     return styled_table_links
 
+# Summary
+# Writes the rows of a DataFrame to .js data files of HTML_CHUNK_ROWS rows in data_dir,
+# and returns the HTML of a table that loads them and shows them one page at a time, with
+# sorting (click a column) and filtering (any column contains the text).
+# Input:
+#   df: DataFrame of the table
+#   table_id: id of the table in the HTML report, also the prefix of its data files
+#   data_dir: directory of the data files
+#   data_dir_link: path of data_dir relative to the HTML report
+# Output:
+#   HTML of the table
+def paginated_table_html(df, table_id, data_dir, data_dir_link):
+    chunk_links = []
+    for chunk_number, start in enumerate(range(0, len(df), HTML_CHUNK_ROWS)):
+        chunk_name = f"{table_id}_{chunk_number:04d}.js"
+        rows = df.iloc[start:start + HTML_CHUNK_ROWS].to_json(orient='values', date_format='iso')
+        with open(os.path.join(data_dir, chunk_name), 'w') as f:
+            f.write(f"secretsynthAddRows({json.dumps(table_id)}, {rows});\n")
+        chunk_links.append(f"{data_dir_link}/{chunk_name}")
+
+    columns = json.dumps([str(name) for name in df.columns])
+    html = f'''<div class="paginated-table">
+<input type="search" placeholder="Filter" oninput="secretsynthFilter('{table_id}', this.value)">
+<button onclick="secretsynthPage('{table_id}', -1)">Previous</button>
+<button onclick="secretsynthPage('{table_id}', 1)">Next</button>
+<span id="{table_id}-status"></span>
+<table id="{table_id}"><thead><tr></tr></thead><tbody></tbody></table>
+</div>
+<script>secretsynthTable('{table_id}', {columns}); secretsynthRefresh('{table_id}');</script>
+'''
+    html += ''.join(f'<script src="{link}"></script>\n' for link in chunk_links)
+    return html
+
 def output_to_html(metrics, 
                    repo_metrics, 
                    detector_metrics,
-                   timing_metrics,
+                   timing_table,
                    merged_report_name, 
                    ghas_secret_alerts_filename, 
                    matches_report_name,
                    error_logfile, 
-                   report_path 
+                   report_path,
+                   paginated=False
                    ):
+    # timing_table: DataFrame of the time spent in every phase of the run, see utils.tracing.Tracer.timing_table
+    # paginated: write the repo and detector tables as data files next to report_path
+    # (report_<timestamp>_data/), shown a page at a time in the browser, instead of
+    # rendering every row into the HTML file
     
     # Define descriptions for Report Links
     descriptions = ['The merged report contains the row-by-row of all secrets from all secret scanners. The merged reports create a few common fields to make it easier to aggregate and filter across multiple secret scanning solutions.', 
                     'GHAS alerts are the alerts that are pulled down from the GitHub Advanced Security (GHAS) API. GHAS secret alerts to do not contain secret, line, or file information from the API.', 
-                    'Experimental. These are secrets that have at least one match among the other tools. Consider these results experimental only.', 
+                    'Experimental. With hashed secrets, one row per secret and location with the tools that agree on it. With --keep-secrets-in-reports, the secrets that have at least one fuzzy match among the other tools. Consider these results experimental only.', 
                     'Any processing errors are logged here. If the total errors is > 0, then your results may be incomplete.']
     file_paths = [merged_report_name, ghas_secret_alerts_filename, matches_report_name, error_logfile]
     # Create a DataFrame with links to the raw report files
@@ -37,31 +165,23 @@ def output_to_html(metrics,
         'CSV Link': [f'<a href="{file_path}">{file_path}</a>' for file_path in file_paths]
     })
 
-    # Set pandas precision
-    pd.set_option('precision', 2)
-    
-    total_time = sum(value for key, value in timing_metrics.items() if "_time" in key)
-    
-    timing_metrics_data = []
-    for function, value in timing_metrics.items():
-        if "_time" in function:
-            hours, remainder = divmod(value, 3600)
-            minutes, seconds = divmod(remainder, 60)
-            time_str = f"{int(hours)} hours {int(minutes)} minutes {seconds:.2f} seconds"
-            percentage = (value / total_time) * 100 if total_time != 0 else 0
-            timing_metrics_data.append({"Function": function, "Time (seconds)": time_str, "Percentage of Total Time": percentage})
-        elif "_percentage" in function:
-            timing_metrics_data.append({"Function": function, "Time (seconds)": value, "Percentage of Total Time": None})
-    timing_metrics_df = pd.DataFrame(timing_metrics_data)
-
     # Apply style and convert to HTML
-    timing_metrics_html = get_table_style(timing_metrics_df).render(index=False)
+    timing_metrics_html = get_table_style(timing_table).to_html()
 
     # Convert the DataFrames to HTML
-    metrics_html = get_table_style(metrics).render(index=False)
-    repo_metrics_html = get_table_style(repo_metrics).render(index=False)
-    detector_metrics_html = get_table_style(detector_metrics).render(index=False)
-    report_links_html = get_table_style(report_links).render(index=False)
+    metrics_html = get_table_style(metrics).to_html()
+    report_links_html = get_table_style(report_links).to_html()
+    if paginated:
+        data_dir = os.path.splitext(report_path)[0] + "_data"
+        if os.path.exists(data_dir):
+            shutil.rmtree(data_dir)
+        os.makedirs(data_dir)
+        data_dir_link = os.path.basename(data_dir)
+        repo_metrics_html = paginated_table_html(repo_metrics, "repo-metrics", data_dir, data_dir_link)
+        detector_metrics_html = paginated_table_html(detector_metrics, "detector-metrics", data_dir, data_dir_link)
+    else:
+        repo_metrics_html = get_table_style(repo_metrics).to_html()
+        detector_metrics_html = get_table_style(detector_metrics).to_html()
 
     # Define the summary text for each section
     about_secretsynth_text = '<p>Secret Synth is a meta-secret scanner solution that wraps popular source code secret scanning solutions such as gitleaks, Nosey Parker, and Trufflehog.</p>'
@@ -71,10 +191,13 @@ def output_to_html(metrics,
     repo_level_summary_text = '<p>This section provides detailed metrics for each repository scanned. This just gives you an idea of the quantity of secrets discovered by each tool and the total number of secrets in the entire repository.</p>'
     detector_summary_text = '<p>Every tool emits a detector type. The table below just gives you an aggregated view of the types of secrets that have been found and the magnitude of each.</p>'
     report_links_summary_text = '<p>Here you can find the raw data of all the secrets in the merged_scan_results_report. The first few columns represent the generic information found among all tools. Any fields starting with np_, gl_, gh_, or th_ are specifics to those tools.</p>'
-    timing_metrics_summary_text = '<p>Total scan time for each tool and as a percentage of whole. GHAS Secrets is never included here since local scanning is not supported.</p>'   
+    timing_metrics_summary_text = '<p>Time spent in every phase of the run: fetching the repositories, cloning, every scanner, the GitHub API requests, merging and matching. The time is summed over all spans of a phase (for example all repositories of a scanner), the wall clock time is the time at least one of them was running; with --jobs greater than 1 it is lower than the summed time. Child CPU and peak child RSS are the CPU time and largest memory of the processes (git and the scanners) the phase ran; on Linux a child process counts at least the memory secretsynth had when it started the process. The trace_&lt;timestamp&gt;.json and repo_timing_&lt;timestamp&gt;.csv files next to this report have the same spans as a Chrome trace and per repository.</p>'   
 
     # Write the HTML to a file
     with open(report_path, 'w') as f:
+        if paginated:
+            f.write('<style>.paginated-table table { border: 1px solid black; } .paginated-table tr:nth-of-type(odd) { background: #eee; } .paginated-table th { background: #606060; color: white; font-weight: bold; cursor: pointer; }</style>')
+            f.write(PAGINATED_TABLE_SCRIPT)
         f.write('<h1>About Secret Synth</h1>')
         f.write(about_secretsynth_text)
         f.write('<h2>Disclaimer</h2>')
@@ -0,0 +1,164 @@
+import os
+from collections import Counter
+import pandas as pd
+from reporting.parquet_writer import PYARROW_AVAILABLE
+
+if PYARROW_AVAILABLE:
+    import pyarrow.dataset as pa_dataset
+
+# Columns of the merged report the metrics are computed from
+METRICS_COLUMNS = ['source', 'owner', 'repo_name', 'secret', 'detector']
+
+# Sources counted per repository in the repo metrics table
+METRICS_SOURCES = ['gitleaks', 'trufflehog', 'noseyparker', 'ghas']
+
+# Rows of the merged report read at a time when the metrics are computed from a report file
+METRICS_CHUNK_ROWS = 100000
+
+# Empty values are missing values, like pandas reads them from the CSV
+def _value(row, name):
+    value = row.get(name)
+    return value if value != '' else None
+
+# Value counts of a column, without the categories that don't occur
+def _nonzero_counts(column):
+    return {value: int(count) for value, count in column.value_counts().items() if count}
+
+# Summary
+# Metrics of the merged report (top level counts, repo metrics and detector metrics), built
+# up one batch of rows at a time. merge_csv_all_tools passes it every row it writes, so the
+# metrics are ready when the merged report is, without reading the report again. Only the
+# counters and the distinct secrets are kept, not the rows.
+class MergedReportMetrics:
+    def __init__(self):
+        self.total_rows = 0
+        self.total_secrets = 0
+        self.owners = set()
+        self.secrets = set()
+        self.sources = Counter()
+        self.detectors = Counter()
+        # repo_name -> [secret count, distinct secrets, Counter of sources]
+        self.repos = {}
+
+    def _repo(self, repo_name):
+        repo = self.repos.get(repo_name)
+        if repo is None:
+            repo = self.repos[repo_name] = [0, set(), Counter()]
+        return repo
+
+    # Adds merged report rows (dicts)
+    def add_rows(self, rows):
+        for row in rows:
+            source = _value(row, 'source')
+            owner = _value(row, 'owner')
+            repo_name = _value(row, 'repo_name')
+            secret = _value(row, 'secret')
+            detector = _value(row, 'detector')
+
+            self.total_rows += 1
+            if owner is not None:
+                self.owners.add(owner)
+            if source is not None:
+                self.sources[source] += 1
+                if detector is not None:
+                    self.detectors[(source, detector)] += 1
+            if secret is not None:
+                self.total_secrets += 1
+                self.secrets.add(secret)
+            if repo_name is not None:
+                repo = self._repo(repo_name)
+                if secret is not None:
+                    repo[0] += 1
+                    repo[1].add(secret)
+                if source is not None:
+                    repo[2][source] += 1
+
+    # Adds a DataFrame of merged report rows with the METRICS_COLUMNS, missing values as NaN
+    def add_frame(self, df):
+        self.total_rows += len(df)
+        self.owners.update(df['owner'].dropna().unique().tolist())
+        self.sources.update(_nonzero_counts(df['source']))
+        self.detectors.update(df.groupby(['source', 'detector'], observed=True).size().to_dict())
+        secrets = df['secret'].dropna()
+        self.total_secrets += len(secrets)
+        self.secrets.update(secrets.unique().tolist())
+
+        repo_rows = df[df['repo_name'].notna()]
+        for repo_name, secret_count in repo_rows.groupby('repo_name', observed=True)['secret'].count().items():
+            self._repo(repo_name)[0] += secret_count
+        for (repo_name, source), count in repo_rows.groupby(['repo_name', 'source'], observed=True).size().items():
+            self._repo(repo_name)[2][source] += count
+        repo_secrets = repo_rows[['repo_name', 'secret']].dropna().drop_duplicates()
+        for repo_name, secret in zip(repo_secrets['repo_name'].tolist(), repo_secrets['secret'].tolist()):
+            self._repo(repo_name)[1].add(secret)
+
+    # Returns a tuple of the dict of summary counts, the DataFrame of repo metrics (without
+    # the summary row) and the DataFrame of detector metrics. None if no
+    # rows were added.
+    def results(self):
+        if self.total_rows == 0:
+            return None
+
+        counts = {
+            'total_rows': self.total_rows,
+            'owners': len(self.owners),
+            'distinct_sources': len(self.sources),
+            'total_repos_with_secrets': len(self.repos),
+            'total_secrets_by_source': {source: int(count) for source, count in sorted(self.sources.items())},
+            'total_secrets': self.total_secrets,
+            'total_distinct_secrets': len(self.secrets)
+        }
+
+        repo_metrics = pd.DataFrame(
+            [[repo_name, secret_count, len(secrets)] + [sources[source] for source in METRICS_SOURCES]
+             for repo_name, (secret_count, secrets, sources) in sorted(self.repos.items())],
+            columns=['repo_name_', 'secret_count', 'secret_nunique'] + [f'source_total_{source}_secrets' for source in METRICS_SOURCES])
+
+        # Most found detectors first, ties in source and detector order
+        detector_metrics = pd.DataFrame(
+            [[source, detector, count] for (source, detector), count in sorted(self.detectors.items())],
+            columns=['source', 'detector', 'detector_count'])
+        detector_metrics = detector_metrics.sort_values('detector_count', ascending=False, kind='stable').reset_index(drop=True)
+
+        return counts, repo_metrics, detector_metrics
+
+# Yields the METRICS_COLUMNS of a merged report in chunks, from a CSV file or a Parquet
+# dataset written by reporting/parquet_writer.py. Columns with few distinct values are
+# read as categoricals.
+def _read_metrics_chunks(report_path, chunk_rows):
+    if os.path.isdir(report_path):
+        dataset = pa_dataset.dataset(report_path, format="parquet", partitioning="hive")
+        for batch in dataset.to_batches(columns=METRICS_COLUMNS, batch_size=chunk_rows):
+            yield batch.to_pandas()
+        return
+    dtypes = {'source': 'category', 'owner': 'category', 'repo_name': 'category', 'detector': 'category', 'secret': str}
+    yield from pd.read_csv(report_path, usecols=METRICS_COLUMNS, dtype=dtypes, chunksize=chunk_rows)
+
+# Summary
+# Computes the metrics of a merged report file, for when it was not merged in this process.
+# The report is read in chunks of chunk_rows rows, and only the columns the metrics use.
+# Input:
+#   report_path: path to the merged report CSV file, or its Parquet dataset directory
+# Output:
+#   see MergedReportMetrics.results
+def aggregate_report_metrics(report_path, chunk_rows=METRICS_CHUNK_ROWS):
+    metrics = MergedReportMetrics()
+    try:
+        for chunk in _read_metrics_chunks(report_path, chunk_rows):
+            metrics.add_frame(chunk)
+    except pd.errors.EmptyDataError:
+        return None
+    return metrics.results()
+
+# Writer that passes the rows written to a merged report writer on to a MergedReportMetrics
+class MetricsRowWriter:
+    def __init__(self, writer, metrics):
+        self.writer = writer
+        self.metrics = metrics
+
+    def writerow(self, row):
+        self.writerows([row])
+
+    def writerows(self, rows):
+        self.writer.writerows(rows)
+        self.metrics.add_rows(rows)
@@ -0,0 +1,70 @@
+import os
+import shutil
+import pandas as pd
+
+# pyarrow is optional, it is only needed for --parquet
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as pa_dataset
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# CSV blocks read and written at a time, so large reports are converted in bounded memory
+PARQUET_READ_BLOCK_BYTES = 16 * 1024 * 1024
+
+# Rows buffered per partition before a row group is written, fewer and larger row groups
+# compress better
+PARQUET_MIN_ROWS_PER_GROUP = 64 * 1024
+
+# Returns the path of the Parquet dataset written next to a CSV report
+def parquet_path_for(csv_file):
+    return os.path.splitext(csv_file)[0] + ".parquet"
+
+# Summary
+# Converts a CSV report to a Parquet dataset, partitioned into one directory per value of
+# partition_cols (owner=<owner>/source=<source>/...). Every column is read as a string and
+# written with Parquet dictionary encoding, since the reports repeat a few values (repos,
+# files, detectors) in most rows and most columns are empty for any given source.
+# The CSV is read and written in blocks.
+# Input:
+#   csv_file: path to the CSV report
+#   parquet_dir: directory of the Parquet dataset, replaced if it exists
+#   partition_cols: columns to partition on. Columns missing from the report are skipped.
+# Output:
+#   parquet_dir, or None if csv_file does not exist or is empty
+def csv_to_parquet(csv_file, parquet_dir, partition_cols=None, logger=None):
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required to write Parquet reports. Install it with: pip install pyarrow")
+    if not os.path.exists(csv_file) or os.stat(csv_file).st_size == 0:
+        return None
+
+    # Read the header to type every column as a string
+    with open(csv_file, 'r', newline='') as f:
+        column_names = pd.read_csv(f, nrows=0).columns.tolist()
+    column_types = {name: pa.string() for name in column_names}
+
+    reader = pa_csv.open_csv(csv_file,
+                             read_options=pa_csv.ReadOptions(block_size=PARQUET_READ_BLOCK_BYTES),
+                             parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                             convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True))
+
+    partition_cols = [name for name in (partition_cols or []) if name in column_names]
+    partitioning = None
+    if partition_cols:
+        partitioning = pa_dataset.partitioning(pa.schema([(name, pa.string()) for name in partition_cols]), flavor="hive")
+
+    if os.path.exists(parquet_dir):
+        shutil.rmtree(parquet_dir)
+    try:
+        pa_dataset.write_dataset(reader, parquet_dir, format="parquet", partitioning=partitioning,
+                                 file_options=pa_dataset.ParquetFileFormat().make_write_options(use_dictionary=True, compression="zstd"),
+                                 min_rows_per_group=PARQUET_MIN_ROWS_PER_GROUP,
+                                 existing_data_behavior="overwrite_or_ignore")
+    except pa.ArrowInvalid as e:
+        print(f"Failed to write Parquet report {parquet_dir}: {str(e)}")
+        if logger:
+            logger.error(f"Failed to write Parquet report {parquet_dir} from {csv_file}: {str(e)}")
+        return None
+    return parquet_dir
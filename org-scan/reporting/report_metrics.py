@@ -0,0 +1,84 @@
+import csv
+import os
+import sys
+from datetime import datetime
+import pandas as pd
+from reporting.merged_metrics import aggregate_report_metrics
+from utils.logger import logged_error_count
+
+def count_lines_in_file(file_path):
+    _, file_extension = os.path.splitext(file_path)
+    if file_extension == '.csv':
+        with open(file_path, 'r') as file:
+            return sum(1 for row in csv.reader(file))
+    else:
+        with open(file_path, 'r') as file:
+            return sum(1 for line in file)
+
+# Docs for analyze_merged_results
+# merged_results: the path to the merged results CSV file, or its Parquet dataset (see reporting/parquet_writer.py)
+# matches_results: the path to the matches results CSV file
+# error_file: the path to the error log file
+# repo_names_no_ghas_secrets_enabled: a list of repository names that do not have GHAS secrets scanning enabled
+# extra_metrics: (optional) dict of additional metrics added to the metrics table, like GitHub API usage (see GitHubClient.summary)
+# merged_metrics: (optional) MergedReportMetrics counted while the merged results were written, so merged_results is not read again
+# matches_count: (optional) number of rows of matches_results, so the file is not read again to count them
+# total_repos_scanned: (optional) number of repositories scanned in the run
+# logger: (optional) the error logger of the run. The errors it logged are counted instead of the lines of error_file.
+# Returns: a tuple of two DataFrames: the first is the metrics DataFrame, the second is the repo-level metrics DataFrame
+def analyze_merged_results(merged_results, 
+                           matches_results, 
+                           error_file, 
+                           repo_names_no_ghas_secrets_enabled=None,
+                           extra_metrics=None,
+                           merged_metrics=None,
+                           matches_count=None,
+                           total_repos_scanned=0,
+                           logger=None):
+    
+    if merged_metrics:
+        aggregates = merged_metrics.results()
+    else:
+        # Read in chunks, only the columns the metrics use, with the same MergedReportMetrics
+        aggregates = aggregate_report_metrics(merged_results)
+
+    # check if merged_results is empty or only has one line (header row). If true, return empty DataFrames
+    if aggregates is None or aggregates[0]['total_rows'] == 1:
+        if logger:
+            logger.error(f"ERROR: The merged results file {merged_results} is empty or only has one line (header row). No metrics will be generated.")
+        print(f"ERROR: The merged results file {merged_results} is empty or only has one line (header row). No metrics will be generated.")
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    counts, repo_metrics, detector_metrics = aggregates
+    
+    # Calculate the metrics
+    cmd_args = sys.argv
+    repos_without_ghas_secrets_scanning = len(repo_names_no_ghas_secrets_enabled) if repo_names_no_ghas_secrets_enabled else 0
+    now = datetime.now()
+    err_line_count = logged_error_count(logger)
+    if err_line_count is None:
+        err_line_count = count_lines_in_file(error_file)
+    if matches_count is not None:
+        matches_line_count = matches_count
+    else:
+        matches_line_count = count_lines_in_file(matches_results) - 1 # subtract 1 for the header row
+
+    # Create a DataFrame with the metrics
+    metric_names = ['Time of Report', 'Arguments', 'Owners', 'Scanning Source Tools', 'Total Repos Scanned', 'Total Repos with Secrets', 'Total Secrets by Source', 'Total Secrets (all tools)', 'Repos with GHAS Secrets Scanning Disabled', 'Total Distinct Secrets', 'Secret Matches Count (Experimental)', 'Total Errors in Log']
+    metric_values = [now, cmd_args, counts['owners'], counts['distinct_sources'], total_repos_scanned, counts['total_repos_with_secrets'], counts['total_secrets_by_source'], counts['total_secrets'], repos_without_ghas_secrets_scanning, counts['total_distinct_secrets'], matches_line_count, err_line_count]
+    if extra_metrics:
+        metric_names += list(extra_metrics.keys())
+        metric_values += list(extra_metrics.values())
+    metrics = pd.DataFrame({
+        'Metric': metric_names,
+        'Value': metric_values
+    })
+
+    # Add a summary row
+    summary_row = repo_metrics.sum(numeric_only=True)
+    summary_row[repo_metrics.columns[0]] = 'Summary'
+    repo_metrics = pd.concat([repo_metrics, summary_row.to_frame().T], ignore_index=True)
+    # Convert the count columns to integers. Doing a summary converts everything to floats
+    count_columns = repo_metrics.columns[1:]
+    repo_metrics[count_columns] = repo_metrics[count_columns].fillna(0).astype(int)
+
+    return metrics, repo_metrics, detector_metrics
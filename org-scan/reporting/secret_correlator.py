@@ -0,0 +1,155 @@
+import csv
+import sys
+from collections import OrderedDict
+
+csv.field_size_limit(sys.maxsize)
+
+# Findings of the same secret in the same file are the same finding when their lines are at
+# most this far apart. The tools report the start line of a multi-line secret differently.
+CORRELATION_LINE_WINDOW = 2
+
+# Directory the repositories are cloned to, trufflehog filesystem scans report paths under it
+CHECKOUT_DIR_NAME = "_checkout"
+
+CORRELATION_TOOLS = ['gitleaks', 'trufflehog', 'noseyparker', 'ghas']
+
+CORRELATED_HEADERS = ['owner', 'repo_name', 'file', 'line', 'secret', 'tools_count', 'tools',
+                      'found_by_gitleaks', 'found_by_trufflehog', 'found_by_noseyparker', 'found_by_ghas',
+                      'total_findings', 'detectors', 'lines']
+
+# Returns the path of a finding relative to the root of its repository. trufflehog reports
+# ./_checkout/<repo>/<path> for filesystem scans, gitleaks and noseyparker report paths
+# relative to the repository.
+def normalize_finding_path(path, repo_name):
+    if not path:
+        return ''
+    path = path.replace('\\', '/')
+    checkout_prefix = f"{CHECKOUT_DIR_NAME}/{repo_name}/"
+    if checkout_prefix in path:
+        path = path.split(checkout_prefix, 1)[1]
+    while path.startswith('./'):
+        path = path[2:]
+    return path.lstrip('/')
+
+def _parse_line(line):
+    try:
+        return int(float(line))
+    except (TypeError, ValueError):
+        return None
+
+# Summary
+# A group of findings of the same secret at the same place, reported by one or more tools
+class CorrelatedFinding:
+    def __init__(self, owner, repo_name, file, line, secret):
+        self.owner = owner
+        self.repo_name = repo_name
+        self.file = file
+        self.secret = secret
+        self.lines = set()
+        self.min_line = line
+        self.max_line = line
+        self.tools = set()
+        self.detectors = set()
+        self.total_findings = 0
+
+    def add(self, source, line, detector):
+        self.tools.add(source)
+        if detector:
+            self.detectors.add(f"{source}:{detector}")
+        if line is not None:
+            self.lines.add(line)
+            self.min_line = line if self.min_line is None else min(self.min_line, line)
+            self.max_line = line if self.max_line is None else max(self.max_line, line)
+        self.total_findings += 1
+
+    def covers(self, line, line_window):
+        if line is None or self.min_line is None:
+            return True
+        return self.min_line - line_window <= line <= self.max_line + line_window
+
+    def to_row(self):
+        row = {
+            'owner': self.owner,
+            'repo_name': self.repo_name,
+            'file': self.file,
+            'line': self.min_line if self.min_line is not None else '',
+            'secret': self.secret,
+            'tools_count': len(self.tools),
+            'tools': ', '.join(tool for tool in CORRELATION_TOOLS if tool in self.tools),
+            'total_findings': self.total_findings,
+            'detectors': ', '.join(sorted(self.detectors)),
+            'lines': ' '.join(str(line) for line in sorted(self.lines))
+        }
+        for tool in CORRELATION_TOOLS:
+            row[f'found_by_{tool}'] = tool in self.tools
+        return row
+
+# Summary
+# Correlates the findings of the merged report that different tools reported for the same
+# secret at the same place, in one pass over the report. Findings are indexed on
+# (owner, repo, normalized file path, secret), and a finding joins a group of the same key
+# when its line is within line_window of the group's lines. GHAS alerts have no file or
+# line, so they join the first group of the same secret in the repository, or are a group
+# of their own.
+# Works on hashed secrets, since only equal secrets are correlated.
+# Input:
+#   input_file: path to the merged report CSV file
+#   output_file: path to the correlated findings CSV file, one row per group with the tools that agree on it
+#   line_window (optional): maximum distance in lines of findings of the same group
+# Output:
+#   number of groups found by more than one tool, the "Secret Matches Count" of the report.
+#   Groups of a single tool are written too, but not counted.
+def correlate_findings(input_file, output_file, line_window=CORRELATION_LINE_WINDOW, logger=None):
+    groups_by_key = {}
+    groups_by_secret = {}
+    ghas_rows = []
+    groups = []
+
+    with open(input_file, 'r') as csv_file:
+        reader = csv.DictReader(csv_file)
+        for row in reader:
+            source = row.get('source') or ''
+            owner = row.get('owner') or ''
+            repo_name = row.get('repo_name') or ''
+            secret = row.get('secret') or ''
+            if not secret:
+                if logger:
+                    logger.error(f"Correlation: skipping a {source} finding without a secret in {owner}/{repo_name}")
+                continue
+
+            if source == 'ghas':
+                # No location, correlated once all located findings are indexed
+                ghas_rows.append((owner, repo_name, secret, row.get('detector')))
+                continue
+
+            file = normalize_finding_path(row.get('file'), repo_name)
+            line = _parse_line(row.get('line'))
+            key = (owner, repo_name, file, secret)
+
+            group = None
+            for candidate in groups_by_key.get(key, []):
+                if candidate.covers(line, line_window):
+                    group = candidate
+                    break
+            if group is None:
+                group = CorrelatedFinding(owner, repo_name, file, line, secret)
+                groups_by_key.setdefault(key, []).append(group)
+                groups_by_secret.setdefault((owner, repo_name, secret), group)
+                groups.append(group)
+            group.add(source, line, row.get('detector'))
+
+    for owner, repo_name, secret, detector in ghas_rows:
+        group = groups_by_secret.get((owner, repo_name, secret))
+        if group is None:
+            group = CorrelatedFinding(owner, repo_name, '', None, secret)
+            groups_by_secret[(owner, repo_name, secret)] = group
+            groups.append(group)
+        group.add('ghas', None, detector)
+
+    with open(output_file, 'w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CORRELATED_HEADERS)
+        writer.writeheader()
+        for group in groups:
+            writer.writerow(group.to_row())
+
+    return sum(1 for group in groups if len(group.tools) > 1)
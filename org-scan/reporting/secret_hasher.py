@@ -0,0 +1,114 @@
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Environment variable with the key of keyed (HMAC-SHA256) secret hashes. When it is not
+# set, secrets are hashed with plain SHA-256.
+HASH_KEY_ENV_VAR = "SECRETSYNTH_HASH_KEY"
+
+# Rows are hashed and written in batches of this size
+HASH_BATCH_ROWS = 1000
+
+# Values shorter than this are hashed on the calling thread. hashlib only releases the GIL
+# for large inputs, so sending short values to the pool would only add overhead.
+MIN_POOL_HASH_BYTES = 2048
+
+# Most digests kept in the cache. Some hashed columns (snippets, matches) are nearly unique,
+# so the cache keeps the most recently used values instead of growing with the report.
+HASH_CACHE_MAX_ENTRIES = 100000
+
+# Summary
+# Hashes the secrets of the merged report. The digests of the most recently used values
+# are cached, since the same secret shows up in several columns and from several tools,
+# and many of the hashed columns are empty. Values are hashed a batch at a time, and
+# large values are spread over a thread pool.
+# With a key the hashes are HMAC-SHA256, so they can't be looked up in a precomputed table
+# of known secrets. The same key gives the same hashes, so reports stay comparable across runs.
+# Input:
+#   key (optional): bytes or str key for HMAC-SHA256, None for plain SHA-256
+#   workers (optional): number of hashing threads
+#   cache_size (optional): most digests kept in the cache
+class SecretHasher:
+    def __init__(self, key=None, workers=1, cache_size=HASH_CACHE_MAX_ENTRIES):
+        if isinstance(key, str):
+            key = key.encode()
+        self.key = key
+        self.workers = workers
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def _digest(self, value):
+        if self.key:
+            return hmac.new(self.key, value.encode(), hashlib.sha256).hexdigest()
+        return hashlib.sha256(value.encode()).hexdigest()
+
+    # Returns a dict of value to hash for all values, hashing the ones not cached yet.
+    # The result is deterministic, but not reversible.
+    def hash_many(self, values):
+        result = {}
+        missing = set()
+        with self._lock:
+            for value in values:
+                digest = self._cache.get(value)
+                if digest is None:
+                    missing.add(value)
+                else:
+                    self._cache.move_to_end(value)
+                    result[value] = digest
+
+        if self._executor:
+            large = [value for value in missing if len(value) >= MIN_POOL_HASH_BYTES]
+            small = [value for value in missing if len(value) < MIN_POOL_HASH_BYTES]
+            digests = dict(zip(large, self._executor.map(self._digest, large)))
+        else:
+            small = missing
+            digests = {}
+        digests.update((value, self._digest(value)) for value in small)
+
+        result.update(digests)
+        with self._lock:
+            self._cache.update(digests)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+# Summary
+# Wraps a csv.DictWriter and replaces the values of hashed_fields with their hash before
+# the rows are written. Rows are buffered and hashed a batch at a time. Call flush() once
+# all rows are written.
+# Input:
+#   writer: csv.DictWriter to write the rows to
+#   hasher: SecretHasher
+#   hashed_fields: fields to hash, an empty list writes the rows as they are
+class HashingRowWriter:
+    def __init__(self, writer, hasher, hashed_fields, batch_size=HASH_BATCH_ROWS):
+        self.writer = writer
+        self.hasher = hasher
+        self.hashed_fields = hashed_fields
+        self.batch_size = batch_size
+        self._rows = []
+
+    def writerow(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        if self.hashed_fields:
+            values = {row.get(field) or '' for row in self._rows for field in self.hashed_fields}
+            digests = self.hasher.hash_many(values)
+            for row in self._rows:
+                for field in self.hashed_fields:
+                    row[field] = digests[row.get(field) or '']
+        self.writer.writerows(self._rows)
+        self._rows = []
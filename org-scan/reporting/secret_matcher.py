@@ -1,36 +1,140 @@
-from fuzzywuzzy import fuzz
 import csv
+import sys
+from collections import OrderedDict
+
+# rapidfuzz is optional. It scores a batch of secrets against all the keys of a repo in one
+# multi-core call. Without it, secrets are scored one by one with fuzzywuzzy.
+try:
+    import numpy as np
+    from rapidfuzz import fuzz as rapidfuzz_fuzz
+    from rapidfuzz import process as rapidfuzz_process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+from fuzzywuzzy import fuzz
+
+csv.field_size_limit(sys.maxsize)
+
+# Distinct secrets of a repo scored against the keys of the repo in one call
+MATCH_BATCH_SECRETS = 512
+
+# fuzzywuzzy rounds the ratio to an integer before it is compared to the fuzz factor
+def _is_match(score, fuzz_factor):
+    return int(round(score)) > fuzz_factor
+
+# Summary
+# Resolves the distinct secrets of one owner/repo, in order of first appearance, to the key
+# of the match they are counted in. A secret is counted in the first key (in order of
+# creation) it fuzzy matches, or becomes a new key. Since the keys of a repo only grow,
+# every row with the same secret resolves to the same key, so each distinct secret is
+# only scored once.
+# Input:
+#   secrets: distinct secrets of the repo, in order of first appearance
+#   fuzz_factor: minimum fuzz ratio (exclusive) of a match
+#   workers: threads used by rapidfuzz, -1 for all cores
+# Output:
+#   dict of secret to the key it is counted in
+def resolve_match_keys(secrets, fuzz_factor, workers=-1):
+    keys = []
+    resolved = {}
+
+    for batch_start in range(0, len(secrets), MATCH_BATCH_SECRETS):
+        batch = secrets[batch_start:batch_start + MATCH_BATCH_SECRETS]
+
+        if not RAPIDFUZZ_AVAILABLE:
+            for secret in batch:
+                target = None
+                for key in keys:
+                    if _is_match(fuzz.ratio(secret, key), fuzz_factor):
+                        target = key
+                        break
+                if target is None:
+                    target = secret
+                    keys.append(secret)
+                resolved[secret] = target
+            continue
+
+        # Scores of the batch against the keys of the earlier batches, and against itself
+        # for the keys created within the batch
+        scores = None
+        if keys:
+            scores = rapidfuzz_process.cdist(batch, keys, scorer=rapidfuzz_fuzz.ratio, dtype=np.float64, workers=workers)
+        batch_scores = rapidfuzz_process.cdist(batch, batch, scorer=rapidfuzz_fuzz.ratio, dtype=np.float64, workers=workers)
+        batch_keys = []
+
+        for i, secret in enumerate(batch):
+            target = None
+            if scores is not None:
+                matching = np.flatnonzero(np.rint(scores[i]) > fuzz_factor)
+                if len(matching):
+                    target = keys[matching[0]]
+            if target is None and batch_keys:
+                matching = np.flatnonzero(np.rint(batch_scores[i, batch_keys]) > fuzz_factor)
+                if len(matching):
+                    target = batch[batch_keys[matching[0]]]
+            if target is None:
+                target = secret
+                batch_keys.append(i)
+            resolved[secret] = target
+
+        keys.extend(batch[i] for i in batch_keys)
+
+    return resolved
+
+# Summary
+# Writes a report of the secrets of the merged report that fuzzy match each other within the
+# same owner/repo, one row per match with the number of rows that matched (total_matches)
+# and the tools that found it (tools_matched_on).
+# Rows are grouped by owner/repo before any secret is scored, and each distinct secret of a
+# repo is only scored once (see resolve_match_keys).
+# Input:
+#   input_file: path to the merged report CSV file
+#   output_file: path to the matches report CSV file
+#   fuzz_factor: minimum fuzz ratio (exclusive) of a match
+#   workers (optional): threads used to score secrets, -1 for all cores
+# Output:
+#   number of matches written
+def find_matches(input_file, output_file, fuzz_factor, workers=-1):
+    # First row of every (owner, repo, secret), and the sources of every row, in file order
+    first_rows = OrderedDict()
+    secrets_by_repo = OrderedDict()
+    row_sources = []
 
-def find_matches(input_file, output_file, fuzz_factor):
     with open(input_file, 'r') as csv_file:
         reader = csv.DictReader(csv_file)
-        matches = {}
-
         for row in reader:
-            secret = row['secret']
-            owner = row['owner']  
-            repo = row['repo_name']
-            source = row['source'] 
-
-            # Perform fuzzy matching operation on the 'secret' value
-            for key in matches.keys():
-                if fuzz.ratio(secret, key) > fuzz_factor and matches[key]['owner'] == owner and matches[key]['repo_name'] == repo:
-                    # Update the existing row
-                    matches[key]['total_matches'] += 1
-                    matches[key]['tools_matched_on'].add(source)
-                    break
-            else:
-                # Add a new row
-                row['total_matches'] = 1
-                row['tools_matched_on'] = {source}
-                matches[secret] = row
+            secret = row['secret'] or ''
+            repo_key = (row['owner'], row['repo_name'])
+            row_key = repo_key + (secret,)
+            if row_key not in first_rows:
+                first_rows[row_key] = row
+                secrets_by_repo.setdefault(repo_key, []).append(secret)
+            row_sources.append((row_key, row['source']))
+
+    resolved = {}
+    for repo_key, secrets in secrets_by_repo.items():
+        for secret, target in resolve_match_keys(secrets, fuzz_factor, workers).items():
+            resolved[repo_key + (secret,)] = repo_key + (target,)
+
+    # Count the rows of every match, in order of first appearance
+    matches = OrderedDict()
+    for row_key, source in row_sources:
+        target = resolved[row_key]
+        if target in matches:
+            matches[target]['total_matches'] += 1
+            matches[target]['tools_matched_on'].add(source)
+        else:
+            row = dict(first_rows[target])
+            row['total_matches'] = 1
+            row['tools_matched_on'] = {source}
+            matches[target] = row
 
     fieldnames = reader.fieldnames
     # Rearrange the fieldnames to make 'total_matches' the 5th column
     if 'total_matches' in fieldnames:
         fieldnames.remove('total_matches')
     fieldnames.insert(4, 'total_matches')
-    
+
     # Move 'tools_matched_on' column to the 6th column
     if 'tools_matched_on' in fieldnames:
         fieldnames.remove('tools_matched_on')
@@ -42,3 +146,5 @@ def find_matches(input_file, output_file, fuzz_factor):
         for row in matches.values():
             row['tools_matched_on'] = ', '.join(row['tools_matched_on'])  # Use 'tools_matched_on' instead of 'tools'
             writer.writerow(row)
+
+    return len(matches)
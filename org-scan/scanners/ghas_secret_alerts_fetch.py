@@ -1,15 +1,28 @@
-import requests
 import csv
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from utils.github_client import GitHubClient, GITHUB_API_URL
 
 verbose_logging = False
 
-def fetch_repos(account_type, account, headers, logger=None, page=1, per_page=100):
+# Default number of GitHub API requests in flight at the same time
+GHAS_MAX_CONCURRENT_REQUESTS = 16
+
+GHAS_ALERTS_FIELDNAMES = ['repo', 'rule', 'owner', 'number', 'created_at', 'updated_at', 'url', 'html_url', 'locations_url', 'state', 'secret_type', 
+                          'secret_type_display_name', 'secret', 'validity', 'resolution', 'resolved_by', 'resolved_at', 
+                          'resolution_comment', 'push_protection_bypassed', 'push_protection_bypassed_by', 
+                          'push_protection_bypassed_at']
+
+# github_client (optional) is the utils.github_client.GitHubClient shared by the run
+def fetch_repos(account_type, account, headers, logger=None, page=1, per_page=100, github_client=None):
+    github_client = github_client or GitHubClient(headers)
     repos = []
     while True:
-        repos_url = f'https://api.github.com/{account_type}/{account}/repos?page={page}&per_page={per_page}'
+        repos_url = f'{GITHUB_API_URL}/{account_type}/{account}/repos?page={page}&per_page={per_page}'
         if verbose_logging:
             print(f"Calling {repos_url}...")
-        response = requests.get(repos_url, headers=headers)
+        response = github_client.get(repos_url)
         data = response.json()
         
         # Check if data is a dictionary containing an error message
@@ -26,12 +39,187 @@ def fetch_repos(account_type, account, headers, logger=None, page=1, per_page=10
     
     return repos
 
+# Returns the CSV row of one secret scanning alert
+def alert_to_row(owner, repo_name, alert):
+    return {
+        'repo': repo_name,
+        'rule': alert['secret_type'],  # Use 'secret_type' instead of 'rule'
+        'owner': owner,  # org or user
+        'number': alert['number'],
+        'created_at': alert['created_at'],
+        'updated_at': alert['updated_at'],
+        'url': alert['url'],
+        'html_url': alert['html_url'],
+        'locations_url': alert['locations_url'],
+        'state': alert['state'],
+        'secret_type': alert['secret_type'],
+        'secret_type_display_name': alert['secret_type_display_name'],
+        'secret': alert['secret'],
+        'validity': alert['validity'],
+        'resolution': alert['resolution'],
+        'resolved_by': alert['resolved_by'],
+        'resolved_at': alert['resolved_at'],
+        'resolution_comment': alert['resolution_comment'],
+        'push_protection_bypassed': alert['push_protection_bypassed'],
+        'push_protection_bypassed_by': alert['push_protection_bypassed_by'],
+        'push_protection_bypassed_at': alert['push_protection_bypassed_at']
+    }
+
+# Summary
+# Asyncio client for the secret scanning alerts of many repos. The blocking GitHubClient calls
+# run on a thread pool, and a semaphore bounds the number of requests in flight. Every repo
+# follows the 'next' links of its alert pages, and rows are written as each page arrives.
+class GhasAlertsClient:
+    def __init__(self, github_client, writer, max_concurrent_requests=GHAS_MAX_CONCURRENT_REQUESTS, logger=None, inventory=None):
+        self.github_client = github_client
+        self.writer = writer
+        self.max_concurrent_requests = max_concurrent_requests
+        self.logger = logger
+        self.inventory = inventory
+        self.repos_secret_scanning_disabled = []
+
+    async def _get(self, url):
+        async with self._semaphore:
+            return await self._loop.run_in_executor(self._executor, self.github_client.get, url)
+
+    # Repos of the owner from the run's repo inventory, or from the API when there is none
+    async def fetch_owner_repos(self, owner_type, owner):
+        if self.inventory and self.inventory.has_owner(owner):
+            return self.inventory.repos(owner)
+        async with self._semaphore:
+            return await self._loop.run_in_executor(self._executor, functools.partial(fetch_repos, owner_type, owner, self.github_client.headers, logger=self.logger, github_client=self.github_client))
+
+    async def fetch_repo_alerts(self, owner, repo):
+        # https://docs.github.com/en/rest/secret-scanning/secret-scanning?apiVersion=2022-11-28#list-secret-scanning-alerts-for-a-repository
+        url = f'{GITHUB_API_URL}/repos/{owner}/{repo["name"]}/secret-scanning/alerts?per_page=100'
+        while url:
+            if verbose_logging:
+                print(f"Calling {url} ...")
+
+            alerts_response = await self._get(url)
+            alerts = alerts_response.json()
+
+            # if verbose and alert, print the alerts for the repo
+            if verbose_logging:
+                print(f"Alerts for {owner}/{repo['name']}: {alerts}")
+
+            # Check if message contains {'message': 'Resource not accessible by personal access token'} 
+            if isinstance(alerts, dict) and 'message' in alerts and alerts['message'] == 'Resource not accessible by personal access token':
+                print(f"ERROR: Invalid Person Access Token. Cannot fetch security alerts for {repo['name']}: {alerts['message']}")
+                if self.logger:
+                    self.logger.error(f"ERROR: Invalid Github Person Access Token. Cannot fetch security alerts for {repo['name']}: {alerts['message']}")
+                return
+
+            # If the response is a dictionary with a 'message' key, skip this repo
+            if isinstance(alerts, dict) and 'message' in alerts:
+                if verbose_logging:
+                    print(f"Skipping {repo['name']}: {alerts['message']}")
+
+                if alerts['message'] == 'Secret scanning is disabled on this repository.':
+                    self.repos_secret_scanning_disabled.append(repo)
+                    if self.logger:
+                        self.logger.info(f"GHAS Secret scanning is disabled on repository: {repo['name']}")
+                return
+
+            # Write each alert of this page to the CSV file. The event loop runs
+            # in one thread, so rows from different repos never interleave.
+            for alert in alerts:
+                self.writer.writerow(alert_to_row(owner, repo['name'], alert))
+
+            url = alerts_response.links.get('next', {}).get('url')
+
+    async def fetch_owner_alerts(self, owner_type, owner):
+        repos = await self.fetch_owner_repos(owner_type, owner)
+
+        # If verbose logging enabled, print the list of repos names only and the total number of repos
+        if verbose_logging:
+            print(f"List of repos for {owner}: {', '.join([repo['name'] for repo in repos])}")
+            print(f"Total number of repos to get GHAS Security Alerts for {owner}: {len(repos)}")
+
+        await asyncio.gather(*[self.fetch_repo_alerts(owner, repo) for repo in repos])
+
+    # Fetches the alerts of all repos of an org from the org-wide endpoint, following its
+    # cursor pages. Only the alerts of the repos of the run (the inventory, which follows
+    # --repos-internal-type) are kept, and they are written once the last page arrived.
+    # Repos without alerts are then checked for disabled secret scanning from their
+    # security_and_analysis metadata, and only repos where that is not visible to the
+    # token get a per-repo call. Falls back to per-repo calls for every repo, with the
+    # alerts of the pages read so far dropped, if the org endpoint is not available.
+    async def fetch_org_alerts(self, org):
+        repos = await self.fetch_owner_repos("orgs", org)
+        repo_names = set(repo['name'] for repo in repos)
+        repos_with_alerts = set()
+        rows = []
+
+        # https://docs.github.com/en/rest/secret-scanning/secret-scanning?apiVersion=2022-11-28#list-secret-scanning-alerts-for-an-organization
+        url = f'{GITHUB_API_URL}/orgs/{org}/secret-scanning/alerts?per_page=100'
+        while url:
+            if verbose_logging:
+                print(f"Calling {url} ...")
+
+            alerts_response = await self._get(url)
+            alerts = alerts_response.json()
+
+            if isinstance(alerts, dict) and 'message' in alerts:
+                print(f"WARNING: Cannot fetch org-level secret scanning alerts for {org}: {alerts['message']}. Fetching alerts per repository.")
+                if self.logger:
+                    self.logger.error(f"ERROR: Cannot fetch org-level secret scanning alerts for {org}: {alerts['message']}")
+                await asyncio.gather(*[self.fetch_repo_alerts(org, repo) for repo in repos])
+                return
+
+            for alert in alerts:
+                repo_name = alert['repository']['name']
+                if repo_name not in repo_names:
+                    continue
+                repos_with_alerts.add(repo_name)
+                rows.append(alert_to_row(org, repo_name, alert))
+
+            url = alerts_response.links.get('next', {}).get('url')
+
+        self.writer.writerows(rows)
+
+        repos_to_check = []
+        for repo in repos:
+            if repo['name'] in repos_with_alerts:
+                continue
+            status = ((repo.get('security_and_analysis') or {}).get('secret_scanning') or {}).get('status')
+            if status == 'disabled':
+                self.repos_secret_scanning_disabled.append(repo)
+                if self.logger:
+                    self.logger.info(f"GHAS Secret scanning is disabled on repository: {repo['name']}")
+            elif status is None:
+                repos_to_check.append(repo)
+
+        if verbose_logging:
+            print(f"{len(repos_with_alerts)} repos of {org} have alerts, checking {len(repos_to_check)} repos per repository")
+
+        await asyncio.gather(*[self.fetch_repo_alerts(org, repo) for repo in repos_to_check])
+
+    # use_org_alerts_endpoint fetches the alerts of orgs with fetch_org_alerts
+    async def fetch_all(self, owner_type, owners, use_org_alerts_endpoint=False):
+        self._loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as self._executor:
+            if use_org_alerts_endpoint and owner_type == "orgs":
+                await asyncio.gather(*[self.fetch_org_alerts(owner) for owner in owners])
+            else:
+                await asyncio.gather(*[self.fetch_owner_alerts(owner_type, owner) for owner in owners])
+        return self.repos_secret_scanning_disabled
+
 # Returns a list of repos where secret scanning is disabled
+# max_concurrent_requests (optional) bounds the number of GitHub API requests in flight
+# github_client (optional) is the utils.github_client.GitHubClient shared by the run
+# use_org_alerts_endpoint (optional) uses the org-wide alerts endpoint for orgs, see GhasAlertsClient.fetch_org_alerts
+# inventory (optional) is the utils.repo_inventory.RepoInventory of the run, so the repo lists are not fetched again
 def fetch_ghas_secret_scanning_alerts(owner_type, 
                                       owners, headers, 
                                       report_name, 
                                       dry_run=False, 
-                                      logger=None):
+                                      logger=None,
+                                      max_concurrent_requests=GHAS_MAX_CONCURRENT_REQUESTS,
+                                      github_client=None,
+                                      use_org_alerts_endpoint=False,
+                                      inventory=None):
     
     if dry_run:
         print(f"dry-run: Calling Github REST API for all repos under orgs: {owners}")
@@ -39,87 +227,9 @@ def fetch_ghas_secret_scanning_alerts(owner_type,
 
     # Open the CSV file
     with open(report_name, 'w', newline='') as csvfile:
-        fieldnames = ['repo', 'rule', 'owner', 'number', 'created_at', 'updated_at', 'url', 'html_url', 'locations_url', 'state', 'secret_type', 
-                  'secret_type_display_name', 'secret', 'validity', 'resolution', 'resolved_by', 'resolved_at', 
-                  'resolution_comment', 'push_protection_bypassed', 'push_protection_bypassed_by', 
-                  'push_protection_bypassed_at']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        repos_secret_scanning_disabled = []
-
+        writer = csv.DictWriter(csvfile, fieldnames=GHAS_ALERTS_FIELDNAMES)
         writer.writeheader()
-        for owner in owners:
-            repos = fetch_repos(owner_type, owner, headers, logger=logger)
-            # For each repo, get the secret scanning alerts
-
-            # If verbose logging enabled, print the list of repos names only and the total number of repos
-            if verbose_logging:
-                print(f"List of repos for {owner}: {', '.join([repo['name'] for repo in repos])}")
-                print(f"Total number of repos to get GHAS Security Alerts for {owner}: {len(repos)}")
-
-            for repo in repos:
-                
-                # If verbose logging enabled, print the repo name
-                if verbose_logging:
-                    print(f"****************Getting GHAS Security Alerts for {owner}/{repo['name']}")
-
-                if verbose_logging:
-                    print(f"Calling https://api.github.com/repos/{owner}/{repo['name']}/secret-scanning/alerts ...")
-
-                # https://docs.github.com/en/rest/secret-scanning/secret-scanning?apiVersion=2022-11-28#list-secret-scanning-alerts-for-a-repository
-                alerts_response = requests.get(f'https://api.github.com/repos/{owner}/{repo["name"]}/secret-scanning/alerts', headers=headers)
-                alerts = alerts_response.json()
-
-                # if verbose and alert, print the alerts for the repo
-                if verbose_logging:
-                    print(f"Alerts for {owner}/{repo['name']}: {alerts}")
-
-                # Check if message contains {'message': 'Resource not accessible by personal access token'} 
-                if isinstance(alerts, dict) and 'message' in alerts and alerts['message'] == 'Resource not accessible by personal access token':
-                    print(f"ERROR: Invalid Person Access Token. Cannot fetch security alerts for {repo['name']}: {alerts['message']}")
-                    if logger:
-                        logger.error(f"ERROR: Invalid Github Person Access Token. Cannot fetch security alerts for {repo['name']}: {alerts['message']}")
-                    continue
-
-                # If the response is a dictionary with a 'message' key, skip this iteration
-                if isinstance(alerts, dict) and 'message' in alerts:
-                    if verbose_logging:
-                       print(f"Skipping {repo['name']}: {alerts['message']}")
-                       
-                    if 'message' in alerts and alerts['message'] == 'Secret scanning is disabled on this repository.':
-                        repos_secret_scanning_disabled.append(repo)
-                        if logger:
-                            logger.info(f"GHAS Secret scanning is disabled on repository: {repo['name']}")
-                    continue
 
-                # Write each alert to the CSV file
-                for alert in alerts:
-
-                    # if verbose, print the row to be written to the CSV file
-                    # if verbose_logging:
-                    #     print(f"Alert found: {alert}")
-
-                    writer.writerow({
-                        'repo': repo['name'],
-                        'rule': alert['secret_type'],  # Use 'secret_type' instead of 'rule'
-                        'owner': owner,  # org or user
-                        'number': alert['number'],
-                        'created_at': alert['created_at'],
-                        'updated_at': alert['updated_at'],
-                        'url': alert['url'],
-                        'html_url': alert['html_url'],
-                        'locations_url': alert['locations_url'],
-                        'state': alert['state'],
-                        'secret_type': alert['secret_type'],
-                        'secret_type_display_name': alert['secret_type_display_name'],
-                        'secret': alert['secret'],
-                        'validity': alert['validity'],
-                        'resolution': alert['resolution'],
-                        'resolved_by': alert['resolved_by'],
-                        'resolved_at': alert['resolved_at'],
-                        'resolution_comment': alert['resolution_comment'],
-                        'push_protection_bypassed': alert['push_protection_bypassed'],
-                        'push_protection_bypassed_by': alert['push_protection_bypassed_by'],
-                        'push_protection_bypassed_at': alert['push_protection_bypassed_at']
-                    })
-
-            return repos_secret_scanning_disabled
\ No newline at end of file
+        github_client = github_client or GitHubClient(headers, pool_size=max_concurrent_requests)
+        client = GhasAlertsClient(github_client, writer, max_concurrent_requests, logger, inventory)
+        return asyncio.run(client.fetch_all(owner_type, owners, use_org_alerts_endpoint))
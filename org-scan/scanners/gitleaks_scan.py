@@ -1,105 +1,126 @@
-import subprocess
-import glob
+import contextlib
+import csv
+import json
 import os
-import pandas as pd
+from utils.tracing import run_traced
 
+# Columns of the gitleaks report of a run: the owner and repository of the finding, then the
+# columns of the gitleaks CSV report format
+GITLEAKS_REPORT_COLUMNS = ['Owner', 'Repository', 'RuleID', 'Commit', 'File', 'SymlinkFile', 'Secret', 'Match',
+                           'StartLine', 'EndLine', 'StartColumn', 'EndColumn', 'Author', 'Message', 'Date',
+                           'Email', 'Fingerprint', 'Tags']
+
+# Path of the gitleaks JSON report of one repository. It only exists until its findings
+# are appended to the report of the run.
+def gitleaks_report_path(report_output_dir, target, repo_name):
+    return f"{report_output_dir}/gitleaks_findings_{target}_{repo_name}.json"
+
+# Returns the report row of one finding of the gitleaks JSON report
+def gitleaks_finding_to_row(target, repo_name, finding):
+    row = {name: finding.get(name, '') for name in GITLEAKS_REPORT_COLUMNS}
+    row['Owner'] = target
+    row['Repository'] = repo_name
+    # gitleaks joins the tags with spaces in its CSV format
+    if isinstance(row['Tags'], list):
+        row['Tags'] = ' '.join(row['Tags'])
+    return row
+
+# Appends rows to a gitleaks report, with a header row if the report is new or empty
+def _append_report_rows(report_filename, rows, report_lock):
+    with report_lock or contextlib.nullcontext():
+        write_header = not os.path.exists(report_filename) or os.stat(report_filename).st_size == 0
+        with open(report_filename, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=GITLEAKS_REPORT_COLUMNS, extrasaction='ignore', lineterminator='\n')
+            if write_header:
+                writer.writeheader()
+            writer.writerows(rows)
+
+# Summary
+# Appends the findings of a gitleaks report of one repository (a gitleaks JSON report, or a
+# CSV file with the gitleaks report columns) to report_filename, with the owner and
+# repository of every row set to target and repo_name.
+# Input:
+#   report_lock (optional): lock held while appending, for when several repos are scanned in parallel
+# Output:
+#   number of findings appended
+def append_gitleaks_findings(target, repo_name, findings_file, report_filename, report_lock=None, logger=None):
+    if not os.path.exists(findings_file) or os.stat(findings_file).st_size == 0:
+        return 0
+    try:
+        with open(findings_file, 'r', newline='') as f:
+            if findings_file.endswith('.json'):
+                rows = [gitleaks_finding_to_row(target, repo_name, finding) for finding in json.load(f)]
+            else:
+                rows = [gitleaks_finding_to_row(target, repo_name, row) for row in csv.DictReader(f)]
+    except (ValueError, csv.Error) as e:
+        print(f"Error reading gitleaks report: {findings_file}")
+        if logger:
+            logger.error(f"Error reading gitleaks report {findings_file} of {target}/{repo_name}: {str(e)}")
+        return 0
+    if rows:
+        _append_report_rows(report_filename, rows, report_lock)
+    return len(rows)
 
 # Summary of this function:
-# Run gitleaks in each repository. See
+# Run gitleaks in each repository. gitleaks writes a JSON report of the repository, and
+# its findings are appended to report_filename as soon as the scan is done (see append_gitleaks_findings).
 #
 # Parameters:
 # target is the owner of the repository
 # repo_name is the name of the repository
 # repo_path is the path, relative to this script, to the repository
-# report_output_dir is the path, relative to this script, to the report file
+# report_output_dir is the path, relative to this script, to the directory of the JSON report of the repository
+# report_filename is the path, relative to this script, to the gitleaks report the findings are appended to
 # dry_run (optional, default=False) is a boolean that indicates whether or not to actually run the scan
 # logger (optional, default=None) is a logger object to use for error logging
+# log_opts (optional, default=None) is passed to gitleaks --log-opts to limit the scan to a range of commits
+# report_lock (optional, default=None) is a lock held while appending to report_filename, for when several repos are scanned in parallel
+# Returns True if gitleaks completed (with or without findings), False otherwise
 def do_gitleaks_scan(target, 
                      repo_name, 
                      repo_path, 
                      report_output_dir, 
+                     report_filename,
                      dry_run=False, 
-                     logger=None):
+                     logger=None,
+                     log_opts=None,
+                     report_lock=None):
     # Run gitleaks in each repository. See https://github.com/gitleaks/gitleaks?tab=readme-ov-file#usage
     print(f"Running gitleaks on {repo_path} ...")
+    json_report = gitleaks_report_path(report_output_dir, target, repo_name)
     command = [
         "gitleaks",
         "detect",
         "-f", # --report-format string
-        "csv",
+        "json",
         "-r", # --report-path string
-        f"{report_output_dir}/gitleaks_findings_{target}_{repo_name}.csv",
+        json_report,
         "--source",
         f"{repo_path}",
         "-c", # --config string
         "./.gitleaks.toml", 
         #"-v"
     ]
+    if log_opts:
+        command += ["--log-opts", log_opts]
     print("gitleaks command:", " ".join(command))
     if not dry_run:
-        result = subprocess.run(command, capture_output=True, text=True, check=False)
+        result = run_traced(command, capture_output=True, text=True, check=False)
         print(result.stdout)
         #print(result.stderr)
 
         if result.returncode != 0:
             print(f"gitleaks command returned non-zero exit status {result.returncode}")
 
-# Function to concatenate CSV files
-def concatenate_gitleaks_csv_files(gitleaks_report_filename, gitleaks_report_dir, logger=None):
-    # Get a list of all CSV files in the {GITLEAKS_REPORTS_DIR} directory
-    csv_files = glob.glob(f'{gitleaks_report_dir}/*.csv')
-
-    # Create a list to hold DataFrames
-    df_list = []
-
-    # Loop through the list of CSV files
-    for csv_file in csv_files:
-        # Check if the CSV file is empty
-        if os.stat(csv_file).st_size == 0:
-            print(f"Skipping empty file: {csv_file}")
-            continue
-
-        # Extract the base name of the file
-        base_name = os.path.basename(csv_file)
-        # Extract the repository name from the base name. The repo name is the last part of the file name between the last '_' and '.'
-        repo_name = base_name.split('_')[-1].split('.')[0]
-        
-        # get the repo owner name. In the base file name, this is the 3rd token in the file name delimited by '_'
-        repo_owner = base_name.split('_')[2]
-
-        # Read the CSV file into a DataFrame
-        try:
-            df = pd.read_csv(csv_file)
-        except pd.errors.ParserError as e:
-            print(f"Error reading CSV file: {csv_file}")
-            if logger:
-                logger.error(f"Error reading CSV file: {csv_file}")
-            print(e)
-            continue
-        # Prepend a new column with the repository name
-        df.insert(0, 'Owner', repo_owner)
-        df.insert(1, 'Repository', repo_name)
-
-        #print(f"dry-run: Reading {csv_file}...")
-
-        # Read each non-empty CSV file into a DataFrame and append it to the list
         try:
-            df_list.append(df)
-        except pd.errors.EmptyDataError:
-            print(f"Error: Empty CSV file: {csv_file}")
-            if logger:
-                logger.error(f"Error: Empty CSV file: {csv_file}")
-
-    concatenated_df = pd.DataFrame()
-
-    # Concatenate all the DataFrames in the list
-    if df_list:
-        concatenated_df = pd.concat(df_list, ignore_index=True)
-
-    # Check if concatenated_df is empty
-    if concatenated_df.empty:
-        print(f"WARNING: No results to write to {gitleaks_report_filename}")
-    else:
-        # Write the concatenated DataFrame to a new CSV file
-        print(f"Writing concatenated CSV file to ./{gitleaks_report_filename}...")
-        concatenated_df.to_csv(f"{gitleaks_report_filename}", index=False)
\ No newline at end of file
+            # gitleaks exits with 1 when it finds leaks
+            if result.returncode not in (0, 1):
+                if logger:
+                    logger.error(f"gitleaks error on {target}/{repo_name}: {result.stderr}")
+                return False
+            append_gitleaks_findings(target, repo_name, json_report, report_filename, report_lock, logger)
+            return True
+        finally:
+            # The JSON report holds the secrets in plain text
+            if os.path.exists(json_report):
+                os.remove(json_report)
@@ -1,8 +1,21 @@
 
 import subprocess
-import pandas as pd
+import csv
 import json
 import os
+import tempfile
+from utils.tracing import TracedPopen, run_traced
+
+# Columns written to the noseyparker CSV report. The report is built from one
+# datastore per repo, so the columns are fixed up front to keep the appended
+# chunks aligned with the header.
+NOSEYPARKER_CSV_COLUMNS = ['provenance', 'blob_id', 'capture_group_index', 'match_content', 'rule_name',
+                           'blob_metadata.id', 'blob_metadata.num_bytes', 'blob_metadata.mime_essence', 'blob_metadata.charset',
+                           'location.offset_span.start', 'location.offset_span.end',
+                           'location.source_span.start.line', 'location.source_span.start.column',
+                           'location.source_span.end.line', 'location.source_span.end.column',
+                           'snippet.before', 'snippet.matching', 'snippet.after',
+                           'owner', 'blob_path', 'repo_path']
 
 # This is potentially pretty brittle.
 # The noseyparker json is not fun to work with.
@@ -63,66 +76,106 @@ def extract_paths_from_provenance(provenance, logger=None):
     
     return blob_path, repo_path
 
-def json_to_csv(owner, json_data, csv_file_path, logger=None):
-    # Load json data
-    data = json.loads(json_data)
-
-    # Add owner to each record and parse provenance
-    for record in data:
-        record['owner'] = owner
-        if 'provenance' in record['matches'][0]:
-            record['blob_path'], record['repo_path'] = extract_paths_from_provenance(record['matches'][0]['provenance'], logger)
-
-    # Flatten json data
-    flat_data = pd.json_normalize(data, record_path=['matches'], 
-                                  meta=['owner', 'blob_path', 'repo_path'], 
-                                  errors='ignore')
-
-    # Write to csv
-    flat_data.to_csv(csv_file_path, index=False)
-
-
+# Flattens a nested dict into dotted keys, like pd.json_normalize does
+# ({'location': {'offset_span': {'start': 1}}} -> {'location.offset_span.start': 1})
+def flatten_match(match, prefix=''):
+    flat = {}
+    for key, value in match.items():
+        if isinstance(value, dict):
+            flat.update(flatten_match(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+# Appends the matches of a noseyparker jsonl report to csv_file_path, one finding per
+# line of json_lines (any iterable of lines, like a subprocess pipe). Each match is
+# flattened and written as it is read, so memory does not grow with the report size.
+# The header is only written when the file is empty.
+def json_to_csv(owner, json_lines, csv_file_path, logger=None):
+    write_header = not os.path.exists(csv_file_path) or os.stat(csv_file_path).st_size == 0
+    with open(csv_file_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=NOSEYPARKER_CSV_COLUMNS, restval='', extrasaction='ignore', lineterminator='\n')
+        if write_header:
+            writer.writeheader()
+
+        for line in json_lines:
+            if not line.strip():
+                continue
+            try:
+                finding = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Unexpected output from NoseyParker report: {line}")
+                if logger:
+                    logger.error(f"NoseyParker report: could not parse line: {line}")
+                continue
+
+            for match in finding.get('matches', []):
+                row = flatten_match(match)
+                row['owner'] = owner
+                if 'provenance' in match:
+                    row['blob_path'], row['repo_path'] = extract_paths_from_provenance(match['provenance'], logger)
+                writer.writerow(row)
+
+
+# Each repo is scanned into its own datastore, {np_datastore_path}/{owner}/{repo_name},
+# so scans of different repos can run at the same time without sharing a datastore.
+# A datastore that is kept between runs (see --incremental) still holds the findings of the earlier scans.
+# threads (optional) is the number of noseyparker scanner threads (--jobs). Uses the noseyparker default if None.
+# Returns True if noseyparker completed, False otherwise
 def do_noseyparker_scan(owner, 
                         repo_name, 
                         repo_path, 
                         np_datastore_path,
                         dry_run,
-                        logger=None):
+                        logger=None,
+                        threads=None):
     
-    command = f"noseyparker scan {repo_path} --datastore {np_datastore_path}"
+    np_datastore_path_with_repo = f"{np_datastore_path}/{owner}/{repo_name}"
+    command_args = ["noseyparker", "scan", repo_path, "--datastore", np_datastore_path_with_repo]
+    if threads:
+        command_args += ["--jobs", str(threads)]
+    command = " ".join(command_args)
     print(f"Running NoseyParker on owner/repo: {owner}/{repo_name}, with command: {command}")
     
     if dry_run:
         print(f"dry-run: {command}")
         return
 
-    np_datastore_path_with_owner = f"{np_datastore_path}/{owner}"
-
-    result = subprocess.run(["noseyparker", "scan", repo_path, "--datastore", np_datastore_path_with_owner], capture_output=True, text=True)
+    result = run_traced(command_args, capture_output=True, text=True)
 
     if result.returncode != 0:
         print("Unexpected error running NoseyParker. Please check the error log file for details.")
-        logger.error(f"NoseyParker error: {result}")
-        return
+        if logger:
+            logger.error(f"NoseyParker error: {result}")
+        return False
 
-import subprocess
+    return True
 
-def run_noseyparker_report(owner, np_datastore_path, np_report_filename, logger=None):
+# Appends the findings of every repo datastore of the owner to np_report_filename.
+# repo_names (optional) limits the report to these repos, for datastores that are kept between runs.
+def run_noseyparker_report(owner, np_datastore_path, np_report_filename, logger=None, repo_names=None):
     
     np_datastore_path_with_owner = f"{np_datastore_path}/{owner}"
-    result = subprocess.run(["noseyparker", "report", "--datastore", np_datastore_path_with_owner, "--format=json"], capture_output=True, text=True)
-
-    if result.returncode != 0:
-        error_msg = f"Unexpected error running NoseyParker report. Please check the error log file for details."
-        print(error_msg)
-        if logger:
-            logger.error(f"ERROR: NoseyParker: {result}")
+    if not os.path.isdir(np_datastore_path_with_owner):
         return
 
-    # write the results to the report file
-    with open(np_report_filename, 'w') as f:
-        # convert the jsonl output to CSV
-        json_to_csv(owner, result.stdout, np_report_filename, logger)
-        #f.write(result.stdout) # just write the jsonl output to the file
+    for repo_name in sorted(os.listdir(np_datastore_path_with_owner)):
+        if repo_names is not None and repo_name not in repo_names:
+            continue
+        np_datastore_path_with_repo = f"{np_datastore_path_with_owner}/{repo_name}"
+        # Stream the jsonl report into the CSV. stderr goes to a temporary file so it
+        # can never block the report on a full pipe.
+        with tempfile.TemporaryFile(mode='w+') as stderr_file:
+            process = TracedPopen(["noseyparker", "report", "--datastore", np_datastore_path_with_repo, "--format=jsonl"],
+                                       stdout=subprocess.PIPE, stderr=stderr_file, text=True)
+            json_to_csv(owner, process.stdout, np_report_filename, logger)
+            returncode = process.wait()
+
+            if returncode != 0:
+                error_msg = f"Unexpected error running NoseyParker report. Please check the error log file for details."
+                print(error_msg)
+                if logger:
+                    stderr_file.seek(0)
+                    logger.error(f"ERROR: NoseyParker report on {np_datastore_path_with_repo} returned {returncode}: {stderr_file.read()}")
         
     return
@@ -1,6 +1,46 @@
 import json
 import subprocess
 import csv
+import contextlib
+import os
+import tempfile
+import threading
+import time
+from utils.tracing import TracedPopen
+
+# Rows parsed from the trufflehog output are appended to the report in batches of this size,
+# so memory stays bounded however many findings a repo has
+TRUFFLEHOG_WRITE_BATCH_ROWS = 500
+
+# Findings and scan seconds of every trufflehog scan of the run, see get_trufflehog_stats
+_trufflehog_stats = {"findings": 0, "scan_seconds": 0.0}
+_trufflehog_stats_lock = threading.Lock()
+
+# Returns the number of trufflehog findings of the run, and how many were ingested per
+# second of trufflehog scan time (summed over all scans)
+def get_trufflehog_stats():
+    with _trufflehog_stats_lock:
+        findings = _trufflehog_stats["findings"]
+        scan_seconds = _trufflehog_stats["scan_seconds"]
+    findings_per_second = findings / scan_seconds if scan_seconds > 0 else 0
+    return {"findings": findings, "findings_per_second": findings_per_second}
+
+# Returns the report row of one trufflehog json finding, or None if the finding has no file
+def finding_to_row(target, repo_name, json_finding):
+    if 'SourceMetadata' not in json_finding:
+        return None
+    source_data = json_finding['SourceMetadata']['Data']
+    data = source_data.get('Git') or source_data.get('Filesystem') or {}
+    if 'file' not in data:
+        return None
+    line = data['line'] if 'line' in data else '0' # use 0 if line is not present
+    extra_data = json_finding.get('ExtraData', {})
+    extra_data_values = list(extra_data.values()) if extra_data is not None else []
+    return [target, repo_name, data['file'], line, json_finding['SourceID'], json_finding['SourceType'], json_finding['SourceName'], json_finding['DetectorType'], json_finding['DetectorName'], json_finding['DecoderName'], json_finding['Verified'], json_finding['Raw'], json_finding['RawV2'], json_finding['Redacted']] + extra_data_values
+
+def _append_rows(report_filename, rows, report_lock):
+    with report_lock or contextlib.nullcontext(), open(report_filename, 'a', newline='') as f:
+        csv.writer(f).writerows(rows)
 
 # target is the owner of the repository
 # repo_name is the name of the repository
@@ -8,14 +48,31 @@ import csv
 # report_filename is the path, relative to this script, to the report file
 # dry_run is a boolean that indicates whether or not to actually run the scan
 # logger is a logger object to use for error logging
+# report_lock (optional) is a lock held while appending to report_filename, for when several repos are scanned in parallel
+# threads (optional) is the number of trufflehog workers (--concurrency). Uses the trufflehog default if None.
+# git_mode (optional) scans the git history with 'trufflehog git' instead of the files on disk with 'trufflehog filesystem'
+# since_commit (optional) limits a git_mode scan to the commits after this one
+# Returns True if trufflehog completed, False otherwise
 def do_trufflehog_scan(target, 
                        repo_name, 
                        repo_path, 
                        report_filename,
                        dry_run=False,
-                       logger=None):
+                       logger=None,
+                       report_lock=None,
+                       threads=None,
+                       git_mode=False,
+                       since_commit=None):
     
-    command = f"trufflehog filesystem {repo_path} --json"
+    if git_mode:
+        command_args = ["trufflehog", "git", f"file://{os.path.abspath(repo_path)}", "--json"]
+        if since_commit:
+            command_args += ["--since-commit", since_commit]
+    else:
+        command_args = ["trufflehog", "filesystem", repo_path, "--json"]
+    if threads:
+        command_args += ["--concurrency", str(threads)]
+    command = " ".join(command_args)
     
     print(f"Running truffleog on owner/repo: {target}/{repo_name}, with command: {command}")
     
@@ -23,19 +80,43 @@ def do_trufflehog_scan(target,
         print(f"dry-run: {command}")
         return
 
-    result = subprocess.run(["trufflehog", "filesystem", repo_path, "--json"], capture_output=True, text=True)
-    findings = result.stdout.splitlines()
-    with open(report_filename, 'a', newline='') as f:
-        writer = csv.writer(f)
-        for finding in findings:
-            json_finding = json.loads(finding)
-            if 'SourceMetadata' in json_finding:
-                data = json_finding['SourceMetadata']['Data']['Filesystem']
-                if 'file' in data:
-                    line = data['line'] if 'line' in data else '0' # use 0 if line is not present
-                    extra_data = json_finding.get('ExtraData', {})
-                    extra_data_values = list(extra_data.values()) if extra_data is not None else []
-                    row = [target, repo_name, data['file'], line, json_finding['SourceID'], json_finding['SourceType'], json_finding['SourceName'], json_finding['DetectorType'], json_finding['DetectorName'], json_finding['DecoderName'], json_finding['Verified'], json_finding['Raw'], json_finding['RawV2'], json_finding['Redacted']] + extra_data_values
-                    writer.writerow(row)
-                else:
-                    print(f"Unexpected structure in finding: {finding}")
\ No newline at end of file
+    # Read the findings line by line as trufflehog emits them. stderr goes to a temporary
+    # file so a chatty trufflehog can never block on a full pipe.
+    start_time = time.time()
+    findings_count = 0
+    rows = []
+    with tempfile.TemporaryFile(mode='w+') as stderr_file:
+        process = TracedPopen(command_args, stdout=subprocess.PIPE, stderr=stderr_file, text=True)
+        for finding in process.stdout:
+            if not finding.strip():
+                continue
+            try:
+                json_finding = json.loads(finding)
+            except json.JSONDecodeError:
+                print(f"Unexpected output from trufflehog: {finding}")
+                continue
+            row = finding_to_row(target, repo_name, json_finding)
+            if row is None:
+                print(f"Unexpected structure in finding: {finding}")
+                continue
+            rows.append(row)
+            findings_count += 1
+            if len(rows) >= TRUFFLEHOG_WRITE_BATCH_ROWS:
+                _append_rows(report_filename, rows, report_lock)
+                rows = []
+        returncode = process.wait()
+
+        if rows:
+            _append_rows(report_filename, rows, report_lock)
+
+        if returncode != 0:
+            stderr_file.seek(0)
+            print(f"trufflehog command returned non-zero exit status {returncode}")
+            if logger:
+                logger.error(f"trufflehog error on {target}/{repo_name}: {stderr_file.read()}")
+
+    with _trufflehog_stats_lock:
+        _trufflehog_stats["findings"] += findings_count
+        _trufflehog_stats["scan_seconds"] += time.time() - start_time
+
+    return returncode == 0
@@ -13,6 +13,8 @@ import csv
 import sys
 import webbrowser
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # import all functions our helper modules
 # scanners
@@ -22,10 +24,24 @@ from scanners.gitleaks_scan import *
 from scanners.ghas_secret_alerts_fetch import *
 # utils
 from utils.logger import *
+from utils.scan_scheduler import *
+from utils.scan_state import *
+from utils.http_cache import *
+from utils.github_client import *
+from utils.repo_inventory import *
+from utils.tracing import *
+from utils.cost_model import *
+from utils.checkout_budget import *
 # reporting
 from reporting.csv_coalesce import *
 from reporting.html_report_writer import *
 from reporting.secret_matcher import *
+from reporting.secret_correlator import *
+from reporting.parquet_writer import *
+from reporting.findings_store import *
+from reporting.ghas_classifier import *
+from reporting.merged_metrics import *
+from reporting.report_metrics import *
 
 # Add command line arguments
 parser = argparse.ArgumentParser()
@@ -41,6 +57,31 @@ parser.add_argument("--skip-trufflehog", action="store_true", help="Skip the Tru
 parser.add_argument("--skip-ghas", action="store_true", help="Skip the GitHub Advanced Security alerts scan")
 parser.add_argument("--skip-gitleaks", action="store_true", help="Skip the Gitleaks scan")
 parser.add_argument("--open-report-in-browser", action="store_true", help="Open the report in a browser after it's generated")
+parser.add_argument("--jobs", type=int, default=1, help="Number of repositories to clone and scan in parallel. Defaults to 1 (one repository at a time).")
+parser.add_argument("--update-checkouts", action="store_true", help="Run git fetch on repositories that already exist in ./_checkout and move them to the latest default branch, instead of scanning the existing tree as is.")
+parser.add_argument("--clone-depth", type=int, help="Clone (and fetch with --update-checkouts) only the last N commits of each branch. Scanners will only see that part of the history.")
+parser.add_argument("--clone-filter-blob-limit", type=str, help="Partial clone that skips blobs larger than this size (e.g. 1m, 500k), using git clone --filter=blob:limit=<size>. Git fetches skipped blobs on demand if a scanner reads them.")
+parser.add_argument("--incremental", action="store_true", help="Only scan the commits added since the last run of each repository, and merge the new findings with the stored findings of earlier runs. State is kept in ./_scan_state. Use with --update-checkouts.")
+parser.add_argument("--ghas-concurrency", type=int, default=GHAS_MAX_CONCURRENT_REQUESTS, help=f"Maximum number of GitHub API requests in flight when fetching GHAS secret scanning alerts. Defaults to {GHAS_MAX_CONCURRENT_REQUESTS}.")
+parser.add_argument("--ghas-org-alerts", action="store_true", help="With --org-type orgs, fetch GHAS secret scanning alerts from the org-wide endpoint instead of one call per repository. Repositories are only queried one by one where needed to find out if secret scanning is disabled.")
+parser.add_argument("--inventory-file", type=str, help="Use the repository inventory saved by an earlier run (repo_inventory_<timestamp>.json in its reports directory) instead of listing repositories from the GitHub API. Owners missing from the file are fetched from the API.")
+parser.add_argument("--http-cache-ttl", type=int, default=0, help="Seconds a cached GitHub API response is reused without asking GitHub. After that, cached responses are revalidated with ETags, and unchanged ones (304) don't count against the rate limit. Defaults to 0 (always revalidate).")
+parser.add_argument("--no-http-cache", action="store_true", help="Don't use the on-disk GitHub API cache in ./_http_cache")
+parser.add_argument("--cpu-budget", type=int, help="Number of CPUs the scanners may use. Defaults to the cgroup CPU limit or the CPU count.")
+parser.add_argument("--memory-budget-mb", type=int, help="Memory in MB the scanners may use. Defaults to the cgroup memory limit or the physical memory.")
+parser.add_argument("--gitleaks-concurrency", type=int, help="Maximum number of gitleaks scans running at the same time. Defaults to a value derived from the CPU and memory budgets.")
+parser.add_argument("--trufflehog-concurrency", type=int, help="Maximum number of trufflehog scans running at the same time. Defaults to a value derived from the CPU and memory budgets.")
+parser.add_argument("--noseyparker-concurrency", type=int, help="Maximum number of noseyparker scans running at the same time. Defaults to a value derived from the CPU and memory budgets.")
+parser.add_argument("--trufflehog-threads", type=int, help="Threads given to each trufflehog scan (--concurrency). Defaults to half the CPU budget.")
+parser.add_argument("--noseyparker-threads", type=int, help="Threads given to each noseyparker scan (--jobs). Defaults to half the CPU budget.")
+parser.add_argument("--parquet", action="store_true", help="Also write the merged, matches and GHAS alerts reports as Parquet datasets partitioned by owner and source, to load with pandas or other Parquet readers. Requires pyarrow.")
+parser.add_argument("--no-findings-db", action="store_true", help="Don't write the SQLite findings database (findings_<timestamp>.db) of the merged report.")
+parser.add_argument("--ghas-classify", action="store_true", help="Write a report (likely_ghas_matches_<timestamp>.csv) of the gitleaks, trufflehog and noseyparker findings whose detector corresponds to a GHAS secret type, which GHAS secret scanning would likely find too.")
+parser.add_argument("--paginated-report", action="store_true", help="Write the repo and detector tables of the HTML report as data files (report_<timestamp>_data/) shown a page at a time, with sorting and filtering in the browser. Use for owners with thousands of repositories.")
+parser.add_argument("--scan-order", choices=["longest-first", "api"], default="longest-first", help="Order the repositories of every owner are scanned in. longest-first starts the repositories predicted to take the longest first, from the durations recorded in ./_scan_history.json by earlier runs, so one large repository doesn't finish alone at the end. api keeps the order of the GitHub API. Defaults to longest-first.")
+parser.add_argument("--checkout-disk-budget-mb", type=int, help="Disk in MB the checkouts in ./_checkout may use. Checkouts this run is done scanning are deleted, least recently scanned first, to make room for new clones, and clones wait while the checkouts being scanned fill the budget. Checkouts of earlier runs count against the budget but are kept. Defaults to no limit.")
+parser.add_argument("--delete-checkouts", action="store_true", help="Delete every checkout as soon as all scanners are done with it, instead of keeping it in ./_checkout for later runs.")
+parser.add_argument("--hash-workers", type=int, help="Threads used to hash the secrets of the merged report. Defaults to the CPU budget.")
 
 args = parser.parse_args()
 
@@ -53,6 +94,28 @@ SKIP_GITLEAKS = args.skip_gitleaks
 if not args.clean and (args.org_type is None or args.owners is None):
     parser.error("--org-type and --owners are required unless --clean is used")
 
+if args.jobs < 1:
+    parser.error("--jobs must be 1 or greater")
+
+if args.ghas_org_alerts and args.org_type != "orgs":
+    parser.error("--ghas-org-alerts requires --org-type orgs")
+
+if args.parquet and not PYARROW_AVAILABLE:
+    parser.error("--parquet requires pyarrow. Install it with: pip install pyarrow")
+
+if args.inventory_file and not os.path.isfile(args.inventory_file):
+    parser.error(f"--inventory-file {args.inventory_file} does not exist")
+
+if args.http_cache_ttl < 0:
+    parser.error("--http-cache-ttl must be 0 or greater")
+
+if args.clone_depth is not None and args.clone_depth < 1:
+    parser.error("--clone-depth must be 1 or greater")
+
+for positive_arg in ["ghas_concurrency", "cpu_budget", "memory_budget_mb", "checkout_disk_budget_mb", "gitleaks_concurrency", "trufflehog_concurrency", "noseyparker_concurrency", "trufflehog_threads", "noseyparker_threads", "hash_workers"]:
+    if getattr(args, positive_arg) is not None and getattr(args, positive_arg) < 1:
+        parser.error(f"--{positive_arg.replace('_', '-')} must be 1 or greater")
+
 DRY_RUN = args.dry_run  # Set to True if --dry-run is present, False otherwise
 print(f"DRY_RUN={DRY_RUN}")
 
@@ -68,14 +131,47 @@ INTERNAL_REPOS_FLAG=args.repos_internal_type
 ORG_TYPE = args.org_type if args.org_type else None # This can be "users" or "orgs"
 OWNERS = args.owners.split(",") if args.owners else None  # Split the value of --owners into a list if present, None otherwise
 OPEN_REPORT_IN_BROWSER = args.open_report_in_browser
+PAGINATED_REPORT = args.paginated_report
+PARQUET = args.parquet
+FINDINGS_DB = not args.no_findings_db
+GHAS_CLASSIFY = args.ghas_classify
+JOBS = args.jobs
+print(f"JOBS={JOBS}")
+UPDATE_CHECKOUTS = args.update_checkouts
+CLONE_DEPTH = args.clone_depth
+CLONE_FILTER_BLOB_LIMIT = args.clone_filter_blob_limit
+print(f"UPDATE_CHECKOUTS={UPDATE_CHECKOUTS}")
+INCREMENTAL = args.incremental
+print(f"INCREMENTAL={INCREMENTAL}")
+SCAN_ORDER = args.scan_order
+print(f"SCAN_ORDER={SCAN_ORDER}")
+ENABLED_TOOLS = [tool for tool, skip in [("gitleaks", SKIP_GITLEAKS), ("trufflehog", SKIP_TRUFFLEHOG), ("noseyparker", SKIP_NOSEYPARKER)] if not skip]
+
+# Per-tool concurrency limits and thread budgets for the scanners of every repo
+SCHEDULER = ScanScheduler(cpu_budget=args.cpu_budget,
+                          memory_budget_mb=args.memory_budget_mb,
+                          concurrency={"gitleaks": args.gitleaks_concurrency,
+                                       "trufflehog": args.trufflehog_concurrency,
+                                       "noseyparker": args.noseyparker_concurrency},
+                          threads={"trufflehog": args.trufflehog_threads,
+                                   "noseyparker": args.noseyparker_threads})
+print(f"SCHEDULER={SCHEDULER.describe()}")
 
 TOKEN = os.getenv('GITHUB_ACCESS_TOKEN')
 
 # artifact directories
 CHECKOUT_DIR = "./_checkout"  # This is the directory where the repositories will be cloned
-GITLEAKS_REPORTS_DIR = "./_gitleaks_reports"  # This is the directory where the gitleaks reports (per repo) will be saved
+GITLEAKS_REPORTS_DIR = "./_gitleaks_reports"  # This is the directory where the gitleaks JSON reports (per repo) are written until they are appended to the run's report
 NOSEY_PARKER_ROOT_ARTIFACT_DIR = "./_np_datastore"
-NOSEYPARKER_DATASTORE_DIR = f"{NOSEY_PARKER_ROOT_ARTIFACT_DIR}/np_datastore_{timestamp}"
+if INCREMENTAL:
+    # Reuse the datastore across runs so the findings of earlier scans are kept
+    NOSEYPARKER_DATASTORE_DIR = f"{NOSEY_PARKER_ROOT_ARTIFACT_DIR}/np_datastore"
+else:
+    NOSEYPARKER_DATASTORE_DIR = f"{NOSEY_PARKER_ROOT_ARTIFACT_DIR}/np_datastore_{timestamp}"
+SCAN_STATE_DIR = "./_scan_state"  # Last scanned commit and stored findings of every repo, for --incremental
+HTTP_CACHE_DIR = "./_http_cache"  # Cached GitHub API responses, revalidated with ETags
+GHAS_CLASSIFIER_CACHE_FILE = "./_ghas_classifier_cache.json"  # GHAS secret type of every detector classified by --ghas-classify
+SCAN_HISTORY_FILE = "./_scan_history.json"  # Size, clone and scanner durations of every scanned repo, for --scan-order and the run estimates
 REPORTS_DIR = f"./_reports/reports_{timestamp}"  # This is where aggregated results are saved
 ERROR_LOG_FILE = f"./_reports/reports_{timestamp}/error_log_{timestamp}.log"  # This is where error messages are saved
 
@@ -111,25 +207,28 @@ def check_commands():
         exit(1)
 
 
+# Returns the repos of the account from the GitHub API, or None if listing them failed, so a
+# partial or empty list is never taken for the repos of the account
 def fetch_repos(account_type, account, github_rest_headers, internal_type=False, page=1, per_page=100):
 
     repos = []
     while True:
         # Docs: https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#list-organization-repositories
-        repos_url = f'https://api.github.com/{account_type}/{account}/repos?page={page}&per_page={per_page}'
+        repos_url = f'{GITHUB_API_URL}/{account_type}/{account}/repos?page={page}&per_page={per_page}'
         if internal_type:
             repos_url += '&type=internal'
         if DRY_RUN:
             print(f"dry-run: Calling {repos_url}...")
             break;
 
-        response = requests.get(repos_url, headers=github_rest_headers)
+        response = GITHUB_CLIENT.get(repos_url)
         data = response.json()
         
         if isinstance(data, dict) and "message" in data:
             print(f"ERROR: Error fetching repo list from Github API:  {data['message']}")
-            LOGGER.error(f"ERROR: Error fetching repo list from Github API:  {data['message']}")
-            break;
+            if LOGGER:
+                LOGGER.error(f"ERROR: Error fetching repo list from Github API:  {data['message']}")
+            return None
 
         repos.extend(data)
         if len(data) < per_page:
@@ -138,116 +237,248 @@ def fetch_repos(account_type, account, github_rest_headers, internal_type=False,
 
     return repos
 
-def count_lines_in_file(file_path):
-    _, file_extension = os.path.splitext(file_path)
-    if file_extension == '.csv':
-        with open(file_path, 'r') as file:
-            return sum(1 for row in csv.reader(file))
-    else:
-        with open(file_path, 'r') as file:
-            return sum(1 for line in file)
-
-# Docs for analyze_merged_results
-# merged_results: the path to the merged results CSV file
-# matches_results: the path to the matches results CSV file
-# error_file: the path to the error log file
-# repo_names_no_ghas_secrets_enabled: a list of repository names that do not have GHAS secrets scanning enabled
-# Returns: a tuple of two DataFrames: the first is the metrics DataFrame, the second is the repo-level metrics DataFrame
-def analyze_merged_results(merged_results, 
-                           matches_results, 
-                           error_file, 
-                           repo_names_no_ghas_secrets_enabled=None):
-    
-    df = pd.read_csv(merged_results)
-
-    # check if merged_results is empty or only has one line (header row). If true, return empty DataFrames
-    if df.empty or len(df) == 1:
-        LOGGER.error(f"ERROR: The merged results file {merged_results} is empty or only has one line (header row). No metrics will be generated.")
-        print(f"ERROR: The merged results file {merged_results} is empty or only has one line (header row). No metrics will be generated.")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-    
-    # Calculate the metrics
-    cmd_args = sys.argv
-    owners = df['owner'].nunique()
-    distinct_sources = df['source'].nunique()
-    total_repos_on_disk = count_top_level_dirs(CHECKOUT_DIR)
-    total_repos_with_secrets = df['repo_name'].nunique()
-    total_secrets_by_source = df.groupby('source')['source'].count().to_dict()
-    total_secrets = df['secret'].count()
-    repos_without_ghas_secrets_scanning = len(repo_names_no_ghas_secrets_enabled) if repo_names_no_ghas_secrets_enabled else 0
-    total_distinct_secrets = df['secret'].nunique()
-    now = datetime.now()
-    err_line_count = count_lines_in_file(error_file)
-    matches_line_count = count_lines_in_file(matches_results) - 1 # subtract 1 for the header row
-
-    # Create a DataFrame with the metrics
-    metrics = pd.DataFrame({
-        'Metric': ['Time of Report', 'Arguments', 'Owners', 'Scanning Source Tools', 'Total Repos on Disk', 'Total Repos with Secrets', 'Total Secrets by Source', 'Total Secrets (all tools)', 'Repos with GHAS Secrets Scanning Disabled', 'Total Distinct Secrets', 'Secret Matches Count (Experimental)', 'Total Errors in Log'],
-        'Value': [now, cmd_args, owners, distinct_sources, total_repos_on_disk, total_repos_with_secrets, total_secrets_by_source, total_secrets, repos_without_ghas_secrets_scanning, total_distinct_secrets, matches_line_count, err_line_count]
-    })
-
-    # Do repo-level metrics
-    # Rows will be 'repos'
-    # columns wil be: total secrets, total distinct secrets, 
-    # total gitleaks secrets, total trufflehog secrets, total noseyparker secrets, total ghas secrets
-    grouped = df.groupby('repo_name')
-
-    repo_metrics = grouped.agg({
-        'secret': ['count', 'nunique'],
-        'source': [
-            ('total_gitleaks_secrets', lambda x: (x == 'gitleaks').sum()),
-            ('total_trufflehog_secrets', lambda x: (x == 'trufflehog').sum()),
-            ('total_noseyparker_secrets', lambda x: (x == 'noseyparker').sum()),
-            ('total_ghas_secrets', lambda x: (x == 'ghas').sum())
-        ]
-    })
-
-    # Add a summary row
-    repo_metrics.loc['Summary', :] = repo_metrics.sum(numeric_only=True)
-    # Convert the entire table integers. Doing a summary converts everything to floats
-    repo_metrics = repo_metrics.astype(int)
-
-    # Reset the index
-    repo_metrics.reset_index(inplace=True)
-
-    # Flatten the multi-index columns
-    repo_metrics.columns = ['_'.join(col).strip() for col in repo_metrics.columns.values]
-
-    # analyze the detector in a new table
-    # Group by 'detector' and count the number of rows for each detector
-    detector_metrics = df.groupby(['source', 'detector']).size().reset_index(name='detector_count')
-    # Order by 'detector_count' in descending order
-    detector_metrics = detector_metrics.sort_values('detector_count', ascending=False)
-    # Remove the index
-    detector_metrics.reset_index(drop=True, inplace=True)
-    # Write the detector metrics to a temporary CSV file
-    #detector_metrics.to_csv('temp_detector_metrics.csv')
-
-    return metrics, repo_metrics, detector_metrics
-
+# Returns True if the repository was cloned, False if the checkout already existed
 def clone_repo(repo, repo_checkout_path):
     # Check if the directory already exists
     #print(f"Checking if repo {repo_checkout_path} exists or clone if not.")
     if os.path.exists(repo_checkout_path):
-        print(f"Repository {repo_checkout_path} already exists. Skipping cloning.")
+        if UPDATE_CHECKOUTS:
+            update_repo(repo, repo_checkout_path)
+        else:
+            print(f"Repository {repo_checkout_path} already exists. Skipping cloning.")
+        return False
     else:
-        print(f"git clone {repo['clone_url']} {repo_checkout_path}")
+        command = ["git", "clone"]
+        if CLONE_DEPTH:
+            # --depth implies --single-branch, keep every branch like a full clone does
+            command += ["--depth", str(CLONE_DEPTH), "--no-single-branch"]
+        if CLONE_FILTER_BLOB_LIMIT:
+            command += [f"--filter=blob:limit={CLONE_FILTER_BLOB_LIMIT}"]
+        command += [repo["clone_url"], f"{repo_checkout_path}"]
+        print(" ".join(command))
         if not DRY_RUN:
-            subprocess.run(["git", "clone", repo["clone_url"], f"{repo_checkout_path}"], check=True)
+            run_traced(command, check=True)
+        return True
+
+# Bring an existing checkout up to date with an incremental fetch, then move the
+# working tree to the latest commit of the default branch. A failed update is logged
+# and the existing tree is scanned as is.
+def update_repo(repo, repo_checkout_path):
+    fetch_command = ["git", "-C", repo_checkout_path, "fetch", "--prune", "origin"]
+    if CLONE_DEPTH:
+        fetch_command += ["--depth", str(CLONE_DEPTH)]
+
+    default_branch = repo.get("default_branch")
+    if default_branch:
+        checkout_command = ["git", "-C", repo_checkout_path, "checkout", "--force", "-B", default_branch, f"origin/{default_branch}"]
+    else:
+        checkout_command = ["git", "-C", repo_checkout_path, "reset", "--hard", "@{upstream}"]
 
-def count_top_level_dirs(directory):
-    return len([name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name))])
+    for command in [fetch_command, checkout_command]:
+        print(" ".join(command))
+        if DRY_RUN:
+            continue
+        result = run_traced(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"ERROR: Failed to update {repo_checkout_path}, scanning the existing checkout: {result.stderr.strip()}")
+            if LOGGER:
+                LOGGER.error(f"ERROR: Failed to update {repo_checkout_path} with '{' '.join(command)}': {result.stderr.strip()}")
+            return
+
+# Clone a single repository and run every enabled local scanner against it.
+# This is the unit of work handed to the --jobs worker pool, so it only touches
+# per-repo artifacts: noseyparker writes one datastore per repo, and gitleaks and
+# trufflehog append to the shared reports under gitleaks_report_lock and trufflehog_report_lock.
+# The scanners themselves are placed by SCHEDULER, which runs them at the same time
+# when the per-tool limits and the CPU and memory budgets allow.
+# The repository, its clone and every scanner run are traced as spans with the owner and repo as args,
+# and their durations are recorded in COST_MODEL for the scan order and estimates of later runs.
+def scan_repo(owner, repo):
+    repo_checkout_path = os.path.join(CHECKOUT_DIR, repo_checkout_name(repo))
+    repo_bare_name = repo_checkout_name(repo)
+
+    # With a disk budget, wait for room for the checkout before cloning it
+    if CHECKOUT_BUDGET:
+        with span("checkout_disk_wait", owner=owner, repo=repo_bare_name):
+            CHECKOUT_BUDGET.acquire(repo_checkout_path, COST_MODEL.estimate_repo(owner, repo_bare_name, repo.get("size"), ENABLED_TOOLS)["disk_kb"])
+
+    disk_kb = None
+    try:
+        with span("repo", "repo", owner=owner, repo=repo_bare_name):
+            with span("clone", "clone", owner=owner, repo=repo_bare_name) as clone_span:
+                cloned = clone_repo(repo, repo_checkout_path)
+
+            if INCREMENTAL and not DRY_RUN:
+                tool_seconds = scan_repo_incremental(owner, repo_bare_name, repo_checkout_path)
+            else:
+                tool_seconds = scan_repo_tools(owner, repo_bare_name, repo_checkout_path)
+
+        if not DRY_RUN and os.path.isdir(repo_checkout_path):
+            with scanned_repos_lock:
+                scanned_repos.add((owner, repo_bare_name))
+            disk_kb = directory_size_kb(repo_checkout_path)
+            COST_MODEL.record_repo(owner, repo_bare_name, repo.get("size"),
+                                   disk_kb=disk_kb,
+                                   clone_seconds=clone_span.seconds if cloned else None,
+                                   clone_kb=directory_size_kb(os.path.join(repo_checkout_path, ".git")) if cloned else None,
+                                   tool_seconds=tool_seconds)
+    finally:
+        # Every scanner is done with the checkout, it can be deleted
+        if CHECKOUT_BUDGET:
+            CHECKOUT_BUDGET.release(repo_checkout_path, disk_kb)
+
+# Name of the checkout directory of a repository in CHECKOUT_DIR
+def repo_checkout_name(repo):
+    return os.path.basename(urlparse(repo["clone_url"]).path).replace(".git", "")
+
+# Returns the seconds of every scanner that completed, for the cost model
+def completed_tool_seconds(tool_results):
+    return {tool: seconds for tool, (seconds, completed) in tool_results.items() if completed}
+
+# Runs every enabled local scanner on a checkout, see scan_repo
+# Returns the seconds of every scanner that completed
+def scan_repo_tools(owner, repo_bare_name, repo_checkout_path):
+    tool_tasks = []
+    if not SKIP_GITLEAKS:
+        tool_tasks.append(("gitleaks", do_gitleaks_scan,
+                           (owner, repo_bare_name, repo_checkout_path, GITLEAKS_REPORTS_DIR, gitleaks_merged_report_filename, DRY_RUN, LOGGER,
+                            None, gitleaks_report_lock)))
+
+    if not SKIP_TRUFFLEHOG:
+        tool_tasks.append(("trufflehog", do_trufflehog_scan,
+                           (owner, repo_bare_name, repo_checkout_path, trufflehog_report_filename, DRY_RUN, LOGGER,
+                            trufflehog_report_lock, SCHEDULER.threads_for("trufflehog"))))
+
+    if not SKIP_NOSEYPARKER:
+        tool_tasks.append(("noseyparker", do_noseyparker_scan,
+                           (owner, repo_bare_name, repo_checkout_path, NOSEYPARKER_DATASTORE_DIR, DRY_RUN, LOGGER,
+                            SCHEDULER.threads_for("noseyparker"))))
+
+    return completed_tool_seconds(SCHEDULER.run_tools(tool_tasks, {"owner": owner, "repo": repo_bare_name}))
+
+# --incremental variant of the scans in scan_repo. Every tool only scans the commits after
+# the last commit it scanned in the repo: gitleaks gets them through --log-opts, trufflehog
+# scans the git history with --since-commit, and noseyparker scans into the datastore kept
+# from earlier runs. A tool that never scanned the repo, for example one skipped by earlier
+# runs, scans the full history. The new gitleaks and trufflehog findings are merged into
+# the stored findings of the repo, and the complete set goes into this run's reports.
+# Returns the seconds of every scanner that completed a scan of the full history, for the cost model
+def scan_repo_incremental(owner, repo_bare_name, repo_checkout_path):
+    head_commit = get_head_commit(repo_checkout_path)
+    since_commits = {}
+    for tool in ENABLED_TOOLS:
+        since_commit = SCAN_STATE.last_scanned_commit(owner, repo_bare_name, tool)
+        if since_commit and not commit_exists(repo_checkout_path, since_commit):
+            print(f"Last commit {since_commit} of {owner}/{repo_bare_name} scanned by {tool} is no longer in the repository. Scanning the full history.")
+            since_commit = None
+        since_commits[tool] = since_commit
+    # Tools that scanned up to HEAD already use their stored findings
+    scan_tools = [tool for tool in ENABLED_TOOLS if head_commit is None or since_commits[tool] != head_commit]
+
+    gitleaks_new_findings = SCAN_STATE.new_findings_file(owner, repo_bare_name, "gitleaks")
+    trufflehog_new_findings = SCAN_STATE.new_findings_file(owner, repo_bare_name, "trufflehog")
+
+    tool_tasks = []
+    if not scan_tools:
+        print(f"No new commits in {owner}/{repo_bare_name} since the last scan ({head_commit}). Using stored findings.")
+    for tool in scan_tools:
+        if since_commits[tool]:
+            print(f"Scanning {owner}/{repo_bare_name} with {tool} from {since_commits[tool]} to {head_commit}")
+        elif any(since_commits.values()):
+            print(f"Scanning the full history of {owner}/{repo_bare_name} with {tool}, it has not scanned the repository before")
+
+    if "gitleaks" in scan_tools:
+        # every ref, minus the history that was already scanned
+        log_opts = f"--all --not {since_commits['gitleaks']}" if since_commits["gitleaks"] else None
+        tool_tasks.append(("gitleaks", do_gitleaks_scan,
+                           (owner, repo_bare_name, repo_checkout_path, GITLEAKS_REPORTS_DIR, gitleaks_new_findings, DRY_RUN, LOGGER, log_opts)))
+
+    if "trufflehog" in scan_tools:
+        tool_tasks.append(("trufflehog", do_trufflehog_scan,
+                           (owner, repo_bare_name, repo_checkout_path, trufflehog_new_findings, DRY_RUN, LOGGER,
+                            None, SCHEDULER.threads_for("trufflehog"), True, since_commits["trufflehog"])))
+
+    if "noseyparker" in scan_tools:
+        tool_tasks.append(("noseyparker", do_noseyparker_scan,
+                           (owner, repo_bare_name, repo_checkout_path, NOSEYPARKER_DATASTORE_DIR, DRY_RUN, LOGGER,
+                            SCHEDULER.threads_for("noseyparker"))))
+
+    tool_results = SCHEDULER.run_tools(tool_tasks, {"owner": owner, "repo": repo_bare_name})
+    completed_tools = [tool for tool, (_, completed) in tool_results.items() if completed]
+
+    if not SKIP_GITLEAKS:
+        stored_findings = SCAN_STATE.merge_findings(owner, repo_bare_name, "gitleaks", gitleaks_new_findings, key_column="Fingerprint")
+        if os.path.exists(gitleaks_new_findings):
+            os.remove(gitleaks_new_findings)
+        append_gitleaks_findings(owner, repo_bare_name, stored_findings, gitleaks_merged_report_filename, gitleaks_report_lock, LOGGER)
+
+    if not SKIP_TRUFFLEHOG:
+        # the trufflehog report rows have no header, rows are compared as a whole
+        stored_findings = SCAN_STATE.merge_findings(owner, repo_bare_name, "trufflehog", trufflehog_new_findings, has_header=False)
+        if os.path.exists(trufflehog_new_findings):
+            os.remove(trufflehog_new_findings)
+        if os.path.exists(stored_findings):
+            with trufflehog_report_lock, open(stored_findings, 'r') as f_in, open(trufflehog_report_filename, 'a') as f_out:
+                shutil.copyfileobj(f_in, f_out)
+
+    if head_commit and completed_tools:
+        SCAN_STATE.record_scanned_commit(owner, repo_bare_name, completed_tools, head_commit)
+    if head_commit and len(completed_tools) < len(tool_results):
+        failed_tools = ", ".join(tool for tool in tool_results if tool not in completed_tools)
+        print(f"Not all scans of {owner}/{repo_bare_name} completed ({failed_tools}). The next --incremental run will scan these commits again.")
+
+    # Scans of the new commits only say little about the cost of scanning the repository
+    return {tool: seconds for tool, seconds in completed_tool_seconds(tool_results).items() if since_commits[tool] is None}
+
+# Summary
+# Prints the predicted wall time of the scan phase, the scanner time, the clone download
+# and the disk use of the checkouts of the repositories in REPO_INVENTORY, from COST_MODEL.
+# The repositories of an owner are scanned JOBS at a time in the scan order, and the
+# scanners of a repository at the same time, without the per-tool limits of SCHEDULER.
+def print_run_estimate():
+    repos_by_owner = {}
+    for owner in OWNERS:
+        repos = REPO_INVENTORY.repos(owner)
+        if not isinstance(repos, list):
+            continue
+        if SCAN_ORDER == "longest-first":
+            repos = COST_MODEL.longest_first(owner, repos, ENABLED_TOOLS, repo_checkout_name)
+        repos_by_owner[owner] = [(repo_checkout_name(repo), repo.get("size"), os.path.isdir(os.path.join(CHECKOUT_DIR, repo_checkout_name(repo))))
+                                 for repo in repos]
+    estimate = COST_MODEL.estimate_run(repos_by_owner, ENABLED_TOOLS, JOBS)
+    if estimate["repos"] == 0:
+        if DRY_RUN:
+            print("dry-run: Use --inventory-file to estimate the run")
+        return
+
+    hours, remainder = divmod(estimate["wall_seconds"], 3600)
+    minutes, seconds = divmod(remainder, 60)
+    print(f"Estimate for {estimate['repos']} repositories ({estimate['known_repos']} in the scan history {SCAN_HISTORY_FILE}), {JOBS} at a time:")
+    print(f"  Scan phase wall clock time: {int(hours)} hours {int(minutes)} minutes {seconds:.2f} seconds")
+    for tool, tool_seconds in estimate["tool_seconds"].items():
+        print(f"  {tool} time, summed across repositories: {tool_seconds:.2f} seconds")
+    print(f"  Clone download: {estimate['clone_kb'] / 1024:.1f} MB")
+    print(f"  Disk used by new checkouts: {estimate['disk_kb'] / 1024:.1f} MB (checkouts already in {CHECKOUT_DIR}: {estimate['disk_kb_on_disk'] / 1024:.1f} MB)")
+    if args.checkout_disk_budget_mb or args.delete_checkouts:
+        largest_kb = max([COST_MODEL.estimate_repo(owner, name, size_kb, ENABLED_TOOLS)["disk_kb"] for owner, repos in repos_by_owner.items() for name, size_kb, _ in repos], default=0)
+        print(f"  Largest checkout: {largest_kb / 1024:.1f} MB, checkouts are " + (f"kept within {args.checkout_disk_budget_mb} MB" if args.checkout_disk_budget_mb else "deleted after their scans"))
+    print("  Longest repositories: " + ", ".join(f"{name} ({repo_seconds:.1f} seconds)" for name, repo_seconds in estimate["longest"]))
 
 # If the --clean argument is present, delete the code and temp results directories
 if args.clean:
     confirm = input("Are you sure you want to delete the directories ./checkouts and ./reports? (y/n): ")
     if confirm.lower() == "y":
         if DRY_RUN:
-            print(f"dry-run: Deleting directories {CHECKOUT_DIR}, {GITLEAKS_REPORTS_DIR} and {NOSEY_PARKER_ROOT_ARTIFACT_DIR}...")
+            print(f"dry-run: Deleting directories {CHECKOUT_DIR}, {GITLEAKS_REPORTS_DIR}, {NOSEY_PARKER_ROOT_ARTIFACT_DIR}, {SCAN_STATE_DIR}, {HTTP_CACHE_DIR}, {GHAS_CLASSIFIER_CACHE_FILE} and {SCAN_HISTORY_FILE}...")
         else:
             shutil.rmtree(CHECKOUT_DIR, ignore_errors=True)
             shutil.rmtree(GITLEAKS_REPORTS_DIR, ignore_errors=True)
             shutil.rmtree(NOSEY_PARKER_ROOT_ARTIFACT_DIR, ignore_errors=True)
+            shutil.rmtree(SCAN_STATE_DIR, ignore_errors=True)
+            shutil.rmtree(HTTP_CACHE_DIR, ignore_errors=True)
+            for cache_file in [GHAS_CLASSIFIER_CACHE_FILE, SCAN_HISTORY_FILE]:
+                if os.path.isfile(cache_file):
+                    os.remove(cache_file)
     else:
         print("Operation cancelled. No clean up was performed. Exiting...")
 
@@ -266,7 +497,12 @@ else:
 if not DRY_RUN:   
     check_commands()
 
+HTTP_CACHE = None if DRY_RUN or args.no_http_cache else HttpCache(HTTP_CACHE_DIR, args.http_cache_ttl, cache_secret_alerts=KEEP_SECRETS)
+# One pooled, rate limit aware transport for every GitHub API call of the run
+GITHUB_CLIENT = GitHubClient(github_rest_headers, HTTP_CACHE, pool_size=max(args.ghas_concurrency, JOBS))
+
 trufflehog_report_filename = f'{REPORTS_DIR}/trufflehog_results_{timestamp}.csv'
+gitleaks_merged_report_filename = f"{REPORTS_DIR}/gitleaks_report_merged_filename_{timestamp}.csv"
 noseyparker_report_filename = f"{REPORTS_DIR}/noseyparker_results_{timestamp}.csv" 
 
 if not DRY_RUN:
@@ -282,92 +518,142 @@ if not DRY_RUN:
     if not os.path.exists(NOSEYPARKER_DATASTORE_DIR):
         os.makedirs(NOSEYPARKER_DATASTORE_DIR)
 
-# Initialize counters for time spent on each secrets scanning tool
-timing_metrics = {
-    "total_gitleaks_time": 0,
-    "total_trufflehog_time": 0,
-    "total_noseyparker_time": 0
-}
+# gitleaks and trufflehog append every repo's findings to one report file per tool
+gitleaks_report_lock = threading.Lock()
+trufflehog_report_lock = threading.Lock()
+
+SCAN_STATE = ScanState(SCAN_STATE_DIR) if INCREMENTAL else None
+COST_MODEL = ScanCostModel(SCAN_HISTORY_FILE)
+
+# Checkouts kept within --checkout-disk-budget-mb, or deleted after their scans with --delete-checkouts
+CHECKOUT_BUDGET = None
+if not DRY_RUN and (args.checkout_disk_budget_mb or args.delete_checkouts):
+    CHECKOUT_BUDGET = CheckoutDiskBudget(CHECKOUT_DIR, args.checkout_disk_budget_mb * 1024 if args.checkout_disk_budget_mb else None,
+                                         args.delete_checkouts, LOGGER)
+    print(f"CHECKOUT_BUDGET={CHECKOUT_BUDGET.describe()}")
+
+# (owner, repo) of every repository scanned in this run, for the report metrics.
+# Checkouts can be deleted during the run, and ./_checkout can hold repositories of earlier runs.
+scanned_repos = set()
+scanned_repos_lock = threading.Lock()
+
+# The repositories of every owner, fetched once and shared by the scan loop and the GHAS alert fetch
+repo_inventory_filename = f"{REPORTS_DIR}/repo_inventory_{timestamp}.json"
+if args.inventory_file:
+    print(f"Loading repository inventory from {args.inventory_file}...")
+    REPO_INVENTORY = RepoInventory.load(args.inventory_file)
+    if REPO_INVENTORY.owner_type != ORG_TYPE or REPO_INVENTORY.internal_type != INTERNAL_REPOS_FLAG:
+        print(f"WARNING: {args.inventory_file} was built for --org-type {REPO_INVENTORY.owner_type} (internal: {REPO_INVENTORY.internal_type})")
+else:
+    REPO_INVENTORY = RepoInventory(ORG_TYPE, INTERNAL_REPOS_FLAG)
 
-for owner in OWNERS: 
+for owner in OWNERS:
+    if REPO_INVENTORY.has_owner(owner):
+        continue
     # Get list of repositories for the TARGET
-    url = f"https://api.github.com/{ORG_TYPE}/{owner}/repos"
+    url = f"{GITHUB_API_URL}/{ORG_TYPE}/{owner}/repos"
     print(f"Getting list of repositories from {url}...")
-    
-    repos = fetch_repos(ORG_TYPE, owner, github_rest_headers, INTERNAL_REPOS_FLAG,)
-    
-    # Check if the response is a dictionary containing an error message
-    if isinstance(repos, dict) and "message" in repos:
-        print(f"ERROR: Error on owner: {owner} with message:  {repos['message']}")
+    with span("fetch_repos", owner=owner):
+        repos = fetch_repos(ORG_TYPE, owner, github_rest_headers, INTERNAL_REPOS_FLAG,)
+    # An owner whose listing failed stays out of the inventory, so --inventory-file runs fetch it again
+    if repos is None:
+        print(f"ERROR: Could not list the repositories of {owner}. It is left out of the repository inventory.")
         if LOGGER:
-            LOGGER.error(f"ERROR: Error on owner: {owner} with message:  {repos['message']}")
-        break;
-    elif repos is None or len(repos) == 0:
-        if not DRY_RUN:
-            print(f"ERROR: No repositories found for {owner}. Please check your Github personal access token and that you have the correct permission to read from the org: {owner}")
+            LOGGER.error(f"ERROR: Could not list the repositories of {owner}. It is left out of the repository inventory.")
+        continue
+    REPO_INVENTORY.add_owner(owner, repos)
+
+if not DRY_RUN:
+    REPO_INVENTORY.save(repo_inventory_filename)
+    print(f"Repository inventory of {REPO_INVENTORY.total_repos()} repositories saved to {repo_inventory_filename}")
+
+print_run_estimate()
+
+# The scan phase: every repository of every owner, and the noseyparker reports
+with span("scan") as scan_span:
+    for owner in OWNERS: 
+        repos = REPO_INVENTORY.repos(owner)
+    
+        # Check if the response is a dictionary containing an error message
+        if isinstance(repos, dict) and "message" in repos:
+            print(f"ERROR: Error on owner: {owner} with message:  {repos['message']}")
             if LOGGER:
-                LOGGER.error(f"ERROR: No repositories found for {owner}. Please check your Github personal access token and that you have the correct permission to read from the org: {owner}")
-            continue;
-    else:
-        # Clone each repository and do a basic gitleaks and trufflehog scan
-        for repo in repos:
-            repo_checkout_path = os.path.join(CHECKOUT_DIR, os.path.basename(urlparse(repo["clone_url"]).path).replace(".git", ""))
-            repo_bare_name = os.path.basename(urlparse(repo["clone_url"]).path).replace(".git", "")
-
-            clone_repo(repo, repo_checkout_path)
-
-            if not SKIP_GITLEAKS:
-                start_time = time.time()
-                do_gitleaks_scan(owner, repo_bare_name, repo_checkout_path, GITLEAKS_REPORTS_DIR, DRY_RUN, LOGGER)
-                end_time = time.time()
-                timing_metrics["total_gitleaks_time"] += end_time - start_time
-
-            if not SKIP_TRUFFLEHOG:
-                start_time = time.time()
-                do_trufflehog_scan(owner, repo_bare_name, repo_checkout_path, trufflehog_report_filename, DRY_RUN, LOGGER)
-                end_time = time.time()
-                timing_metrics["total_trufflehog_time"] += end_time - start_time
-
-            if not SKIP_NOSEYPARKER:
-                start_time = time.time()
-                do_noseyparker_scan(owner, repo_bare_name, repo_checkout_path, NOSEYPARKER_DATASTORE_DIR, DRY_RUN, LOGGER)
-                end_time = time.time()
-                timing_metrics["total_noseyparker_time"] += end_time - start_time
-
-    if not SKIP_NOSEYPARKER and not DRY_RUN:
-        run_noseyparker_report(owner, NOSEYPARKER_DATASTORE_DIR, noseyparker_report_filename, LOGGER)
-
-# Calculate total time
+                LOGGER.error(f"ERROR: Error on owner: {owner} with message:  {repos['message']}")
+            break;
+        elif repos is None or len(repos) == 0:
+            if not DRY_RUN:
+                print(f"ERROR: No repositories found for {owner}. Please check your Github personal access token and that you have the correct permission to read from the org: {owner}")
+                if LOGGER:
+                    LOGGER.error(f"ERROR: No repositories found for {owner}. Please check your Github personal access token and that you have the correct permission to read from the org: {owner}")
+                continue;
+        else:
+            if SCAN_ORDER == "longest-first":
+                repos = COST_MODEL.longest_first(owner, repos, ENABLED_TOOLS, repo_checkout_name)
+            # Clone each repository and do a basic gitleaks, trufflehog and noseyparker scan.
+            # The scanners are external processes, so a thread per repository is enough to keep them running in parallel.
+            with ThreadPoolExecutor(max_workers=JOBS) as executor:
+                futures = [executor.submit(scan_repo, owner, repo) for repo in repos]
+                for future in as_completed(futures):
+                    future.result()
+
+        if not SKIP_NOSEYPARKER and not DRY_RUN:
+            # the datastore of an --incremental run can hold repos that are no longer in the owner's repo list
+            owner_repo_names = [repo_checkout_name(repo) for repo in repos] if INCREMENTAL else None
+            with span("noseyparker_report", owner=owner):
+                run_noseyparker_report(owner, NOSEYPARKER_DATASTORE_DIR, noseyparker_report_filename, LOGGER, owner_repo_names)
+
+scan_wall_clock_time = scan_span.seconds
+SCHEDULER.shutdown()
+
+if CHECKOUT_BUDGET:
+    print(f"Scanned {len(scanned_repos)} repositories, {CHECKOUT_BUDGET.evicted} checkouts deleted, {CHECKOUT_BUDGET.used_kb() / 1024:.1f} MB of checkouts left in {CHECKOUT_DIR}")
+
 if not DRY_RUN:
-    total_time = sum(timing_metrics.values())
-    for function, time_spent in timing_metrics.items():
+    try:
+        COST_MODEL.save()
+    except OSError as e:
+        print(f"ERROR: Could not save the scan history {SCAN_HISTORY_FILE}: {str(e)}")
+        LOGGER.error(f"ERROR: Could not save the scan history {SCAN_HISTORY_FILE}: {str(e)}")
+
+# Calculate total time. The per-tool times are summed across repositories, so with
+# --jobs > 1 they can add up to more than the wall-clock time of the scan phase.
+if not DRY_RUN:
+    tool_times = {tool: TRACER.total_seconds(tool) for tool in SCHEDULED_TOOLS}
+    total_time = sum(tool_times.values())
+    for tool, time_spent in tool_times.items():
         if total_time != 0:
             percentage = (time_spent / total_time) * 100
-            print(f"Total {function}: {time_spent:.2f} seconds ({percentage:.2f}%)")
+            print(f"Total {tool} time: {time_spent:.2f} seconds ({percentage:.2f}%)")
         else:
-            print(f"Total {function}: {time_spent:.2f} seconds (0.00%)")
+            print(f"Total {tool} time: {time_spent:.2f} seconds (0.00%)")
     if total_time != 0:
-        print(f"Total time: {total_time:.2f} seconds")
+        print(f"Total time (summed over all tools): {total_time:.2f} seconds")
     else:
-        print("Total time: 0.00 seconds")
+        print("Total time (summed over all tools): 0.00 seconds")
+    print(f"Wall-clock scan time with {JOBS} job(s): {scan_wall_clock_time:.2f} seconds")
+
+    trufflehog_stats = get_trufflehog_stats()
+    if not SKIP_TRUFFLEHOG:
+        print(f"TruffleHog findings: {trufflehog_stats['findings']} ({trufflehog_stats['findings_per_second']:.2f} per second of scan time)")
 
-# Concatenate all CSV files into a single CSV file
+# No reports without checkouts
 if not os.path.exists(CHECKOUT_DIR) and not DRY_RUN:    # Skip if ./checkout does not exist
     print("ERROR: The ./checkout folder does not exist. Check your git configuration and try again. No reports will be generated.")
     LOGGER.error("ERROR: The ./checkout folder does not exist. Check your git configuration and try again. No reports will be generated.")  
     exit(0)
 
-gitleaks_merged_report_filename = f"{REPORTS_DIR}/gitleaks_report_merged_filename_{timestamp}.csv"
-if not SKIP_GITLEAKS:
-    print("Concatenating gitleaks report CSV files...")
-    if not DRY_RUN:
-        concatenate_gitleaks_csv_files(gitleaks_merged_report_filename, GITLEAKS_REPORTS_DIR, LOGGER)
-
 ghas_secret_alerts_filename = f"{REPORTS_DIR}/ghas_secret_alerts_{timestamp}.csv"
 if not SKIP_GHAS:
-    repos_without_ghas_secrets_enabled = fetch_ghas_secret_scanning_alerts(ORG_TYPE, OWNERS, github_rest_headers, ghas_secret_alerts_filename, DRY_RUN, LOGGER)
+    with span("ghas_alerts"):
+        repos_without_ghas_secrets_enabled = fetch_ghas_secret_scanning_alerts(ORG_TYPE, OWNERS, github_rest_headers, ghas_secret_alerts_filename, DRY_RUN, LOGGER, args.ghas_concurrency, GITHUB_CLIENT, args.ghas_org_alerts, REPO_INVENTORY)
 else:
     repos_without_ghas_secrets_enabled = None
+
+if HTTP_CACHE:
+    print(f"GitHub API cache: {HTTP_CACHE.stats['hits']} served within TTL, {HTTP_CACHE.stats['not_modified']} not modified (304), {HTTP_CACHE.stats['misses']} fetched")
+if not DRY_RUN:
+    for metric, value in GITHUB_CLIENT.summary().items():
+        print(f"{metric}: {value}")
         
 print("Secrets scanning execution completed.")
 print("Creating merge and match reports.")
@@ -375,16 +661,48 @@ print("Creating merge and match reports.")
 if not DRY_RUN:
     # Create a unified reports of all secrets 
     merged_report_name = f"{REPORTS_DIR}/merged_scan_results_report_{timestamp}.csv"
-    merge_csv_all_tools(KEEP_SECRETS, trufflehog_report_filename, 
-                    gitleaks_merged_report_filename,  
-                    ghas_secret_alerts_filename,
-                    noseyparker_report_filename, 
-                    merged_report_name, LOGGER)
+    # The merged findings are stored in a SQLite database and the merged CSV is exported from it
+    findings_store = FindingsStore(f"{REPORTS_DIR}/findings_{timestamp}.db") if FINDINGS_DB else None
+    # The report metrics are counted while the merged report is written
+    merged_metrics = MergedReportMetrics()
+    # Secrets are hashed with HMAC-SHA256 when a key is set in SECRETSYNTH_HASH_KEY
+    secret_hasher = SecretHasher(key=os.getenv(HASH_KEY_ENV_VAR), workers=args.hash_workers or SCHEDULER.cpu_budget)
+    with span("merge_csv_all_tools"):
+        merge_csv_all_tools(KEEP_SECRETS, trufflehog_report_filename, 
+                        gitleaks_merged_report_filename,  
+                        ghas_secret_alerts_filename,
+                        noseyparker_report_filename, 
+                        merged_report_name, LOGGER, secret_hasher, findings_store, merged_metrics)
+    secret_hasher.shutdown()
 
     # Create another report that is a subset of the merged report, 
-    # with only fuzzy matches found among the secrets results
+    # with the secrets found by more than one tool
     matches_report_name = f"{REPORTS_DIR}/scanning_tool_matches_only_{timestamp}.csv" 
-    find_matches(merged_report_name, matches_report_name, 90)
+    if KEEP_SECRETS:
+        # Plain text secrets can be fuzzy matched
+        with span("find_matches"):
+            matches_count = find_matches(merged_report_name, matches_report_name, 90, SCHEDULER.cpu_budget)
+    else:
+        # Hashes are only similar when they are equal, so correlate the findings by location instead
+        with span("correlate_findings"):
+            matches_count = correlate_findings(merged_report_name, matches_report_name, logger=LOGGER)
+        print(f"Correlated findings found by more than one tool: {matches_count}")
+
+    if GHAS_CLASSIFY:
+        # Findings of the other tools that GHAS secret scanning would likely have found too
+        likely_ghas_matches_name = f"{REPORTS_DIR}/likely_ghas_matches_{timestamp}.csv"
+        with span("classify_ghas_matches"):
+            likely_ghas_count, classified_count = classify_ghas_matches(merged_report_name, likely_ghas_matches_name, GHAS_CLASSIFIER_CACHE_FILE, LOGGER)
+        print(f"Likely GHAS matches: {likely_ghas_count} of {classified_count} findings, written to {likely_ghas_matches_name}")
+
+    if PARQUET:
+        print("Writing Parquet reports...")
+        with span("csv_to_parquet"):
+            csv_to_parquet(merged_report_name, parquet_path_for(merged_report_name), ['owner', 'source'], LOGGER)
+            csv_to_parquet(matches_report_name, parquet_path_for(matches_report_name), ['owner', 'source'], LOGGER)
+            # The GHAS alerts report holds plain text secrets, so it is only kept with --keep-secrets-in-reports
+            if KEEP_SECRETS:
+                csv_to_parquet(ghas_secret_alerts_filename, parquet_path_for(ghas_secret_alerts_filename), ['owner'], LOGGER)
 
     if not KEEP_SECRETS:
         # Delete gitleaks_merged_report_filename & trufflehog_report_filename
@@ -400,14 +718,34 @@ if not DRY_RUN:
             os.remove(ghas_secret_alerts_filename)
 
     # Aggregate report results
-    metrics, repo_metrics, detector_metrics = analyze_merged_results(merged_report_name, matches_report_name, ERROR_LOG_FILE, repos_without_ghas_secrets_enabled)
+    run_metrics = GITHUB_CLIENT.summary()
+    if not SKIP_TRUFFLEHOG:
+        run_metrics["TruffleHog Findings"] = trufflehog_stats["findings"]
+        run_metrics["TruffleHog Findings per Second"] = round(trufflehog_stats["findings_per_second"], 2)
+    run_metrics["Peak RSS of secretsynth (MB)"] = round(peak_rss_mb(), 1)
+    with span("analyze_merged_results"):
+        metrics, repo_metrics, detector_metrics = analyze_merged_results(merged_report_name, matches_report_name, ERROR_LOG_FILE, repos_without_ghas_secrets_enabled, run_metrics, merged_metrics, matches_count,
+                                                                         len(scanned_repos), LOGGER)
+    if findings_store:
+        findings_store.close()
     html_report_path = f"{REPORTS_DIR}/report_{timestamp}.html"
-    output_to_html(metrics, repo_metrics, detector_metrics, timing_metrics, 
-                f"../../{merged_report_name}", 
-                f"../../{ghas_secret_alerts_filename}", 
-                f"../../{matches_report_name}", 
-                f"../../{ERROR_LOG_FILE}",
-                html_report_path)
+    with span("output_to_html"):
+        # The timing table is built from the spans finished so far
+        output_to_html(metrics, repo_metrics, detector_metrics, TRACER.timing_table(), 
+                    f"../../{merged_report_name}", 
+                    f"../../{ghas_secret_alerts_filename}", 
+                    f"../../{matches_report_name}", 
+                    f"../../{ERROR_LOG_FILE}",
+                    html_report_path,
+                    PAGINATED_REPORT)
+
+    # Every span of the run as a Chrome trace (open in chrome://tracing or https://ui.perfetto.dev),
+    # and the time spent on every repository
+    trace_filename = f"{REPORTS_DIR}/trace_{timestamp}.json"
+    repo_timing_filename = f"{REPORTS_DIR}/repo_timing_{timestamp}.csv"
+    TRACER.write_chrome_trace(trace_filename)
+    TRACER.write_repo_timing_csv(repo_timing_filename)
+    print(f"Trace written to {trace_filename}, per-repo timing to {repo_timing_filename}")
     
     if OPEN_REPORT_IN_BROWSER:
         # open the report in the default browser
@@ -1,8 +1,84 @@
 import unittest
 import subprocess
+import csv
+import hashlib
+import hmac
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
 import pexpect
 
 SECRETSYNTH="../secretsynth.py"
+BENCHMARK="../benchmark/bench_reporting.py"
+LOAD_HARNESS="../benchmark/load_harness.py"
+
+# The helper modules are tested directly, from the org-scan directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.scan_scheduler import ScanScheduler, get_cpu_limit, get_memory_limit_mb
+from utils.scan_state import ScanState, get_head_commit, commit_exists
+from utils.http_cache import HttpCache
+from utils.github_client import GitHubClient, SECONDARY_RATE_LIMIT_WAIT_SECONDS
+from utils.repo_inventory import RepoInventory
+from scanners.ghas_secret_alerts_fetch import fetch_ghas_secret_scanning_alerts
+from scanners.gitleaks_scan import GITLEAKS_REPORT_COLUMNS, append_gitleaks_findings, do_gitleaks_scan, gitleaks_report_path
+from scanners.noseyparker_scan import NOSEYPARKER_CSV_COLUMNS, do_noseyparker_scan, json_to_csv, run_noseyparker_report
+from scanners import trufflehog_scan
+from scanners.trufflehog_scan import do_trufflehog_scan, get_trufflehog_stats
+from reporting.secret_hasher import SecretHasher, HashingRowWriter
+from reporting.secret_correlator import correlate_findings
+from reporting import secret_matcher
+from reporting.secret_matcher import find_matches
+from fuzzywuzzy import fuzz
+from reporting.findings_store import FindingsStore
+from reporting.ghas_classifier import GhasClassifier, classify_ghas_matches
+from reporting.csv_coalesce import MERGED_REPORT_HEADERS
+from reporting.parquet_writer import PYARROW_AVAILABLE, csv_to_parquet, parquet_path_for
+from reporting.merged_metrics import MergedReportMetrics, MetricsRowWriter, aggregate_report_metrics
+from reporting.report_metrics import analyze_merged_results
+from reporting import html_report_writer
+from reporting.html_report_writer import get_table_style, output_to_html
+from utils import tracing
+from utils.tracing import REPO_TIMING_COLUMNS, Span, TracedPopen, Tracer, run_traced
+import pandas as pd
+from utils.cost_model import ScanCostModel, _fit
+from utils.checkout_budget import CheckoutDiskBudget
+from benchmark.load_harness import FakeGitHubApi, create_local_repos, run_secretsynth, write_stub_scanners
+from requests.models import Response
+
+# Writes content to root/relative_path, creating its directories
+def write_file(root, relative_path, content):
+    path = os.path.join(root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+# Builds a requests Response, for the stand-ins of the GitHub API
+def make_response(status_code, body='', headers=None, url=''):
+    response = Response()
+    response.status_code = status_code
+    response.url = url
+    response.headers.update(headers or {})
+    response.encoding = 'utf-8'
+    response._content = body.encode('utf-8')
+    return response
+
+# Returns the rows of a CSV file
+def read_csv_rows(path):
+    with open(path, 'r', newline='') as f:
+        return list(csv.reader(f))
+
+# Writes rows to a CSV file
+def write_csv_rows(path, rows):
+    with open(path, 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+    return path
 
 # Working directory should be the location of this script
 #  Run: python3 -m unittest ss_unittests.py
@@ -23,6 +99,53 @@ class TestSecretsynth(unittest.TestCase):
         # Check that the command failed
         self.assertNotEqual(result.returncode, 0)
 
+    def test_2a_dry_run_parallel_jobs(self):
+        # Run a dry run with several repositories scanned in parallel
+        result = subprocess.run(['python3', SECRETSYNTH, '--dry-run', '--owners', 'foo,bar', '--org-type', 'orgs', '--jobs', '4'], capture_output=True)
+
+        print(result.stderr)
+        self.assertEqual(result.returncode, 0)
+
+    def test_2c_dry_run_is_offline(self):
+        # A dry run with a token makes no GitHub API requests, and estimates the run from --inventory-file
+        requests_seen = []
+        class NotFoundHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests_seen.append(self.path)
+                self.send_response(404)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(b'{"message": "Not Found"}')
+            def log_message(self, format, *args):
+                pass
+        server = HTTPServer(('127.0.0.1', 0), NotFoundHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        env = dict(os.environ, GITHUB_ACCESS_TOKEN='dry-run-token', GITHUB_API_URL=f"http://127.0.0.1:{server.server_port}")
+        try:
+            with tempfile.TemporaryDirectory() as work_dir:
+                inventory_file = os.path.join(work_dir, 'repo_inventory.json')
+                inventory = RepoInventory('orgs')
+                inventory.add_owner('foo', [{'name': name, 'full_name': f"foo/{name}", 'clone_url': f"https://github.com/foo/{name}.git", 'size': size}
+                                            for name, size in [('repo1', 2048), ('repo2', 100)]])
+                inventory.save(inventory_file)
+                result = subprocess.run(['python3', SECRETSYNTH, '--dry-run', '--owners', 'foo,bar', '--org-type', 'orgs', '--inventory-file', inventory_file],
+                                        capture_output=True, text=True, env=env)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        print(result.stderr)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(requests_seen, [])
+        self.assertIn("Estimate for 2 repositories", result.stdout)
+
+    def test_2b_invalid_jobs(self):
+        # --jobs must be at least 1
+        result = subprocess.run(['python3', SECRETSYNTH, '--dry-run', '--owners', 'foo', '--org-type', 'orgs', '--jobs', '0'], capture_output=True)
+
+        print(result.stderr)
+        self.assertNotEqual(result.returncode, 0)
+
     def test_3_skip_all_scanners(self):
         # Run the command with arguments to skip all scanners and capture the output
         result = subprocess.run(['python3', SECRETSYNTH, '--org-type', 'users', '--owners', 'swell-consulting', '--skip-ghas', '--skip-trufflehog', '--skip-gitleaks', '--skip-noseyparker'], capture_output=True)
@@ -48,6 +171,106 @@ class TestSecretsynth(unittest.TestCase):
         print(result.stderr)
         self.assertEqual(result.returncode, 0)
 
+    def test_6_reporting_benchmark(self):
+        # Run the reporting benchmark on a small set of synthetic findings, no network or scanners needed
+        with tempfile.TemporaryDirectory() as work_dir:
+            output = os.path.join(work_dir, 'results.json')
+            result = subprocess.run(['python3', BENCHMARK, '--findings', '1000', '--repos', '10', '--work-dir', work_dir, '--output', output], capture_output=True, text=True)
+
+            print(result.stderr)
+            self.assertEqual(result.returncode, 0)
+            with open(output, 'r') as f:
+                runs = json.load(f)['runs']
+            self.assertEqual([run['stage'] for run in runs], ['merge_csv_all_tools', 'find_matches', 'correlate_findings', 'analyze_merged_results', 'output_to_html', 'output_to_html_paginated'])
+            for run in runs:
+                self.assertIn('seconds', run)
+                self.assertGreater(run['peak_rss_mb'], 0)
+
+    def test_7_load_harness(self):
+        # Run secretsynth.py end to end against local repositories, the GitHub API stand-in and the stub scanners
+        with tempfile.TemporaryDirectory() as work_dir:
+            output = os.path.join(work_dir, 'results.json')
+            result = subprocess.run(['python3', LOAD_HARNESS, '--repos', '3', '--commits', '10', '--page-size', '2', '--secondary-rate-limit-every', '4',
+                                     '--work-dir', work_dir, '--output', output], capture_output=True, text=True)
+
+            print(result.stderr)
+            self.assertEqual(result.returncode, 0)
+            with open(output, 'r') as f:
+                results = json.load(f)
+            self.assertEqual(results['exit_code'], 0)
+            self.assertGreater(results['github_api']['secondary_rate_limited'], 0)
+            merged_rows = [rows for name, rows in results['report_rows'].items() if name.startswith('merged_scan_results_report')]
+            self.assertEqual(len(merged_rows), 1)
+            self.assertGreater(merged_rows[0], 0)
+            # Every scanned repository is recorded in the scan history for the next run
+            with open(os.path.join(work_dir, 'run', '_scan_history.json'), 'r') as f:
+                self.assertEqual(len(json.load(f)['repos']), 3)
+
+    def test_7a_load_harness_delete_checkouts(self):
+        # Every checkout is deleted once its scans are done, and the reports are still written
+        with tempfile.TemporaryDirectory() as work_dir:
+            output = os.path.join(work_dir, 'results.json')
+            result = subprocess.run(['python3', LOAD_HARNESS, '--repos', '3', '--commits', '10', '--work-dir', work_dir, '--output', output,
+                                     '--secretsynth-args', '--jobs 2 --checkout-disk-budget-mb 1 --delete-checkouts'], capture_output=True, text=True)
+
+            print(result.stderr)
+            self.assertEqual(result.returncode, 0)
+            with open(output, 'r') as f:
+                results = json.load(f)
+            self.assertEqual(results['exit_code'], 0)
+            self.assertEqual(os.listdir(os.path.join(work_dir, 'run', '_checkout')), [])
+            merged_rows = [rows for name, rows in results['report_rows'].items() if name.startswith('merged_scan_results_report')]
+            self.assertGreater(merged_rows[0], 0)
+
+    def test_7b_incremental_enables_a_tool(self):
+        # A tool skipped by the first --incremental run scans the full history when a later run enables it
+        with tempfile.TemporaryDirectory() as work_dir:
+            manifest = create_local_repos(os.path.join(work_dir, 'remotes'), ['load-org0'], 2, 5, leaks_per_repo=3)
+            bin_dir = write_stub_scanners(os.path.join(work_dir, 'bin'))
+            api = FakeGitHubApi(manifest)
+            api_url = api.start()
+            run_dir = os.path.join(work_dir, 'run')
+            args = ['--org-type', 'orgs', '--owners', 'load-org0', '--skip-ghas', '--skip-noseyparker', '--incremental']
+            try:
+                first = run_secretsynth(run_dir, bin_dir, api_url, args + ['--skip-trufflehog'])
+                second = run_secretsynth(run_dir, bin_dir, api_url, args)
+            finally:
+                api.stop()
+            self.assertEqual(first['exit_code'], 0)
+            self.assertEqual(second['exit_code'], 0)
+
+            with open(os.path.join(run_dir, '_scan_state', 'scan_state.json'), 'r') as f:
+                scan_state = json.load(f)
+            self.assertEqual(sorted(scan_state), ['load-org0/repo00000', 'load-org0/repo00001'])
+            for repo_state in scan_state.values():
+                self.assertEqual(sorted(repo_state), ['gitleaks', 'trufflehog'])
+                self.assertEqual(repo_state['gitleaks']['last_scanned_commit'], repo_state['trufflehog']['last_scanned_commit'])
+            # Both repositories have trufflehog findings, though HEAD did not move since the first run
+            for repo in ['repo00000', 'repo00001']:
+                stored_findings = os.path.join(run_dir, '_scan_state', 'findings', 'load-org0', repo, 'trufflehog.csv')
+                self.assertGreater(len(read_csv_rows(stored_findings)), 0)
+            with open(second['log_file'], 'r') as f:
+                self.assertIn("with trufflehog, it has not scanned the repository before", f.read())
+
+    def test_7c_inventory_leaves_out_failed_owners(self):
+        # An owner whose repository list fails is not saved as an owner without repositories
+        with tempfile.TemporaryDirectory() as work_dir:
+            manifest = create_local_repos(os.path.join(work_dir, 'remotes'), ['load-org0'], 2, 3)
+            api = FakeGitHubApi(manifest)
+            api_url = api.start()
+            run_dir = os.path.join(work_dir, 'run')
+            try:
+                run = run_secretsynth(run_dir, write_stub_scanners(os.path.join(work_dir, 'bin')), api_url,
+                                      ['--org-type', 'orgs', '--owners', 'load-org0,missing-org', '--skip-ghas', '--skip-gitleaks', '--skip-trufflehog', '--skip-noseyparker'])
+            finally:
+                api.stop()
+            self.assertEqual(run['exit_code'], 0)
+            reports_dir = os.path.join(run_dir, '_reports', os.listdir(os.path.join(run_dir, '_reports'))[0])
+            inventory_file = [name for name in os.listdir(reports_dir) if name.startswith('repo_inventory_')][0]
+            inventory = RepoInventory.load(os.path.join(reports_dir, inventory_file))
+            self.assertEqual(inventory.owners(), ['load-org0'])
+            self.assertEqual(inventory.total_repos(), 2)
+
     def test_999_clean(self):
         # Run the command
         child = pexpect.spawn(f'python3 {SECRETSYNTH} --clean')
@@ -73,5 +296,1348 @@ class TestSecretsynth(unittest.TestCase):
         # Check that the command completed successfully
         self.assertEqual(child.exitstatus, 0)
 
+class TestScanScheduler(unittest.TestCase):
+    def test_cgroup_v2_limits(self):
+        with tempfile.TemporaryDirectory() as cgroup_root:
+            write_file(cgroup_root, 'cpu.max', '150000 100000\n')
+            write_file(cgroup_root, 'memory.max', f"{512 * 1024 * 1024}\n")
+            self.assertEqual(get_cpu_limit(cgroup_root), 1)
+            self.assertEqual(get_memory_limit_mb(cgroup_root), 512)
+
+    def test_cgroup_v2_no_limits(self):
+        with tempfile.TemporaryDirectory() as cgroup_root:
+            write_file(cgroup_root, 'cpu.max', 'max 100000\n')
+            write_file(cgroup_root, 'memory.max', 'max\n')
+            self.assertEqual(get_cpu_limit(cgroup_root), len(os.sched_getaffinity(0)))
+            self.assertEqual(get_memory_limit_mb(cgroup_root), os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024))
+
+    def test_cgroup_v1_limits(self):
+        with tempfile.TemporaryDirectory() as cgroup_root:
+            write_file(cgroup_root, 'cpu/cpu.cfs_quota_us', '100000\n')
+            write_file(cgroup_root, 'cpu/cpu.cfs_period_us', '100000\n')
+            write_file(cgroup_root, 'memory/memory.limit_in_bytes', f"{256 * 1024 * 1024}\n")
+            self.assertEqual(get_cpu_limit(cgroup_root), 1)
+            self.assertEqual(get_memory_limit_mb(cgroup_root), 256)
+
+    def test_cgroup_v1_no_limits(self):
+        with tempfile.TemporaryDirectory() as cgroup_root:
+            write_file(cgroup_root, 'cpu/cpu.cfs_quota_us', '-1\n')
+            write_file(cgroup_root, 'cpu/cpu.cfs_period_us', '100000\n')
+            # cgroup v1 reports a huge number when there is no memory limit
+            write_file(cgroup_root, 'memory/memory.limit_in_bytes', '9223372036854771712\n')
+            self.assertEqual(get_cpu_limit(cgroup_root), len(os.sched_getaffinity(0)))
+            self.assertEqual(get_memory_limit_mb(cgroup_root), os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024))
+
+    def test_per_tool_concurrency(self):
+        scheduler = ScanScheduler(cpu_budget=8, memory_budget_mb=64 * 1024, concurrency={"gitleaks": 2, "trufflehog": 1, "noseyparker": 1})
+        running = {"gitleaks": 0}
+        most_running = {"gitleaks": 0}
+        lock = threading.Lock()
+
+        def scan():
+            with lock:
+                running["gitleaks"] += 1
+                most_running["gitleaks"] = max(most_running["gitleaks"], running["gitleaks"])
+            time.sleep(0.05)
+            with lock:
+                running["gitleaks"] -= 1
+            return True
+
+        repo_threads = [threading.Thread(target=scheduler.run_tools, args=([("gitleaks", scan, ())],)) for _ in range(6)]
+        for thread in repo_threads:
+            thread.start()
+        for thread in repo_threads:
+            thread.join()
+        scheduler.shutdown()
+        self.assertEqual(most_running["gitleaks"], 2)
+
+    def test_no_head_of_line_blocking(self):
+        # A backlog of gitleaks scans must not hold up a trufflehog scan that has a free slot
+        scheduler = ScanScheduler(cpu_budget=8, memory_budget_mb=64 * 1024, concurrency={"gitleaks": 1, "trufflehog": 1, "noseyparker": 1})
+        gitleaks_done = threading.Event()
+
+        def slow_gitleaks():
+            gitleaks_done.wait(5)
+            return True
+
+        repo_threads = [threading.Thread(target=scheduler.run_tools, args=([("gitleaks", slow_gitleaks, ())],)) for _ in range(4)]
+        for thread in repo_threads:
+            thread.start()
+        results = scheduler.run_tools([("trufflehog", lambda: gitleaks_done.is_set(), ())])
+        gitleaks_done.set()
+        for thread in repo_threads:
+            thread.join()
+        scheduler.shutdown()
+        # trufflehog finished while the gitleaks scans were still waiting
+        self.assertFalse(results["trufflehog"][1])
+
+class TestScanState(unittest.TestCase):
+    def test_state_file_round_trip(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            state = ScanState(state_dir)
+            self.assertIsNone(state.last_scanned_commit('owner', 'repo', 'gitleaks'))
+            state.record_scanned_commit('owner', 'repo', ['gitleaks', 'trufflehog'], 'abc123')
+            state.record_scanned_commit('owner', 'other', ['gitleaks'], 'def456')
+            state.record_scanned_commit('owner', 'repo', ['gitleaks'], 'abc456')
+
+            # A new run reads the state written by the earlier one
+            reloaded = ScanState(state_dir)
+            self.assertEqual(reloaded.last_scanned_commit('owner', 'repo', 'gitleaks'), 'abc456')
+            self.assertEqual(reloaded.last_scanned_commit('owner', 'repo', 'trufflehog'), 'abc123')
+            self.assertEqual(reloaded.last_scanned_commit('owner', 'other', 'gitleaks'), 'def456')
+            # A tool skipped by the earlier runs has no state
+            self.assertIsNone(reloaded.last_scanned_commit('owner', 'other', 'trufflehog'))
+            self.assertFalse(os.path.exists(os.path.join(state_dir, 'scan_state.json.tmp')))
+
+    def test_state_file_of_an_older_version(self):
+        # Older state files have one commit for all tools, which no tool uses
+        with tempfile.TemporaryDirectory() as state_dir:
+            write_file(state_dir, 'scan_state.json', json.dumps({'owner/repo': {'last_scanned_commit': 'abc123', 'scanned_at': '2024-01-01T00:00:00'}}))
+            state = ScanState(state_dir)
+            self.assertIsNone(state.last_scanned_commit('owner', 'repo', 'gitleaks'))
+            state.record_scanned_commit('owner', 'repo', ['gitleaks'], 'def456')
+            with open(os.path.join(state_dir, 'scan_state.json'), 'r') as f:
+                self.assertEqual(list(json.load(f)['owner/repo']), ['gitleaks'])
+
+    def test_merge_findings_by_key_column(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            state = ScanState(state_dir)
+            new_file = write_csv_rows(state.new_findings_file('owner', 'repo', 'gitleaks'),
+                                      [['Fingerprint', 'Secret'], ['fp1', 'a'], ['fp2', 'b']])
+            state.merge_findings('owner', 'repo', 'gitleaks', new_file, key_column='Fingerprint')
+
+            # The next scan finds fp2 again, with a different value, and a new fp3
+            new_file = write_csv_rows(state.new_findings_file('owner', 'repo', 'gitleaks'),
+                                      [['Fingerprint', 'Secret'], ['fp2', 'changed'], ['fp3', 'c']])
+            stored_file = state.merge_findings('owner', 'repo', 'gitleaks', new_file, key_column='Fingerprint')
+            self.assertEqual(read_csv_rows(stored_file), [['Fingerprint', 'Secret'], ['fp1', 'a'], ['fp2', 'b'], ['fp3', 'c']])
+
+    def test_merge_findings_reorders_changed_columns(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            state = ScanState(state_dir)
+            new_file = write_csv_rows(state.new_findings_file('owner', 'repo', 'gitleaks'), [['Fingerprint', 'Secret'], ['fp1', 'a']])
+            state.merge_findings('owner', 'repo', 'gitleaks', new_file, key_column='Fingerprint')
+            new_file = write_csv_rows(state.new_findings_file('owner', 'repo', 'gitleaks'), [['Secret', 'Fingerprint'], ['b', 'fp2']])
+            stored_file = state.merge_findings('owner', 'repo', 'gitleaks', new_file, key_column='Fingerprint')
+            self.assertEqual(read_csv_rows(stored_file), [['Fingerprint', 'Secret'], ['fp1', 'a'], ['fp2', 'b']])
+
+    def test_merge_findings_by_whole_row(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            state = ScanState(state_dir)
+            new_file = write_csv_rows(state.new_findings_file('owner', 'repo', 'trufflehog'), [['owner', 'repo', 'a'], ['owner', 'repo', 'b']])
+            state.merge_findings('owner', 'repo', 'trufflehog', new_file, has_header=False)
+            new_file = write_csv_rows(state.new_findings_file('owner', 'repo', 'trufflehog'), [['owner', 'repo', 'b'], ['owner', 'repo', 'c']])
+            stored_file = state.merge_findings('owner', 'repo', 'trufflehog', new_file, has_header=False)
+            self.assertEqual(read_csv_rows(stored_file), [['owner', 'repo', 'a'], ['owner', 'repo', 'b'], ['owner', 'repo', 'c']])
+
+    def test_merge_without_new_findings(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            state = ScanState(state_dir)
+            stored_file = state.merge_findings('owner', 'repo', 'gitleaks', state.new_findings_file('owner', 'repo', 'gitleaks'))
+            self.assertFalse(os.path.exists(stored_file))
+
+    def test_head_commit_and_commit_exists(self):
+        with tempfile.TemporaryDirectory() as repo_path:
+            git = ['git', '-C', repo_path, '-c', 'user.name=test', '-c', 'user.email=test@example.com']
+            subprocess.run(['git', 'init', '-q', repo_path], check=True)
+            subprocess.run(git + ['commit', '-q', '--allow-empty', '-m', 'first'], check=True)
+            head = get_head_commit(repo_path)
+            self.assertEqual(len(head), 40)
+            self.assertTrue(commit_exists(repo_path, head))
+            self.assertFalse(commit_exists(repo_path, '0' * 40))
+
+class FakeGet:
+    # Answers GETs with responses in order, and records the headers of every request
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, url, headers=None):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+class TestHttpCache(unittest.TestCase):
+    REPOS_URL = 'https://api.github.com/orgs/org1/repos?page=1&per_page=100'
+    ALERTS_URL = 'https://api.github.com/repos/org1/repo1/secret-scanning/alerts?page=1'
+
+    def test_etag_revalidation(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = HttpCache(cache_dir)
+            get = FakeGet(make_response(200, '[{"name": "repo1"}]', {'ETag': '"v1"'}), make_response(304))
+            self.assertEqual(cache.get(self.REPOS_URL, {'Authorization': 'token x'}, get).json(), [{'name': 'repo1'}])
+
+            # The second request sends the ETag, and the 304 is served from the cache
+            response = cache.get(self.REPOS_URL, {'Authorization': 'token x'}, get)
+            self.assertEqual(get.requests[1]['If-None-Match'], '"v1"')
+            self.assertEqual(response.json(), [{'name': 'repo1'}])
+            self.assertTrue(response.from_cache)
+            self.assertEqual(cache.stats, {'hits': 0, 'not_modified': 1, 'misses': 1})
+
+    def test_changed_response_replaces_entry(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = HttpCache(cache_dir)
+            get = FakeGet(make_response(200, '["v1"]', {'ETag': '"v1"'}), make_response(200, '["v2"]', {'ETag': '"v2"'}), make_response(304))
+            cache.get(self.REPOS_URL, None, get)
+            self.assertEqual(cache.get(self.REPOS_URL, None, get).json(), ['v2'])
+            self.assertEqual(cache.get(self.REPOS_URL, None, get).json(), ['v2'])
+            self.assertEqual(get.requests[2]['If-None-Match'], '"v2"')
+
+    def test_ttl_expiry(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = HttpCache(cache_dir, ttl_seconds=60)
+            get = FakeGet(make_response(200, '["v1"]', {'ETag': '"v1"'}), make_response(304))
+            cache.get(self.REPOS_URL, None, get)
+            # Within the TTL the API is not called
+            self.assertEqual(cache.get(self.REPOS_URL, None, get).json(), ['v1'])
+            self.assertEqual(len(get.requests), 1)
+            self.assertEqual(cache.stats['hits'], 1)
+
+            # After it, the entry is revalidated
+            expired = HttpCache(cache_dir, ttl_seconds=0)
+            self.assertEqual(expired.get(self.REPOS_URL, None, get).json(), ['v1'])
+            self.assertEqual(len(get.requests), 2)
+            self.assertEqual(expired.stats['not_modified'], 1)
+
+    def test_files_only_readable_by_owner(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_dir = os.path.join(cache_dir, 'cache')
+            cache = HttpCache(cache_dir)
+            cache.get(self.REPOS_URL, None, FakeGet(make_response(200, '[]', {'ETag': '"v1"'})))
+            self.assertEqual(os.stat(cache_dir).st_mode & 0o777, 0o700)
+            entries = os.listdir(cache_dir)
+            self.assertEqual(len(entries), 1)
+            self.assertEqual(os.stat(os.path.join(cache_dir, entries[0])).st_mode & 0o777, 0o600)
+
+    def test_secret_alerts_not_cached_by_default(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = HttpCache(cache_dir)
+            get = FakeGet(make_response(200, '[{"secret": "plain"}]', {'ETag': '"v1"'}), make_response(200, '[]', {'ETag': '"v2"'}))
+            cache.get(self.ALERTS_URL, None, get)
+            cache.get(self.ALERTS_URL, None, get)
+            self.assertEqual(os.listdir(cache_dir), [])
+            self.assertNotIn('If-None-Match', get.requests[1])
+
+    def test_secret_alerts_cached_when_secrets_are_kept(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = HttpCache(cache_dir, cache_secret_alerts=True)
+            get = FakeGet(make_response(200, '[{"secret": "plain"}]', {'ETag': '"v1"'}), make_response(304))
+            cache.get(self.ALERTS_URL, None, get)
+            self.assertEqual(cache.get(self.ALERTS_URL, None, get).json(), [{'secret': 'plain'}])
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            # A run that doesn't keep the secrets deletes them
+            HttpCache(cache_dir)
+            self.assertEqual(os.listdir(cache_dir), [])
+
+class FakeSession:
+    # Answers session.get with responses in order
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url, headers=None):
+        self.urls.append(url)
+        return self.responses.pop(0)
+
+class TestGitHubClient(unittest.TestCase):
+    URL = 'https://api.github.com/orgs/org1/repos'
+
+    def client(self, *responses, max_retries=5):
+        client = GitHubClient({'Authorization': 'token x'}, max_retries=max_retries)
+        client.session = FakeSession(*responses)
+        return client
+
+    def test_retry_after(self):
+        client = self.client(make_response(429, '{}', {'Retry-After': '7'}), make_response(200, '[]'))
+        with mock.patch('utils.github_client.time.sleep') as sleep:
+            response = client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        sleep.assert_called_once_with(7)
+        self.assertEqual(client.stats['requests'], 2)
+        self.assertEqual(client.stats['rate_limited'], 1)
+        self.assertEqual(client.stats['retries'], 1)
+
+    def test_primary_rate_limit_waits_for_reset(self):
+        reset = int(time.time()) + 30
+        client = self.client(make_response(403, '{"message": "API rate limit exceeded"}', {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(reset)}),
+                             make_response(200, '[]', {'X-RateLimit-Remaining': '4999', 'X-RateLimit-Limit': '5000', 'X-RateLimit-Reset': str(reset + 3600)}))
+        with mock.patch('utils.github_client.time.sleep') as sleep:
+            self.assertEqual(client.get(self.URL).status_code, 200)
+        self.assertTrue(28 <= sleep.call_args_list[0][0][0] <= 30)
+        self.assertEqual(client.summary()['GitHub API Rate Limit Remaining'], '4999 of 5000')
+
+    def test_secondary_rate_limit_without_retry_after(self):
+        client = self.client(make_response(403, '{"message": "You have exceeded a secondary rate limit"}'), make_response(200, '[]'))
+        with mock.patch('utils.github_client.time.sleep') as sleep:
+            self.assertEqual(client.get(self.URL).status_code, 200)
+        sleep.assert_called_once_with(SECONDARY_RATE_LIMIT_WAIT_SECONDS)
+
+    def test_forbidden_is_not_retried(self):
+        client = self.client(make_response(403, '{"message": "Resource not accessible by integration"}'))
+        with mock.patch('utils.github_client.time.sleep') as sleep:
+            self.assertEqual(client.get(self.URL).status_code, 403)
+        sleep.assert_not_called()
+        self.assertEqual(client.stats['retries'], 0)
+
+    def test_server_errors_back_off_until_max_retries(self):
+        client = self.client(*[make_response(502, '{}') for _ in range(3)], max_retries=2)
+        with mock.patch('utils.github_client.time.sleep') as sleep:
+            self.assertEqual(client.get(self.URL).status_code, 502)
+        self.assertEqual([call[0][0] for call in sleep.call_args_list], [1, 2])
+        self.assertEqual(client.stats['requests'], 3)
+        # Server errors are not rate limits
+        self.assertEqual(client.stats['rate_limit_wait_seconds'], 0)
+
+    def test_pacing_spreads_the_remaining_requests(self):
+        # 10 requests left for the next 100 seconds: one every 10 seconds
+        headers = {'X-RateLimit-Remaining': '10', 'X-RateLimit-Reset': str(int(time.time()) + 100)}
+        client = self.client(*[make_response(200, '[]', headers) for _ in range(3)])
+        with mock.patch('utils.github_client.time.sleep') as sleep:
+            for _ in range(3):
+                client.get(self.URL)
+        delays = [call[0][0] for call in sleep.call_args_list]
+        self.assertEqual(len(delays), 1)
+        self.assertTrue(8 <= delays[0] <= 10)
+
+    def test_no_pacing_with_requests_to_spare(self):
+        headers = {'X-RateLimit-Remaining': '4000', 'X-RateLimit-Reset': str(int(time.time()) + 100)}
+        client = self.client(*[make_response(200, '[]', headers) for _ in range(3)])
+        with mock.patch('utils.github_client.time.sleep') as sleep:
+            for _ in range(3):
+                client.get(self.URL)
+        sleep.assert_not_called()
+
+# A secret scanning alert of the GitHub API, as the org-wide endpoint returns it
+def make_alert(repo_name, number):
+    alert = {field: None for field in ['created_at', 'updated_at', 'url', 'html_url', 'locations_url', 'validity', 'resolution', 'resolved_by',
+                                       'resolved_at', 'resolution_comment', 'push_protection_bypassed', 'push_protection_bypassed_by',
+                                       'push_protection_bypassed_at']}
+    alert.update({'number': number, 'state': 'open', 'secret_type': 'github_personal_access_token',
+                  'secret_type_display_name': 'GitHub Personal Access Token', 'secret': f"ghp_{number}", 'repository': {'name': repo_name}})
+    return alert
+
+class FakeGitHubClient:
+    # Answers get(url) from a dict of URL to the list of responses it returns in order
+    def __init__(self, responses):
+        self.responses = responses
+        self.headers = {}
+        self.urls = []
+
+    def get(self, url):
+        self.urls.append(url)
+        return self.responses[url].pop(0)
+
+class TestGhasOrgAlerts(unittest.TestCase):
+    ORG_URL = 'https://api.github.com/orgs/org1/secret-scanning/alerts?per_page=100'
+    ORG_PAGE_2_URL = 'https://api.github.com/orgs/org1/secret-scanning/alerts?per_page=100&after=2'
+
+    def repo_url(self, repo_name):
+        return f"https://api.github.com/repos/org1/{repo_name}/secret-scanning/alerts?per_page=100"
+
+    def fetch(self, responses, repo_names):
+        inventory = RepoInventory('orgs')
+        inventory.add_owner('org1', [{'name': name, 'security_and_analysis': {'secret_scanning': {'status': 'enabled'}}} for name in repo_names])
+        client = FakeGitHubClient(responses)
+        with tempfile.TemporaryDirectory() as report_dir:
+            report_name = os.path.join(report_dir, 'ghas.csv')
+            with mock.patch('scanners.ghas_secret_alerts_fetch.GITHUB_API_URL', 'https://api.github.com'):
+                fetch_ghas_secret_scanning_alerts('orgs', ['org1'], {}, report_name, github_client=client, use_org_alerts_endpoint=True, inventory=inventory)
+            with open(report_name, 'r', newline='') as f:
+                return [(row['repo'], row['number']) for row in csv.DictReader(f)], client
+
+    def test_alerts_of_repos_outside_the_inventory_are_dropped(self):
+        responses = {self.ORG_URL: [make_response(200, json.dumps([make_alert('scanned', 1), make_alert('not-scanned', 2)]),
+                                                  {'Link': f'<{self.ORG_PAGE_2_URL}>; rel="next"'})],
+                     self.ORG_PAGE_2_URL: [make_response(200, json.dumps([make_alert('scanned', 3)]))]}
+        rows, _ = self.fetch(responses, ['scanned'])
+        self.assertEqual(rows, [('scanned', '1'), ('scanned', '3')])
+
+    def test_failed_pagination_falls_back_without_partial_rows(self):
+        # The second org page fails: the rows of the first page are dropped and every repo is fetched on its own
+        responses = {self.ORG_URL: [make_response(200, json.dumps([make_alert('repo1', 1)]), {'Link': f'<{self.ORG_PAGE_2_URL}>; rel="next"'})],
+                     self.ORG_PAGE_2_URL: [make_response(502, '{"message": "Server Error"}')],
+                     self.repo_url('repo1'): [make_response(200, json.dumps([make_alert('repo1', 1)]))],
+                     self.repo_url('repo2'): [make_response(200, json.dumps([make_alert('repo2', 5)]))]}
+        rows, client = self.fetch(responses, ['repo1', 'repo2'])
+        self.assertEqual(sorted(rows), [('repo1', '1'), ('repo2', '5')])
+        self.assertIn(self.repo_url('repo1'), client.urls)
+
+class TestGhasRepoAlerts(unittest.TestCase):
+    def repo_url(self, repo_name, after=None):
+        url = f"https://api.github.com/repos/org1/{repo_name}/secret-scanning/alerts?per_page=100"
+        return f"{url}&after={after}" if after else url
+
+    def next_link(self, url):
+        return {'Link': f'<{url}>; rel="next", <{self.repo_url("repo1")}>; rel="first"'}
+
+    def fetch(self, responses, repo_names, max_concurrent_requests=16):
+        inventory = RepoInventory('orgs')
+        inventory.add_owner('org1', [{'name': name} for name in repo_names])
+        client = FakeGitHubClient(responses)
+        with tempfile.TemporaryDirectory() as report_dir:
+            report_name = os.path.join(report_dir, 'ghas.csv')
+            with mock.patch('scanners.ghas_secret_alerts_fetch.GITHUB_API_URL', 'https://api.github.com'):
+                disabled = fetch_ghas_secret_scanning_alerts('orgs', ['org1'], {}, report_name, max_concurrent_requests=max_concurrent_requests,
+                                                             github_client=client, inventory=inventory)
+            with open(report_name, 'r', newline='') as f:
+                return [(row['repo'], row['number']) for row in csv.DictReader(f)], client, disabled
+
+    def test_pages_follow_link_headers(self):
+        responses = {
+            self.repo_url('repo1'): [make_response(200, json.dumps([make_alert('repo1', 1), make_alert('repo1', 2)]), self.next_link(self.repo_url('repo1', 'a')))],
+            self.repo_url('repo1', 'a'): [make_response(200, json.dumps([make_alert('repo1', 3)]), self.next_link(self.repo_url('repo1', 'b')))],
+            # The last page has no next link
+            self.repo_url('repo1', 'b'): [make_response(200, json.dumps([make_alert('repo1', 4)]), {'Link': f'<{self.repo_url("repo1")}>; rel="first"'})],
+            self.repo_url('repo2'): [make_response(200, json.dumps([make_alert('repo2', 7)]), self.next_link(self.repo_url('repo2', 'a')))],
+            self.repo_url('repo2', 'a'): [make_response(200, '[]')],
+            self.repo_url('repo3'): [make_response(404, '{"message": "Secret scanning is disabled on this repository."}')]}
+        for max_concurrent_requests in (1, 16):
+            rows, client, disabled = self.fetch({url: list(pages) for url, pages in responses.items()}, ['repo1', 'repo2', 'repo3'], max_concurrent_requests)
+            # The pages of the repos are fetched concurrently, the rows of a repo are in page order
+            self.assertEqual([row for row in rows if row[0] == 'repo1'], [('repo1', '1'), ('repo1', '2'), ('repo1', '3'), ('repo1', '4')])
+            self.assertEqual(sorted(rows), [('repo1', '1'), ('repo1', '2'), ('repo1', '3'), ('repo1', '4'), ('repo2', '7')])
+            self.assertEqual(sorted(client.urls), sorted(responses))
+            self.assertEqual(disabled, [{'name': 'repo3'}])
+
+    def test_failed_page_keeps_the_earlier_pages(self):
+        responses = {
+            self.repo_url('repo1'): [make_response(200, json.dumps([make_alert('repo1', 1)]), self.next_link(self.repo_url('repo1', 'a')))],
+            self.repo_url('repo1', 'a'): [make_response(200, json.dumps([make_alert('repo1', 2)]), self.next_link(self.repo_url('repo1', 'b')))],
+            self.repo_url('repo1', 'b'): [make_response(502, '{"message": "Server Error"}')]}
+        rows, client, disabled = self.fetch(responses, ['repo1'])
+        self.assertEqual(rows, [('repo1', '1'), ('repo1', '2')])
+        self.assertEqual(client.urls, [self.repo_url('repo1'), self.repo_url('repo1', 'a'), self.repo_url('repo1', 'b')])
+        self.assertEqual(disabled, [])
+
+GITLEAKS_FINDING = {'RuleID': 'aws-access-token', 'Commit': 'abc123', 'File': 'config.py', 'SymlinkFile': '', 'Secret': 'AKIAEXAMPLE',
+                    'Match': 'key = AKIAEXAMPLE', 'StartLine': 3, 'EndLine': 3, 'StartColumn': 7, 'EndColumn': 17, 'Author': 'dev',
+                    'Message': 'add config', 'Date': '2024-01-01T00:00:00Z', 'Email': 'dev@example.com',
+                    'Fingerprint': 'abc123:config.py:aws-access-token:3', 'Tags': ['key', 'AWS'], 'Entropy': 3.5}
+
+class TestGitleaksScan(unittest.TestCase):
+    def test_json_report_rows(self):
+        with tempfile.TemporaryDirectory() as root:
+            findings_file = write_file(root, 'gitleaks_findings_org_repo1.json', json.dumps([GITLEAKS_FINDING, {'RuleID': 'generic-api-key', 'Tags': []}]))
+            report_file = os.path.join(root, 'gitleaks_report.csv')
+            self.assertEqual(append_gitleaks_findings('org', 'repo1', findings_file, report_file), 2)
+            self.assertEqual(append_gitleaks_findings('org', 'repo2', findings_file, report_file), 2)
+            rows = read_csv_rows(report_file)
+            # One header row, the report columns in order, fields gitleaks adds (Entropy) left out
+            self.assertEqual(rows[0], GITLEAKS_REPORT_COLUMNS)
+            self.assertEqual(len(rows), 5)
+            first = dict(zip(rows[0], rows[1]))
+            self.assertEqual((first['Owner'], first['Repository'], first['RuleID'], first['StartLine'], first['Fingerprint']),
+                             ('org', 'repo1', 'aws-access-token', '3', 'abc123:config.py:aws-access-token:3'))
+            # Tags are joined with spaces like the gitleaks CSV format, missing fields are empty
+            self.assertEqual(first['Tags'], 'key AWS')
+            self.assertEqual(dict(zip(rows[0], rows[2]))['Tags'], '')
+            self.assertEqual(dict(zip(rows[0], rows[2]))['File'], '')
+            self.assertEqual(dict(zip(rows[0], rows[4]))['Repository'], 'repo2')
+
+    def test_csv_findings_file(self):
+        # The stored findings of --incremental scans are CSV files with the report columns
+        with tempfile.TemporaryDirectory() as root:
+            findings_file = write_csv_rows(os.path.join(root, 'gitleaks.csv'), [['Owner', 'Repository', 'RuleID', 'Tags'], ['', '', 'aws-access-token', 'key AWS']])
+            report_file = os.path.join(root, 'gitleaks_report.csv')
+            self.assertEqual(append_gitleaks_findings('org', 'repo1', findings_file, report_file), 1)
+            row = dict(zip(GITLEAKS_REPORT_COLUMNS, read_csv_rows(report_file)[1]))
+            self.assertEqual((row['Owner'], row['Repository'], row['RuleID'], row['Tags']), ('org', 'repo1', 'aws-access-token', 'key AWS'))
+
+    def test_missing_empty_and_malformed_reports(self):
+        with tempfile.TemporaryDirectory() as root:
+            report_file = os.path.join(root, 'gitleaks_report.csv')
+            logger = mock.Mock()
+            self.assertEqual(append_gitleaks_findings('org', 'repo1', os.path.join(root, 'missing.json'), report_file), 0)
+            self.assertEqual(append_gitleaks_findings('org', 'repo1', write_file(root, 'empty.json', ''), report_file), 0)
+            self.assertEqual(append_gitleaks_findings('org', 'repo1', write_file(root, 'no_leaks.json', '[]'), report_file), 0)
+            self.assertEqual(append_gitleaks_findings('org', 'repo1', write_file(root, 'broken.json', '[{"RuleID"'), report_file, logger=logger), 0)
+            logger.error.assert_called_once()
+            self.assertFalse(os.path.exists(report_file))
+
+    def test_scan_removes_the_json_report(self):
+        with tempfile.TemporaryDirectory() as root:
+            report_file = os.path.join(root, 'gitleaks_report.csv')
+            json_report = gitleaks_report_path(root, 'org', 'repo1')
+
+            def gitleaks(returncode):
+                def run(command, **kwargs):
+                    self.assertEqual(command[command.index('-r') + 1], json_report)
+                    write_file(root, os.path.basename(json_report), json.dumps([GITLEAKS_FINDING]))
+                    return subprocess.CompletedProcess(command, returncode, stdout='', stderr='error')
+                return run
+
+            # gitleaks exits with 1 when it finds leaks
+            with mock.patch('scanners.gitleaks_scan.run_traced', side_effect=gitleaks(1)):
+                self.assertTrue(do_gitleaks_scan('org', 'repo1', 'repo1', root, report_file))
+            self.assertFalse(os.path.exists(json_report))
+            self.assertEqual(len(read_csv_rows(report_file)), 2)
+
+            # A failed scan appends nothing, and still removes the plain text secrets
+            with mock.patch('scanners.gitleaks_scan.run_traced', side_effect=gitleaks(2)):
+                self.assertFalse(do_gitleaks_scan('org', 'repo1', 'repo1', root, report_file))
+            self.assertFalse(os.path.exists(json_report))
+            self.assertEqual(len(read_csv_rows(report_file)), 2)
+
+# A match of a noseyparker jsonl report
+def noseyparker_match(repo_name, blob_path, line, content):
+    return {'provenance': [{'kind': 'git_repo', 'repo_path': f"./_checkout/{repo_name}/.git",
+                            'commit_provenance': {'commit_kind': 'first_seen', 'blob_path': blob_path}}],
+            'blob_id': f"blob-{blob_path}", 'capture_group_index': 1, 'match_content': content, 'rule_name': 'GitHub Personal Access Token',
+            'blob_metadata': {'id': f"blob-{blob_path}", 'num_bytes': 120, 'mime_essence': 'text/plain', 'charset': None},
+            'location': {'offset_span': {'start': 10, 'end': 50},
+                         'source_span': {'start': {'line': line, 'column': 5}, 'end': {'line': line, 'column': 45}}},
+            'snippet': {'before': 'token = "', 'matching': content, 'after': '"'}}
+
+class TestNoseyparkerScan(unittest.TestCase):
+    def test_jsonl_to_csv_rows(self):
+        findings = [{'finding_id': 'f1', 'rule_name': 'GitHub Personal Access Token', 'num_matches': 2,
+                     'matches': [noseyparker_match('repo1', 'config.py', 3, 'ghp_one'), noseyparker_match('repo1', 'old/config.py', 7, 'ghp_one')]},
+                    {'finding_id': 'f2', 'rule_name': 'GitHub Personal Access Token', 'num_matches': 1,
+                     'matches': [noseyparker_match('repo1', 'app.py', 1, 'ghp_two')]},
+                    {'finding_id': 'f3', 'matches': []}]
+        lines = [json.dumps(finding) + '\n' for finding in findings[:2]] + ['\n', '{"finding_id": \n'] + [json.dumps(findings[2]) + '\n']
+        with tempfile.TemporaryDirectory() as root:
+            csv_file = os.path.join(root, 'noseyparker_report.csv')
+            logger = mock.Mock()
+            json_to_csv('org', iter(lines), csv_file, logger)
+            # A second report is appended without another header
+            json_to_csv('org', [json.dumps(findings[1])], csv_file)
+            rows = read_csv_rows(csv_file)
+        logger.error.assert_called_once()
+        self.assertEqual(rows[0], NOSEYPARKER_CSV_COLUMNS)
+        rows = [dict(zip(rows[0], row)) for row in rows[1:]]
+        self.assertEqual([(row['owner'], row['repo_path'], row['blob_path'], row['location.source_span.start.line'], row['match_content']) for row in rows],
+                         [('org', 'repo1', 'config.py', '3', 'ghp_one'), ('org', 'repo1', 'old/config.py', '7', 'ghp_one'),
+                          ('org', 'repo1', 'app.py', '1', 'ghp_two'), ('org', 'repo1', 'app.py', '1', 'ghp_two')])
+        first = rows[0]
+        self.assertEqual((first['blob_metadata.num_bytes'], first['blob_metadata.charset'], first['location.offset_span.end'],
+                          first['location.source_span.end.column'], first['snippet.before'], first['rule_name']),
+                         ('120', '', '50', '45', 'token = "', 'GitHub Personal Access Token'))
+        self.assertTrue(first['provenance'].startswith("[{'kind': 'git_repo'"))
+
+    def test_datastore_per_repo(self):
+        with tempfile.TemporaryDirectory() as root:
+            with mock.patch('scanners.noseyparker_scan.run_traced', return_value=subprocess.CompletedProcess([], 0)) as run:
+                self.assertTrue(do_noseyparker_scan('org', 'repo1', './_checkout/repo1', root, False, threads=4))
+            self.assertEqual(run.call_args[0][0], ['noseyparker', 'scan', './_checkout/repo1', '--datastore', f"{root}/org/repo1", '--jobs', '4'])
+            with mock.patch('scanners.noseyparker_scan.run_traced', return_value=subprocess.CompletedProcess([], 2)):
+                self.assertFalse(do_noseyparker_scan('org', 'repo1', './_checkout/repo1', root, False))
+
+            for repo_name in ['repo1', 'repo2', 'repo3']:
+                os.makedirs(os.path.join(root, 'org', repo_name))
+            reports = {f"{root}/org/repo1": [json.dumps({'matches': [noseyparker_match('repo1', 'a.py', 1, 'ghp_one')]})],
+                       f"{root}/org/repo2": [json.dumps({'matches': [noseyparker_match('repo2', 'b.py', 2, 'ghp_two')]})]}
+            datastores = []
+
+            class FakeReport:
+                def __init__(self, command, **kwargs):
+                    datastores.append(command[command.index('--datastore') + 1])
+                    self.stdout = iter(reports[datastores[-1]])
+
+                def wait(self):
+                    return 0
+
+            report_file = os.path.join(root, 'noseyparker_report.csv')
+            with mock.patch('scanners.noseyparker_scan.TracedPopen', FakeReport):
+                # Only the repos of this run, from the datastores kept between runs
+                run_noseyparker_report('org', root, report_file, repo_names=['repo1', 'repo2'])
+            self.assertEqual(datastores, [f"{root}/org/repo1", f"{root}/org/repo2"])
+            self.assertEqual([row[NOSEYPARKER_CSV_COLUMNS.index('repo_path')] for row in read_csv_rows(report_file)[1:]], ['repo1', 'repo2'])
+
+# A finding of the trufflehog --json output
+def trufflehog_finding(file, line, raw, source='Git'):
+    return {'SourceMetadata': {'Data': {source: {'file': file, 'line': line, 'commit': 'abc123'}}}, 'SourceID': 1, 'SourceType': 7,
+            'SourceName': 'trufflehog - git', 'DetectorType': 8, 'DetectorName': 'Github', 'DecoderName': 'PLAIN', 'Verified': False,
+            'Raw': raw, 'RawV2': '', 'Redacted': '', 'ExtraData': {'version': '2'}}
+
+# Stand-in of TracedPopen that prints canned trufflehog output
+class FakeTrufflehog:
+    lines = []
+    returncode = 0
+    commands = []
+
+    def __init__(self, command, **kwargs):
+        FakeTrufflehog.commands.append(command)
+        self.stdout = iter(FakeTrufflehog.lines)
+        if FakeTrufflehog.returncode:
+            kwargs['stderr'].write('trufflehog failed')
+
+    def wait(self):
+        return FakeTrufflehog.returncode
+
+class TestTrufflehogScan(unittest.TestCase):
+    def setUp(self):
+        FakeTrufflehog.commands = []
+        FakeTrufflehog.returncode = 0
+
+    def test_streams_findings_in_batches(self):
+        FakeTrufflehog.lines = [json.dumps(trufflehog_finding('a.py', 1, 'ghp_one')) + '\n',
+                                '\n',
+                                'not json at all\n',
+                                json.dumps({'SourceMetadata': {'Data': {'Git': {'commit': 'abc123'}}}}) + '\n',
+                                json.dumps(trufflehog_finding('b.py', 2, 'ghp_two', source='Filesystem')) + '\n',
+                                json.dumps(trufflehog_finding('c.py', 3, 'ghp_three')) + '\n']
+        with tempfile.TemporaryDirectory() as root:
+            report_file = os.path.join(root, 'trufflehog_report.csv')
+            stats_before = get_trufflehog_stats()
+            batches = []
+            append_rows = trufflehog_scan._append_rows
+            with mock.patch.object(trufflehog_scan, 'TracedPopen', FakeTrufflehog), \
+                 mock.patch.object(trufflehog_scan, 'TRUFFLEHOG_WRITE_BATCH_ROWS', 2), \
+                 mock.patch.object(trufflehog_scan, '_append_rows', side_effect=lambda *args: (batches.append(len(args[1])), append_rows(*args))):
+                self.assertTrue(do_trufflehog_scan('org', 'repo1', 'repo1', report_file, threads=2, git_mode=True, since_commit='abc123'))
+            rows = read_csv_rows(report_file)
+            stats = get_trufflehog_stats()
+
+        self.assertEqual(FakeTrufflehog.commands[0], ['trufflehog', 'git', f"file://{os.path.abspath('repo1')}", '--json', '--since-commit', 'abc123', '--concurrency', '2'])
+        # The malformed line, the blank line and the finding without a file are skipped
+        self.assertEqual(batches, [2, 1])
+        self.assertEqual([row[:4] for row in rows], [['org', 'repo1', 'a.py', '1'], ['org', 'repo1', 'b.py', '2'], ['org', 'repo1', 'c.py', '3']])
+        self.assertEqual(rows[0][4:], ['1', '7', 'trufflehog - git', '8', 'Github', 'PLAIN', 'False', 'ghp_one', '', '', '2'])
+        self.assertEqual(stats['findings'] - stats_before['findings'], 3)
+        self.assertAlmostEqual(stats['findings_per_second'], stats['findings'] / trufflehog_scan._trufflehog_stats['scan_seconds'])
+
+    def test_failed_scan(self):
+        FakeTrufflehog.lines = [json.dumps(trufflehog_finding('a.py', 1, 'ghp_one')) + '\n']
+        FakeTrufflehog.returncode = 183
+        logger = mock.Mock()
+        with tempfile.TemporaryDirectory() as root:
+            report_file = os.path.join(root, 'trufflehog_report.csv')
+            with mock.patch.object(trufflehog_scan, 'TracedPopen', FakeTrufflehog):
+                self.assertFalse(do_trufflehog_scan('org', 'repo1', 'repo1', report_file, logger=logger))
+            # The findings read before the failure are kept
+            self.assertEqual(len(read_csv_rows(report_file)), 1)
+        self.assertEqual(FakeTrufflehog.commands[0], ['trufflehog', 'filesystem', 'repo1', '--json'])
+        self.assertIn('trufflehog failed', logger.error.call_args[0][0])
+
+class TestSecretHasher(unittest.TestCase):
+    def test_sha256_without_key(self):
+        hasher = SecretHasher()
+        self.assertEqual(hasher.hash_many(['ghp_secret'])['ghp_secret'], hashlib.sha256(b'ghp_secret').hexdigest())
+
+    def test_hmac_with_key(self):
+        digest = SecretHasher(key='hash-key').hash_many(['ghp_secret'])['ghp_secret']
+        self.assertEqual(digest, hmac.new(b'hash-key', b'ghp_secret', hashlib.sha256).hexdigest())
+        self.assertNotEqual(digest, hashlib.sha256(b'ghp_secret').hexdigest())
+        # The same key gives the same hashes across runs
+        self.assertEqual(SecretHasher(key=b'hash-key').hash_many(['ghp_secret'])['ghp_secret'], digest)
+
+    def test_batches_match_per_value_hashing(self):
+        # Values hashed in batches, on the thread pool and after cache evictions, match hashing every value on its own
+        hasher = SecretHasher(workers=2, cache_size=3)
+        rows = [{'secret': f"secret{i % 7}", 'match': 'x' * 4096 + str(i), 'detector': 'aws'} for i in range(25)] + [{'secret': '', 'match': None, 'detector': 'aws'}]
+        expected = [{'secret': hashlib.sha256((row['secret'] or '').encode()).hexdigest(),
+                     'match': hashlib.sha256((row['match'] or '').encode()).hexdigest(), 'detector': row['detector']} for row in rows]
+        output = io.StringIO()
+        writer = HashingRowWriter(csv.DictWriter(output, fieldnames=['secret', 'match', 'detector']), hasher, ['secret', 'match'], batch_size=4)
+        for row in rows:
+            writer.writerow(dict(row))
+        writer.flush()
+        hasher.shutdown()
+        self.assertEqual(list(csv.DictReader(io.StringIO(output.getvalue()), fieldnames=['secret', 'match', 'detector'])), expected)
+
+    def test_cache_is_bounded(self):
+        hasher = SecretHasher(cache_size=10)
+        hasher.hash_many([f"value{i}" for i in range(100)])
+        self.assertEqual(len(hasher._cache), 10)
+
+class TestScanCostModel(unittest.TestCase):
+    def test_fit(self):
+        # Points on value = 2 + 0.5 * size give back the line
+        intercept, slope = _fit([(0, 2.0), (10, 7.0), (20, 12.0), (40, 22.0)])
+        self.assertAlmostEqual(intercept, 2.0)
+        self.assertAlmostEqual(slope, 0.5)
+        # Least squares through scattered points
+        intercept, slope = _fit([(1, 1.0), (2, 3.0), (3, 2.0)])
+        self.assertAlmostEqual(intercept, 1.0)
+        self.assertAlmostEqual(slope, 0.5)
+        # Neither the intercept nor the slope is negative
+        self.assertEqual(_fit([(10, 5.0), (20, 3.0), (30, 1.0)])[1], 0.0)
+        self.assertEqual(_fit([(10, 1.0), (20, 11.0), (30, 21.0)])[0], 0.0)
+
+    def test_fit_fallbacks(self):
+        self.assertIsNone(_fit([]))
+        # Fewer than MIN_FIT_REPOS points, or sizes that don't vary, give a line through the origin
+        self.assertEqual(_fit([(10, 5.0), (30, 11.0)]), (0.0, 0.4))
+        self.assertEqual(_fit([(10, 4.0), (10, 6.0), (10, 8.0)]), (0.0, 0.6))
+        self.assertEqual(_fit([(0, 3.0)]), (3.0, 0.0))
+
+    def test_longest_first(self):
+        model = ScanCostModel(None)
+        model.record_repo('o', 'small-but-slow', 10, tool_seconds={'gitleaks': 100.0})
+        model.record_repo('o', 'large-but-fast', 100000, tool_seconds={'gitleaks': 1.0})
+        repos = [{'name': 'large-but-fast', 'size': 100000}, {'name': 'unknown', 'size': 10000000}, {'name': 'small-but-slow', 'size': 10}]
+        ordered = model.longest_first('o', repos, ['gitleaks'], lambda repo: repo['name'])
+        # The recorded times win over the sizes, the repo not in the history is predicted by its size from the others
+        self.assertEqual([repo['name'] for repo in ordered], ['unknown', 'small-but-slow', 'large-but-fast'])
+
+    def test_history_round_trip(self):
+        with tempfile.TemporaryDirectory() as root:
+            history_file = os.path.join(root, 'history', 'scan_history.json')
+            model = ScanCostModel(history_file)
+            model.record_repo('o', 'repo1', 2048, disk_kb=4096, clone_seconds=1.5, clone_kb=2048, tool_seconds={'gitleaks': 3.0})
+            model.save()
+            reloaded = ScanCostModel(history_file)
+            self.assertEqual(reloaded.known_repos(), 1)
+            estimate = reloaded.estimate_repo('o', 'repo1', 4096, ['gitleaks'])
+            # Scaled by the size now
+            self.assertAlmostEqual(estimate['tool_seconds']['gitleaks'], 6.0)
+            self.assertAlmostEqual(estimate['disk_kb'], 8192)
+            self.assertAlmostEqual(estimate['seconds'], 3.0 + 6.0)
+
+class TestCheckoutDiskBudget(unittest.TestCase):
+    # Creates a checkout of size_kb KB in checkout_dir
+    def checkout(self, checkout_dir, name, size_kb):
+        return os.path.dirname(write_file(checkout_dir, os.path.join(name, 'data'), 'x' * size_kb * 1024))
+
+    def test_evicts_least_recently_scanned_at_the_limit(self):
+        with tempfile.TemporaryDirectory() as checkout_dir:
+            budget = CheckoutDiskBudget(checkout_dir, budget_kb=10)
+            for name in ['repo1', 'repo2']:
+                path = os.path.join(checkout_dir, name)
+                budget.acquire(path, 4)
+                self.checkout(checkout_dir, name, 4)
+                budget.release(path)
+            # Exactly at the budget, nothing is deleted
+            repo3 = os.path.join(checkout_dir, 'repo3')
+            budget.acquire(repo3, 2)
+            self.assertEqual(budget.evicted, 0)
+            self.assertEqual(budget.used_kb(), 10)
+            self.checkout(checkout_dir, 'repo3', 2)
+            budget.release(repo3)
+            # One KB over, the least recently scanned checkout makes room
+            budget.acquire(os.path.join(checkout_dir, 'repo4'), 1)
+            self.assertEqual(budget.evicted, 1)
+            self.assertEqual(sorted(os.listdir(checkout_dir)), ['repo2', 'repo3'])
+            self.assertEqual(budget.used_kb(), 7)
+
+    def test_release_counts_the_actual_size(self):
+        with tempfile.TemporaryDirectory() as checkout_dir:
+            budget = CheckoutDiskBudget(checkout_dir, budget_kb=10)
+            repo1 = os.path.join(checkout_dir, 'repo1')
+            budget.acquire(repo1, 1)
+            self.checkout(checkout_dir, 'repo1', 6)
+            budget.release(repo1)
+            self.assertEqual(budget.used_kb(), 6)
+            repo2 = os.path.join(checkout_dir, 'repo2')
+            budget.acquire(repo2, 2)
+            self.checkout(checkout_dir, 'repo2', 6)
+            # repo2 turned out larger than predicted, the checkout that is done is deleted
+            budget.release(repo2)
+            self.assertEqual(os.listdir(checkout_dir), ['repo2'])
+            self.assertEqual(budget.used_kb(), 6)
+
+    def test_waits_for_checkouts_being_scanned(self):
+        with tempfile.TemporaryDirectory() as checkout_dir:
+            budget = CheckoutDiskBudget(checkout_dir, budget_kb=8)
+            repo1 = os.path.join(checkout_dir, 'repo1')
+            budget.acquire(repo1, 6)
+            self.checkout(checkout_dir, 'repo1', 6)
+            acquired = threading.Event()
+            thread = threading.Thread(target=lambda: (budget.acquire(os.path.join(checkout_dir, 'repo2'), 4), acquired.set()))
+            thread.start()
+            self.assertFalse(acquired.wait(0.2))
+            budget.release(repo1)
+            thread.join(5)
+            self.assertTrue(acquired.is_set())
+            self.assertEqual(budget.evicted, 1)
+            self.assertFalse(os.path.exists(repo1))
+
+    def test_keeps_checkouts_of_earlier_runs(self):
+        with tempfile.TemporaryDirectory() as checkout_dir:
+            old = self.checkout(checkout_dir, 'old', 4)
+            reused = self.checkout(checkout_dir, 'reused', 2)
+            budget = CheckoutDiskBudget(checkout_dir, budget_kb=8)
+            self.assertEqual(budget.used_kb(), 6)
+            # A new checkout that doesn't fit next to the old ones only deletes itself once scanned
+            repo1 = os.path.join(checkout_dir, 'repo1')
+            budget.acquire(repo1, 4)
+            self.checkout(checkout_dir, 'repo1', 4)
+            budget.release(repo1)
+            self.assertEqual(sorted(os.listdir(checkout_dir)), ['old', 'reused'])
+            # A checkout of an earlier run this run scans again (--incremental) keeps its disk, and can be deleted once done
+            budget.acquire(reused, 1)
+            self.assertEqual(budget.used_kb(), 6)
+            budget.release(reused)
+            budget.acquire(os.path.join(checkout_dir, 'repo2'), 3)
+            self.assertEqual(os.listdir(checkout_dir), ['old'])
+            self.assertTrue(os.path.isdir(old))
+            self.assertEqual(budget.evicted, 2)
+
+    def test_delete_after_scan(self):
+        with tempfile.TemporaryDirectory() as checkout_dir:
+            old = self.checkout(checkout_dir, 'old', 1)
+            budget = CheckoutDiskBudget(checkout_dir, delete_after_scan=True)
+            repo1 = os.path.join(checkout_dir, 'repo1')
+            budget.acquire(repo1, 1)
+            self.checkout(checkout_dir, 'repo1', 1)
+            budget.release(repo1)
+            self.assertEqual(os.listdir(checkout_dir), ['old'])
+            self.assertEqual(budget.used_kb(), 1)
+
+MERGED_HEADERS = ['source', 'owner', 'repo_name', 'file', 'line', 'secret', 'detector']
+
+class TestFindingsStore(unittest.TestCase):
+    def test_export_and_indexes(self):
+        with tempfile.TemporaryDirectory() as root:
+            db_path = os.path.join(root, 'findings.db')
+            store = FindingsStore(db_path)
+            store.writerows([{'source': 'gitleaks', 'owner': 'o', 'repo_name': 'repo1', 'secret': 'hash1', 'line': '3', 'not_a_column': 'x'},
+                             {'source': 'ghas', 'owner': 'o', 'repo_name': 'repo2', 'secret': 'hash1', 'file': ''}])
+            store.writerow({'source': 'trufflehog', 'owner': 'o', 'repo_name': 'repo1', 'secret': 'hash2'})
+            store.finish()
+            # Exported in insertion order, in the merged report columns, empty values as NULL
+            output = io.StringIO()
+            store.export_csv(output)
+            rows = [dict(zip(MERGED_REPORT_HEADERS, row)) for row in csv.reader(io.StringIO(output.getvalue()))]
+            self.assertEqual([(row['source'], row['repo_name'], row['secret'], row['line'], row['file']) for row in rows],
+                             [('gitleaks', 'repo1', 'hash1', '3', ''), ('ghas', 'repo2', 'hash1', '', ''), ('trufflehog', 'repo1', 'hash2', '', '')])
+            self.assertEqual(store.connection.execute("SELECT COUNT(*) FROM findings WHERE file IS NULL").fetchone()[0], 3)
+            # The lookups of the README use the indexes
+            plan = store.connection.execute("EXPLAIN QUERY PLAN SELECT source FROM findings WHERE secret = ?", ('hash1',)).fetchall()
+            self.assertIn('idx_findings_secret', str(plan))
+            store.close()
+            # A new run replaces the database
+            store = FindingsStore(db_path)
+            self.assertEqual(store.connection.execute("SELECT COUNT(*) FROM findings").fetchone()[0], 0)
+            store.close()
+
+@unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow is not installed")
+class TestParquetWriter(unittest.TestCase):
+    def test_partitioned_dataset_has_the_report_rows(self):
+        with tempfile.TemporaryDirectory() as root:
+            rows = [['source', 'owner', 'repo_name', 'file', 'secret', 'detector'],
+                    ['gitleaks', 'org1', 'repo1', 'a.py', 'hash1', 'aws'],
+                    ['trufflehog', 'org1', 'repo1', 'a.py', 'hash1', 'AWS'],
+                    ['gitleaks', 'org2', 'repo2', '', 'multi\nline', 'slack']]
+            csv_file = write_csv_rows(os.path.join(root, 'merged.csv'), rows)
+            parquet_dir = csv_to_parquet(csv_file, parquet_path_for(csv_file), ['owner', 'source'])
+            self.assertEqual(parquet_dir, os.path.join(root, 'merged.parquet'))
+            self.assertEqual(sorted(os.listdir(parquet_dir)), ['owner=org1', 'owner=org2'])
+            self.assertEqual(sorted(os.listdir(os.path.join(parquet_dir, 'owner=org1'))), ['source=gitleaks', 'source=trufflehog'])
+            # The dataset gives the same metrics as the CSV file
+            csv_metrics = aggregate_report_metrics(csv_file)
+            parquet_metrics = aggregate_report_metrics(parquet_dir)
+            self.assertEqual(parquet_metrics[0], csv_metrics[0])
+            self.assertTrue(parquet_metrics[1].equals(csv_metrics[1]))
+            self.assertTrue(parquet_metrics[2].equals(csv_metrics[2]))
+
+    def test_empty_report(self):
+        with tempfile.TemporaryDirectory() as root:
+            csv_file = write_file(root, 'empty.csv', '')
+            self.assertIsNone(csv_to_parquet(csv_file, parquet_path_for(csv_file), ['owner']))
+
+# The fuzzywuzzy loop find_matches replaced: every row is compared to the secrets of the
+# earlier matches in order, and counted in the first one of the same owner/repo it matches
+def find_matches_one_by_one(input_file, fuzz_factor):
+    matches = {}
+    with open(input_file, 'r') as csv_file:
+        for row in csv.DictReader(csv_file):
+            for key in matches.keys():
+                if fuzz.ratio(row['secret'], key) > fuzz_factor and matches[key]['owner'] == row['owner'] and matches[key]['repo_name'] == row['repo_name']:
+                    matches[key]['total_matches'] += 1
+                    matches[key]['tools_matched_on'].add(row['source'])
+                    break
+            else:
+                row['total_matches'] = 1
+                row['tools_matched_on'] = {row['source']}
+                matches[row['secret']] = row
+    return [(row['owner'], row['repo_name'], row['secret'], row['total_matches'], row['tools_matched_on']) for row in matches.values()]
+
+class TestSecretMatcher(unittest.TestCase):
+    BASE = 'abcdefghijklmnopqrstu'
+
+    # Returns BASE with the characters at positions replaced, 21 characters long
+    def variant(self, *positions, char='X'):
+        return ''.join(char if i in positions else c for i, c in enumerate(self.BASE))
+
+    def merged_rows(self):
+        rows = [['source', 'owner', 'repo_name', 'file', 'secret', 'detector']]
+        secrets = [
+            ('gitleaks', 'repo1', self.BASE),
+            # 1 change: 95, a match
+            ('trufflehog', 'repo1', self.variant(3)),
+            # 2 changes: 90.48, rounded to 90, not a match at fuzz factor 90
+            ('noseyparker', 'repo1', self.variant(3, 17)),
+            # 1 change from the row above, matches it but not BASE
+            ('gitleaks', 'repo1', self.variant(3, 17, 19)),
+            ('ghas', 'repo1', self.BASE),
+            ('trufflehog', 'repo1', self.variant(3, 17)),
+            # Variants in another repo are counted apart from repo1
+            ('gitleaks', 'repo2', self.variant(0)),
+            ('gitleaks', 'repo2', self.variant(0, 20)),
+            ('trufflehog', 'repo2', self.variant(0, 10, 20)),
+            ('noseyparker', 'repo2', 'completely-different-secret'),
+            ('gitleaks', 'repo2', ''),
+            ('trufflehog', 'repo2', ''),
+        ]
+        for source, repo_name, secret in secrets:
+            rows.append([source, 'org', repo_name, 'file.py', secret, 'detector'])
+        return rows
+
+    def assert_same_as_one_by_one(self):
+        with tempfile.TemporaryDirectory() as root:
+            input_file = write_csv_rows(os.path.join(root, 'merged.csv'), self.merged_rows())
+            output_file = os.path.join(root, 'matches.csv')
+            count = find_matches(input_file, output_file, 90, workers=2)
+            with open(output_file, 'r', newline='') as f:
+                matches = [(row['owner'], row['repo_name'], row['secret'], int(row['total_matches']), set(row['tools_matched_on'].split(', ')))
+                           for row in csv.DictReader(f)]
+            self.assertEqual(matches, find_matches_one_by_one(input_file, 90))
+            self.assertEqual(count, len(matches))
+        return matches
+
+    def test_same_matches_as_one_by_one_with_rapidfuzz(self):
+        if not secret_matcher.RAPIDFUZZ_AVAILABLE:
+            self.skipTest("rapidfuzz is not installed")
+        matches = self.assert_same_as_one_by_one()
+        self.assertEqual([total for _, _, _, total, _ in matches], [3, 3, 2, 1, 1, 2])
+        # Keys scored in earlier batches and within the batch
+        with mock.patch.object(secret_matcher, 'MATCH_BATCH_SECRETS', 2):
+            self.assertEqual(self.assert_same_as_one_by_one(), matches)
+
+    def test_same_matches_as_one_by_one_without_rapidfuzz(self):
+        with mock.patch.object(secret_matcher, 'RAPIDFUZZ_AVAILABLE', False):
+            self.assert_same_as_one_by_one()
+
+# The pandas aggregation of the merged report that MergedReportMetrics replaced
+def pandas_report_metrics(merged_report):
+    df = pd.read_csv(merged_report)
+    counts = {'owners': df['owner'].nunique(), 'distinct_sources': df['source'].nunique(), 'total_repos_with_secrets': df['repo_name'].nunique(),
+              'total_secrets_by_source': df.groupby('source')['source'].count().to_dict(), 'total_secrets': df['secret'].count(),
+              'total_distinct_secrets': df['secret'].nunique()}
+    repo_metrics = df.groupby('repo_name').agg({
+        'secret': ['count', 'nunique'],
+        'source': [
+            ('total_gitleaks_secrets', lambda x: (x == 'gitleaks').sum()),
+            ('total_trufflehog_secrets', lambda x: (x == 'trufflehog').sum()),
+            ('total_noseyparker_secrets', lambda x: (x == 'noseyparker').sum()),
+            ('total_ghas_secrets', lambda x: (x == 'ghas').sum())
+        ]
+    })
+    repo_metrics.loc['Summary', :] = repo_metrics.sum(numeric_only=True)
+    repo_metrics = repo_metrics.astype(int)
+    repo_metrics.reset_index(inplace=True)
+    repo_metrics.columns = ['_'.join(col).strip() for col in repo_metrics.columns.values]
+    # The ties of the detector counts were in no particular order, they are in source and detector order now
+    detector_metrics = df.groupby(['source', 'detector']).size().reset_index(name='detector_count')
+    detector_metrics = detector_metrics.sort_values('detector_count', ascending=False, kind='stable').reset_index(drop=True)
+    return counts, repo_metrics, detector_metrics
+
+class TestMergedReportMetrics(unittest.TestCase):
+    def write_merged_report(self, path, metrics):
+        rows = []
+        for i in range(60):
+            source = ['gitleaks', 'trufflehog', 'noseyparker', 'ghas', 'gitleaks'][i % 5]
+            rows.append({'source': source, 'owner': f"org{i % 2}", 'repo_name': f"repo{i % 7}",
+                         # some secrets repeat across rows and repos, some rows have none
+                         'secret': f"secret-{i % 11}" if i % 13 else '',
+                         'detector': '' if i % 17 == 0 else f"{source}-rule{i % 3}", 'file': f"file{i}.py"})
+        rows.append({'source': 'ghas', 'owner': 'org0', 'repo_name': '', 'secret': 'secret-without-repo', 'detector': 'slack'})
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['source', 'owner', 'repo_name', 'file', 'secret', 'detector'])
+            writer.writeheader()
+            MetricsRowWriter(writer, metrics).writerows(rows)
+
+    def test_same_metrics_as_pandas(self):
+        with tempfile.TemporaryDirectory() as root:
+            merged_report = os.path.join(root, 'merged.csv')
+            metrics = MergedReportMetrics()
+            self.write_merged_report(merged_report, metrics)
+            error_file = write_file(root, 'errors.log', 'ERROR: one\n')
+            expected_counts, expected_repo_metrics, expected_detector_metrics = pandas_report_metrics(merged_report)
+
+            # Counted while the report is written, and read back from the file
+            for merged_metrics in [metrics, None]:
+                report_metrics, repo_metrics, detector_metrics = analyze_merged_results(merged_report, None, error_file, ['repo9'],
+                                                                                        merged_metrics=merged_metrics, matches_count=4, total_repos_scanned=7)
+                values = dict(zip(report_metrics['Metric'], report_metrics['Value']))
+                self.assertEqual(values['Owners'], expected_counts['owners'])
+                self.assertEqual(values['Scanning Source Tools'], expected_counts['distinct_sources'])
+                self.assertEqual(values['Total Repos with Secrets'], expected_counts['total_repos_with_secrets'])
+                self.assertEqual(values['Total Secrets by Source'], expected_counts['total_secrets_by_source'])
+                self.assertEqual(values['Total Secrets (all tools)'], expected_counts['total_secrets'])
+                self.assertEqual(values['Total Distinct Secrets'], expected_counts['total_distinct_secrets'])
+                self.assertEqual((values['Secret Matches Count (Experimental)'], values['Total Errors in Log'], values['Repos with GHAS Secrets Scanning Disabled']), (4, 1, 1))
+                self.assertEqual(list(repo_metrics.columns), list(expected_repo_metrics.columns))
+                self.assertEqual(repo_metrics.values.tolist(), expected_repo_metrics.values.tolist())
+                self.assertEqual(detector_metrics.values.tolist(), expected_detector_metrics.values.tolist())
+
+            # Chunks smaller than the report add up to the same metrics
+            counts, repo_metrics, detector_metrics = aggregate_report_metrics(merged_report, chunk_rows=7)
+            self.assertEqual(counts, metrics.results()[0])
+            self.assertEqual(repo_metrics.values.tolist(), metrics.results()[1].values.tolist())
+            self.assertEqual(detector_metrics.values.tolist(), metrics.results()[2].values.tolist())
+
+    def test_empty_report(self):
+        with tempfile.TemporaryDirectory() as root:
+            merged_report = write_file(root, 'merged.csv', 'source,owner,repo_name,file,secret,detector\n')
+            error_file = write_file(root, 'errors.log', '')
+            self.assertTrue(all(df.empty for df in analyze_merged_results(merged_report, None, error_file, merged_metrics=MergedReportMetrics())))
+            self.assertTrue(all(df.empty for df in analyze_merged_results(merged_report, None, error_file)))
+
+class TestSecretCorrelator(unittest.TestCase):
+    def correlate(self, rows, line_window=2):
+        with tempfile.TemporaryDirectory() as root:
+            input_file = write_csv_rows(os.path.join(root, 'merged.csv'), [MERGED_HEADERS] + rows)
+            output_file = os.path.join(root, 'correlated.csv')
+            count = correlate_findings(input_file, output_file, line_window=line_window)
+            with open(output_file, 'r', newline='') as f:
+                groups = list(csv.DictReader(f))
+        # Only the groups of more than one tool are counted as matches
+        self.assertEqual(count, len([group for group in groups if int(group['tools_count']) > 1]))
+        return groups
+
+    def test_line_window(self):
+        groups = self.correlate([
+            ['gitleaks', 'o', 'repo1', 'config.py', '10', 'hash1', 'generic-api-key'],
+            # trufflehog reports the path under the checkout, 2 lines off
+            ['trufflehog', 'o', 'repo1', './_checkout/repo1/config.py', '12', 'hash1', 'Github'],
+            # 3 lines past the group is out of the window
+            ['noseyparker', 'o', 'repo1', 'config.py', '15', 'hash1', 'GitHub Token'],
+            # Same place, another secret
+            ['noseyparker', 'o', 'repo1', 'config.py', '10', 'hash2', 'GitHub Token']])
+        self.assertEqual([(group['secret'], group['line'], group['tools'], group['lines']) for group in groups],
+                         [('hash1', '10', 'gitleaks, trufflehog', '10 12'), ('hash1', '15', 'noseyparker', '15'), ('hash2', '10', 'noseyparker', '10')])
+
+    def test_line_window_zero(self):
+        groups = self.correlate([
+            ['gitleaks', 'o', 'repo1', 'config.py', '10', 'hash1', 'generic-api-key'],
+            ['trufflehog', 'o', 'repo1', 'config.py', '11', 'hash1', 'Github']], line_window=0)
+        self.assertEqual(len(groups), 2)
+
+    def test_count_of_single_tool_groups(self):
+        with tempfile.TemporaryDirectory() as root:
+            input_file = write_csv_rows(os.path.join(root, 'merged.csv'), [MERGED_HEADERS,
+                ['gitleaks', 'o', 'repo1', 'config.py', '10', 'hash1', 'generic-api-key'],
+                ['gitleaks', 'o', 'repo1', 'config.py', '10', 'hash1', 'generic-api-key'],
+                ['noseyparker', 'o', 'repo1', 'other.py', '1', 'hash2', 'GitHub Token']])
+            self.assertEqual(correlate_findings(input_file, os.path.join(root, 'correlated.csv')), 0)
+            self.assertEqual(len(read_csv_rows(os.path.join(root, 'correlated.csv'))), 3)
+
+    def test_ghas_join(self):
+        groups = self.correlate([
+            # GHAS alerts come before the located findings they join
+            ['ghas', 'o', 'repo1', '', '', 'hash1', 'github_personal_access_token'],
+            ['gitleaks', 'o', 'repo1', 'config.py', '10', 'hash1', 'generic-api-key'],
+            ['gitleaks', 'o', 'repo1', 'other.py', '3', 'hash1', 'generic-api-key'],
+            # Same secret in another repository is not joined
+            ['ghas', 'o', 'repo2', '', '', 'hash1', 'github_personal_access_token'],
+            ['ghas', 'o', 'repo1', '', '', 'hash3', 'slack_api_token'],
+            ['ghas', 'o', 'repo1', '', '', '', 'slack_api_token']])
+        self.assertEqual([(group['repo_name'], group['file'], group['secret'], group['tools'], group['found_by_ghas']) for group in groups],
+                         [('repo1', 'config.py', 'hash1', 'gitleaks, ghas', 'True'), ('repo1', 'other.py', 'hash1', 'gitleaks', 'False'),
+                          ('repo2', '', 'hash1', 'ghas', 'True'), ('repo1', '', 'hash3', 'ghas', 'True')])
+        self.assertEqual(groups[0]['detectors'], 'ghas:github_personal_access_token, gitleaks:generic-api-key')
+
+class TestGhasClassifier(unittest.TestCase):
+    def test_mapped_detectors(self):
+        classifier = GhasClassifier()
+        for source, detector, secret_type in [
+                ('gitleaks', 'github-pat', 'github_personal_access_token'),
+                ('gitleaks', 'aws-access-token', 'aws_access_key_id'),
+                ('gitleaks', 'slack-bot-token', 'slack_api_token'),
+                ('trufflehog', 'Github', 'github_personal_access_token'),
+                ('trufflehog', 'AWS', 'aws_access_key_id'),
+                ('trufflehog', 'Slack', 'slack_api_token'),
+                ('trufflehog', 'SlackWebhook', 'slack_incoming_webhook_url'),
+                ('noseyparker', 'GitHub Personal Access Token', 'github_personal_access_token'),
+                ('noseyparker', 'AWS API Key', 'aws_access_key_id'),
+                ('noseyparker', 'Slack Bot Token', 'slack_api_token')]:
+            self.assertEqual(classifier.classify(source, detector), (secret_type, 'mapping', 1.0), (source, detector))
+
+    def test_detectors_without_a_ghas_secret_type(self):
+        classifier = GhasClassifier()
+        for source, detector in [
+                # Only generic words
+                ('gitleaks', 'generic-api-key'), ('noseyparker', 'Generic Password'), ('trufflehog', 'PrivateKey'),
+                # Connection strings GHAS does not scan for
+                ('trufflehog', 'Postgres'), ('trufflehog', 'URI'), ('trufflehog', 'JDBC'), ('noseyparker', 'PostgreSQL URI'),
+                ('gitleaks', '')]:
+            secret_type, method, score = classifier.classify(source, detector)
+            self.assertEqual((secret_type, method), (None, None), (source, detector))
+            self.assertLess(score, 0.5)
+
+    def test_unmapped_detectors(self):
+        classifier = GhasClassifier()
+        # A shared vendor word, and a misspelled vendor only found by its trigrams
+        self.assertEqual(classifier.classify('trufflehog', 'MailchimpAPI'), ('mailchimp_api_key', 'token', 1.0))
+        self.assertEqual(classifier.classify('trufflehog', 'Shopifyy'), ('shopify_access_token', 'trigram', 0.824))
+        # A mapping of another source is not used
+        self.assertNotEqual(classifier.classify('ghas', 'github-pat')[1], 'mapping')
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache_file = os.path.join(root, 'cache', 'ghas_classifier.json')
+            classifier = GhasClassifier(cache_file)
+            classifier.classify('trufflehog', 'Github')
+            classifier.classify('trufflehog', 'Postgres')
+            classifier.save_cache()
+            with open(cache_file, 'r') as f:
+                data = json.load(f)
+            self.assertEqual(sorted(data['detectors']), ['trufflehog:Github', 'trufflehog:Postgres'])
+
+            # Cached classifications are not made again
+            classifier = GhasClassifier(cache_file)
+            with mock.patch.object(classifier, '_classify') as classify:
+                self.assertEqual(classifier.classify('trufflehog', 'Github'), ('github_personal_access_token', 'mapping', 1.0))
+                self.assertEqual(classifier.classify('trufflehog', 'Postgres')[0], None)
+                classify.assert_not_called()
+            # Nothing new to save
+            mtime = os.stat(cache_file).st_mtime_ns
+            classifier.save_cache()
+            self.assertEqual(os.stat(cache_file).st_mtime_ns, mtime)
+
+            # Classifications of another version of the tables are made again
+            data['version'] = 'other'
+            data['detectors']['trufflehog:Github'] = ['slack_api_token', 'mapping', 1.0]
+            with open(cache_file, 'w') as f:
+                json.dump(data, f)
+            classifier = GhasClassifier(cache_file)
+            self.assertEqual(classifier.cache, {})
+            self.assertEqual(classifier.classify('trufflehog', 'Github')[0], 'github_personal_access_token')
+
+    def test_classify_ghas_matches(self):
+        with tempfile.TemporaryDirectory() as root:
+            input_file = write_csv_rows(os.path.join(root, 'merged.csv'), [MERGED_HEADERS,
+                ['gitleaks', 'o', 'repo1', 'config.py', '10', 'hash1', 'github-pat'],
+                ['trufflehog', 'o', 'repo1', 'config.py', '10', 'hash1', 'Postgres'],
+                ['noseyparker', 'o', 'repo1', 'config.py', '12', 'hash2', 'Slack Bot Token'],
+                ['gitleaks', 'o', 'repo1', 'config.py', '14', 'hash3', 'generic-api-key'],
+                # GHAS alerts are not classified
+                ['ghas', 'o', 'repo1', '', '', 'hash1', 'github_personal_access_token']])
+            output_file = os.path.join(root, 'likely_ghas_matches.csv')
+            cache_file = os.path.join(root, 'ghas_classifier.json')
+            self.assertEqual(classify_ghas_matches(input_file, output_file, cache_file), (2, 5))
+            with open(output_file, 'r', newline='') as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual([(row['source'], row['secret'], row['ghas_secret_type'], row['ghas_classification']) for row in rows],
+                             [('gitleaks', 'hash1', 'github_personal_access_token', 'mapping'), ('noseyparker', 'hash2', 'slack_api_token', 'mapping')])
+            self.assertTrue(os.path.exists(cache_file))
+
+class TestHtmlReportWriter(unittest.TestCase):
+    def read_chunk(self, path, table_id):
+        with open(path, 'r') as f:
+            content = f.read()
+        prefix = f"secretsynthAddRows({json.dumps(table_id)}, "
+        self.assertTrue(content.startswith(prefix))
+        self.assertTrue(content.endswith(");\n"))
+        return json.loads(content[len(prefix):-len(");\n")])
+
+    def write_report(self, root, repo_metrics, detector_metrics, paginated):
+        metrics = pd.DataFrame({'Metric': ['Total Secrets'], 'Value': [len(repo_metrics)]})
+        report_path = os.path.join(root, 'report_202401010000.html')
+        output_to_html(metrics, repo_metrics, detector_metrics, Tracer().timing_table(),
+                       'merged.csv', 'ghas.csv', 'matches.csv', 'errors.log', report_path, paginated)
+        with open(report_path, 'r') as f:
+            return f.read()
+
+    def test_paginated_report(self):
+        repo_metrics = pd.DataFrame({'owner': ['o'] * 10, 'repo_name': [f'repo{i}' for i in range(10)],
+                                     'total_secrets': list(range(10)), 'score': [i / 3 for i in range(10)]})
+        repo_metrics.loc[3, 'score'] = None
+        detector_metrics = pd.DataFrame({'detector': ['aws', 'slack'], 'count': [2, 1]})
+        with tempfile.TemporaryDirectory() as root:
+            data_dir = os.path.join(root, 'report_202401010000_data')
+            # Data files of an earlier report are removed
+            os.makedirs(data_dir)
+            write_file(data_dir, 'repo-metrics_0009.js', '')
+            with mock.patch.object(html_report_writer, 'HTML_CHUNK_ROWS', 4):
+                html = self.write_report(root, repo_metrics, detector_metrics, True)
+
+            self.assertEqual(sorted(os.listdir(data_dir)),
+                             ['detector-metrics_0000.js', 'repo-metrics_0000.js', 'repo-metrics_0001.js', 'repo-metrics_0002.js'])
+            chunks = [self.read_chunk(os.path.join(data_dir, f'repo-metrics_{i:04d}.js'), 'repo-metrics') for i in range(3)]
+            self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+            self.assertEqual([row[1] for chunk in chunks for row in chunk], [f'repo{i}' for i in range(10)])
+            self.assertEqual(chunks[0][3], ['o', 'repo3', 3, None])
+            self.assertEqual(chunks[2][1], ['o', 'repo9', 9, 3.0])
+            self.assertEqual(self.read_chunk(os.path.join(data_dir, 'detector-metrics_0000.js'), 'detector-metrics'),
+                             [['aws', 2], ['slack', 1]])
+
+            # The chunks are loaded in order, after the table is declared with its columns
+            self.assertIn("""secretsynthTable('repo-metrics', ["owner", "repo_name", "total_secrets", "score"])""", html)
+            links = [f'<script src="report_202401010000_data/repo-metrics_{i:04d}.js"></script>' for i in range(3)]
+            positions = [html.index(link) for link in links]
+            self.assertEqual(positions, sorted(positions))
+            self.assertLess(html.index("secretsynthTable('repo-metrics'"), positions[0])
+            self.assertIn('function secretsynthAddRows', html)
+            # The rows are not rendered into the HTML file
+            self.assertNotIn('repo9', html)
+
+    def test_report_without_pagination(self):
+        repo_metrics = pd.DataFrame({'owner': ['o'], 'repo_name': ['repo1'], 'total_secrets': [1]})
+        detector_metrics = pd.DataFrame({'detector': ['aws'], 'count': [1]})
+        with tempfile.TemporaryDirectory() as root:
+            html = self.write_report(root, repo_metrics, detector_metrics, False)
+            self.assertEqual(os.listdir(root), ['report_202401010000.html'])
+            self.assertIn('repo1', html)
+            self.assertNotIn('secretsynthAddRows', html)
+
+    def test_table_style_hides_the_index(self):
+        df = pd.DataFrame({'repo_name': ['repo1'], 'score': [0.123]}, index=['index-label'])
+        html = get_table_style(df).to_html()
+        self.assertNotIn('index-label', html)
+        self.assertIn('0.12', html)
+
+        # Before pandas 1.4, Styler has hide_index() rather than hide()
+        class OldStyler:
+            hidden_index = False
+            def set_table_styles(self, styles):
+                return self
+            def format(self, precision):
+                return self
+            def hide_index(self):
+                self.hidden_index = True
+                return self
+        old_styler = OldStyler()
+        old_df = mock.Mock(style=old_styler)
+        self.assertIs(get_table_style(old_df), old_styler)
+        self.assertTrue(old_styler.hidden_index)
+
+class TestTracer(unittest.TestCase):
+    # Adds a finished span with fixed times, seconds from the start of the tracer
+    def add_span(self, tracer, name, category, start, end, thread_id=1, child_cpu_seconds=0.0, child_peak_rss_kb=0, **args):
+        span = Span(name, category, args, thread_id, tracer.start + start)
+        span.end = tracer.start + end
+        span.child_cpu_seconds = child_cpu_seconds
+        span.child_peak_rss_kb = child_peak_rss_kb
+        tracer.spans.append(span)
+        return span
+
+    def test_nested_spans(self):
+        tracer = Tracer()
+        rusage = mock.Mock(ru_utime=1.0, ru_stime=0.5, ru_maxrss=2048)
+        with tracer.span('repo', 'repo', owner='o', repo='repo1') as outer:
+            with tracer.span('gitleaks', 'scanner', owner='o', repo='repo1') as inner:
+                tracer.record_child_rusage(rusage)
+                tracer.record_child_rusage(mock.Mock(ru_utime=0.25, ru_stime=0.25, ru_maxrss=1024))
+            tracer.record_child_rusage(rusage)
+        # Outside of any span
+        tracer.record_child_rusage(rusage)
+        self.assertEqual([span.name for span in tracer.finished_spans()], ['gitleaks', 'repo'])
+        self.assertEqual((inner.child_cpu_seconds, inner.child_peak_rss_kb), (2.0, 2048))
+        self.assertEqual((outer.child_cpu_seconds, outer.child_peak_rss_kb), (1.5, 2048))
+        self.assertEqual(inner.args, {'owner': 'o', 'repo': 'repo1'})
+        self.assertLessEqual(outer.start, inner.start)
+        self.assertGreaterEqual(outer.end, inner.end)
+        self.assertEqual(tracer.finished_spans(category='scanner'), [inner])
+
+    def test_spans_of_threads(self):
+        tracer = Tracer()
+        def worker(repo):
+            with tracer.span('clone', 'clone', owner='o', repo=repo):
+                tracer.record_child_rusage(mock.Mock(ru_utime=1.0, ru_stime=0.0, ru_maxrss=0))
+        with tracer.span('scan'):
+            threads = [threading.Thread(target=worker, args=(f'repo{i}',)) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        # The rusage of a thread goes to its own span, not to the span open in the main thread
+        self.assertEqual([span.child_cpu_seconds for span in tracer.finished_spans('clone')], [1.0] * 4)
+        self.assertEqual(tracer.finished_spans('scan')[0].child_cpu_seconds, 0.0)
+
+    def test_timing_table(self):
+        tracer = Tracer()
+        self.add_span(tracer, 'fetch_repos', 'phase', 0, 2)
+        # Overlapping spans of --jobs: 10 seconds summed, 6 seconds of wall clock time
+        self.add_span(tracer, 'gitleaks', 'scanner', 2, 5, child_cpu_seconds=1.5, child_peak_rss_kb=1024)
+        self.add_span(tracer, 'gitleaks', 'scanner', 3, 7, thread_id=2, child_cpu_seconds=2.0, child_peak_rss_kb=4096)
+        self.add_span(tracer, 'gitleaks', 'scanner', 4, 5, thread_id=3)
+        self.add_span(tracer, 'gitleaks', 'scanner', 8, 10)
+        self.add_span(tracer, 'github_api', 'http', 1, 1.5)
+        table = tracer.timing_table()
+        self.assertEqual(list(table.columns), ['Phase', 'Spans', 'Time', 'Wall Clock Time', 'Child CPU (seconds)', 'Peak Child RSS (MB)'])
+        self.assertEqual(table.to_dict('records'), [
+            {'Phase': 'fetch_repos', 'Spans': 1, 'Time': '0 hours 0 minutes 2.00 seconds', 'Wall Clock Time': '0 hours 0 minutes 2.00 seconds',
+             'Child CPU (seconds)': 0.0, 'Peak Child RSS (MB)': 0.0},
+            {'Phase': 'github_api', 'Spans': 1, 'Time': '0 hours 0 minutes 0.50 seconds', 'Wall Clock Time': '0 hours 0 minutes 0.50 seconds',
+             'Child CPU (seconds)': 0.0, 'Peak Child RSS (MB)': 0.0},
+            {'Phase': 'gitleaks', 'Spans': 4, 'Time': '0 hours 0 minutes 10.00 seconds', 'Wall Clock Time': '0 hours 0 minutes 7.00 seconds',
+             'Child CPU (seconds)': 3.5, 'Peak Child RSS (MB)': 4.0}])
+        self.assertEqual(list(tracer.timing_table(exclude_categories=('http',))['Phase']), ['fetch_repos', 'gitleaks'])
+        self.assertEqual(len(Tracer().timing_table()), 0)
+
+    def test_chrome_trace(self):
+        tracer = Tracer()
+        self.add_span(tracer, 'clone', 'clone', 1, 1.5, thread_id=111, owner='o', repo='repo1')
+        self.add_span(tracer, 'gitleaks', 'scanner', 0.5, 3, thread_id=222, child_cpu_seconds=1.23456, child_peak_rss_kb=2048, owner='o', repo='repo2')
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'trace.json')
+            tracer.write_chrome_trace(path)
+            with open(path, 'r') as f:
+                trace = json.load(f)
+        events = trace['traceEvents']
+        self.assertEqual(events[:2], [
+            {'name': 'gitleaks', 'cat': 'scanner', 'ph': 'X', 'pid': os.getpid(), 'tid': 1, 'ts': 500000.0, 'dur': 2500000.0,
+             'args': {'owner': 'o', 'repo': 'repo2', 'child_cpu_seconds': 1.235, 'peak_child_rss_mb': 2.0}},
+            {'name': 'clone', 'cat': 'clone', 'ph': 'X', 'pid': os.getpid(), 'tid': 2, 'ts': 1000000.0, 'dur': 500000.0,
+             'args': {'owner': 'o', 'repo': 'repo1'}}])
+        self.assertEqual([(event['name'], event.get('tid'), event['args']['name']) for event in events[2:]],
+                         [('process_name', None, 'secretsynth'), ('thread_name', 1, 'thread 1'), ('thread_name', 2, 'thread 2')])
+        self.assertEqual(trace['displayTimeUnit'], 'ms')
+        self.assertGreater(trace['otherData']['peak_rss_mb'], 0)
+
+    def test_repo_timing_csv(self):
+        tracer = Tracer()
+        self.add_span(tracer, 'repo', 'repo', 0, 10, owner='o', repo='repo2', child_cpu_seconds=9.0)
+        self.add_span(tracer, 'clone', 'clone', 0, 1.5, owner='o', repo='repo2', child_cpu_seconds=0.5, child_peak_rss_kb=1024)
+        self.add_span(tracer, 'gitleaks', 'scanner', 1.5, 4, owner='o', repo='repo2', child_cpu_seconds=2.0, child_peak_rss_kb=3072)
+        self.add_span(tracer, 'trufflehog', 'scanner', 4, 10, owner='o', repo='repo2', child_cpu_seconds=3.0, child_peak_rss_kb=2048)
+        self.add_span(tracer, 'gitleaks', 'scanner', 0, 0.25, owner='o', repo='repo1')
+        # Spans of other categories are left out
+        self.add_span(tracer, 'merge_csv_all_tools', 'phase', 10, 12)
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'repo_timing.csv')
+            tracer.write_repo_timing_csv(path)
+            rows = read_csv_rows(path)
+        self.assertEqual(rows[0], REPO_TIMING_COLUMNS)
+        self.assertEqual(rows[1:], [
+            ['o', 'repo1', '0.0', '0.0', '0.25', '0.0', '0.0', '0.0', '0.0'],
+            # The child resources of the repo span are the ones of its clone and scanner spans
+            ['o', 'repo2', '10.0', '1.5', '2.5', '6.0', '0.0', '5.5', '3.0']])
+
+@unittest.skipUnless(hasattr(os, 'wait4'), "os.wait4 is not available")
+class TestTracedPopen(unittest.TestCase):
+    def test_rusage_of_the_child(self):
+        tracer = Tracer()
+        with mock.patch.object(tracing, 'TRACER', tracer):
+            with tracer.span('noseyparker', 'scanner') as span:
+                # Spins for some CPU time and allocates 200 MB
+                result = run_traced([sys.executable, '-c', 'import sys, time\nend = time.process_time() + 0.2\nwhile time.process_time() < end: pass\nx = bytearray(200 * 1024 * 1024)\nsys.exit(3)'],
+                                    capture_output=True)
+        self.assertEqual(result.returncode, 3)
+        self.assertGreaterEqual(span.child_cpu_seconds, 0.15)
+        self.assertGreaterEqual(tracing._rss_mb(span.child_peak_rss_kb), 200)
+        self.assertEqual(tracer.timing_table()['Child CPU (seconds)'][0], round(span.child_cpu_seconds, 2))
+
+    def test_wait(self):
+        tracer = Tracer()
+        with mock.patch.object(tracing, 'TRACER', tracer):
+            with tracer.span('gitleaks', 'scanner') as span:
+                process = TracedPopen([sys.executable, '-c', 'import time; time.sleep(0.5)'])
+                with self.assertRaises(subprocess.TimeoutExpired):
+                    process.wait(timeout=0.05)
+                self.assertIsNone(process.returncode)
+                self.assertEqual(process.wait(timeout=10), 0)
+                self.assertEqual(process.wait(), 0)
+
+                process = TracedPopen([sys.executable, '-c', 'import time; time.sleep(10)'])
+                process.kill()
+                self.assertEqual(process.wait(), -9)
+
+                with TracedPopen([sys.executable, '-c', 'print("output")'], stdout=subprocess.PIPE, text=True) as process:
+                    self.assertEqual(process.communicate()[0], 'output\n')
+                self.assertEqual(process.returncode, 0)
+        self.assertGreater(span.child_cpu_seconds, 0)
+
+    def test_child_reaped_elsewhere(self):
+        process = TracedPopen([sys.executable, '-c', 'pass'])
+        with mock.patch.object(tracing.os, 'wait4', side_effect=ChildProcessError):
+            self.assertEqual(process.wait(), 0)
+        # Reap the child for real
+        os.waitpid(process.pid, 0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,108 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from utils.cost_model import directory_size_kb
+
+# Summary
+# Keeps the checkouts of a run within a disk budget. A repository reserves its predicted
+# disk use before it is cloned (acquire) and gives back its actual use once every scanner
+# is done with it (release). Checkouts that are done are kept for later runs while they
+# fit, and deleted least recently scanned first when a clone needs the space. When the
+# checkouts being scanned fill the budget, clones wait until one of them is released.
+# A repository larger than the whole budget is cloned once nothing else can be freed.
+# Checkouts left by earlier runs count against the budget but are never deleted, since
+# --incremental and --update-checkouts reuse them, only the ones this run scanned are.
+# Input:
+#   checkout_dir: directory of the checkouts. Checkouts already in it are kept until this run scans them.
+#   budget_kb: disk budget in KB, or None for no limit
+#   delete_after_scan: delete every checkout as soon as it is released
+#   logger (optional): the error logger of the run
+class CheckoutDiskBudget:
+    def __init__(self, checkout_dir, budget_kb=None, delete_after_scan=False, logger=None):
+        self.checkout_dir = checkout_dir
+        self.budget_kb = budget_kb
+        self.delete_after_scan = delete_after_scan
+        self.logger = logger
+        self.evicted = 0
+        self._condition = threading.Condition()
+        self._in_use = {}
+        # checkout path to KB of the checkouts this run scanned, least recently scanned first
+        self._done = OrderedDict()
+        # checkout path to KB of the checkouts of earlier runs this run has not scanned yet
+        self._kept = {}
+        if os.path.isdir(checkout_dir):
+            for name in os.listdir(checkout_dir):
+                path = os.path.join(checkout_dir, name)
+                if os.path.isdir(path):
+                    self._kept[path] = directory_size_kb(path)
+
+    def describe(self):
+        budget = f"{self.budget_kb // 1024} MB" if self.budget_kb is not None else "unlimited"
+        return f"budget={budget}, delete_after_scan={self.delete_after_scan}, checkouts on disk={len(self._kept)} ({self.used_kb() / 1024:.1f} MB)"
+
+    def used_kb(self):
+        with self._condition:
+            return self._used_kb()
+
+    def _used_kb(self):
+        return sum(self._in_use.values()) + sum(self._done.values()) + sum(self._kept.values())
+
+    # Deletes a checkout that is done. Called with the condition held.
+    def _evict(self, path):
+        print(f"Deleting checkout {path} ({self._done[path] / 1024:.1f} MB)")
+        try:
+            shutil.rmtree(path)
+        except OSError as e:
+            print(f"ERROR: Failed to delete checkout {path}: {str(e)}")
+            if self.logger:
+                self.logger.error(f"ERROR: Failed to delete checkout {path}: {str(e)}")
+        del self._done[path]
+        self.evicted += 1
+
+    # Nothing can be freed without checkouts being scanned or done, so a checkout then always fits
+    def _fits(self, reserved_kb):
+        if self.budget_kb is None or not (self._in_use or self._done):
+            return True
+        return self._used_kb() + reserved_kb <= self.budget_kb
+
+    # Summary
+    # Reserves the disk of a checkout before it is cloned or updated, deleting checkouts
+    # that are done and waiting for checkouts being scanned until it fits in the budget
+    # Input:
+    #   path: path of the checkout
+    #   predicted_kb: predicted disk use of the checkout (see ScanCostModel.estimate_repo)
+    def acquire(self, path, predicted_kb):
+        with self._condition:
+            reserved_kb = max(predicted_kb or 0, self._done.pop(path, 0), self._kept.pop(path, 0))
+            waiting = False
+            while not self._fits(reserved_kb):
+                if self._done:
+                    self._evict(next(iter(self._done)))
+                    continue
+                if not waiting:
+                    print(f"Waiting for disk to clone {path}: {sum(self._in_use.values()) / 1024:.1f} MB of checkouts being scanned, {sum(self._kept.values()) / 1024:.1f} MB of checkouts of earlier runs, {reserved_kb / 1024:.1f} MB needed, budget {self.budget_kb // 1024} MB")
+                    waiting = True
+                self._condition.wait()
+            if self.budget_kb is not None and reserved_kb > self.budget_kb:
+                print(f"WARNING: {path} is predicted to need {reserved_kb / 1024:.1f} MB, more than the disk budget of {self.budget_kb // 1024} MB. Cloning it on its own.")
+            self._in_use[path] = reserved_kb
+
+    # Summary
+    # Gives back the reservation of a checkout once every scanner is done with it. The
+    # checkout is deleted with delete_after_scan, or kept and counted at its actual size.
+    # Input:
+    #   disk_kb (optional): actual disk use of the checkout, measured if not given
+    def release(self, path, disk_kb=None):
+        if os.path.isdir(path) and disk_kb is None and not self.delete_after_scan:
+            disk_kb = directory_size_kb(path)
+        with self._condition:
+            self._in_use.pop(path, None)
+            if os.path.isdir(path):
+                self._done[path] = disk_kb or 0
+                if self.delete_after_scan:
+                    self._evict(path)
+            # The checkout can be larger than predicted
+            while self.budget_kb is not None and self._done and not self._fits(0):
+                self._evict(next(iter(self._done)))
+            self._condition.notify_all()
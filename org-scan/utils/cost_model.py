@@ -0,0 +1,191 @@
+import heapq
+import json
+import os
+import threading
+from datetime import datetime
+
+# Bump when the layout of the history file changes, older files are then ignored
+SCAN_HISTORY_VERSION = 1
+
+# Fits need at least this many repositories with different sizes, fewer are scaled by size only
+MIN_FIT_REPOS = 3
+
+# Rough costs used until the history has repositories to learn from. Sizes are the
+# repository size the GitHub API reports, in KB.
+DEFAULT_CLONE_KB_PER_SECOND = 10 * 1024
+DEFAULT_CLONE_KB_PER_SIZE_KB = 1.0
+DEFAULT_DISK_KB_PER_SIZE_KB = 2.0
+DEFAULT_TOOL_STARTUP_SECONDS = 1.0
+DEFAULT_TOOL_SECONDS_PER_MB = {
+    "gitleaks": 0.5,
+    "trufflehog": 1.0,
+    "noseyparker": 0.2
+}
+
+# Returns the KB used by the files under path, not following symlinks
+def directory_size_kb(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total // 1024
+
+# Least squares fit of value = intercept + slope * size, both at least 0. Falls back to a
+# line through the origin when the sizes don't vary, and returns None without points.
+def _fit(points):
+    if not points:
+        return None
+    n = len(points)
+    mean_size = sum(size for size, _ in points) / n
+    mean_value = sum(value for _, value in points) / n
+    variance = sum((size - mean_size) ** 2 for size, _ in points)
+    if n >= MIN_FIT_REPOS and variance > 0:
+        slope = max(0.0, sum((size - mean_size) * (value - mean_value) for size, value in points) / variance)
+        intercept = max(0.0, mean_value - slope * mean_size)
+        return intercept, slope
+    total_size = sum(size for size, _ in points)
+    return (0.0, mean_value * n / total_size) if total_size > 0 else (mean_value, 0.0)
+
+# Summary
+# Cost model of the scans, learned from earlier runs. Every scanned repository records
+# its size (from the GitHub API), disk use of the checkout, clone time and download, and
+# the seconds every scanner took. A repository that was scanned before is predicted from
+# its own record, scaled by its size now. Other repositories are predicted from a fit of
+# the recorded repositories against size, or from rough defaults while the history is
+# empty. Used to scan the longest repositories first and to estimate a run.
+# Input:
+#   history_file: JSON file of the records, kept between runs
+class ScanCostModel:
+    def __init__(self, history_file):
+        self.history_file = history_file
+        self._lock = threading.Lock()
+        self._repos = {}
+        self._fits = None
+        if history_file and os.path.exists(history_file):
+            try:
+                with open(history_file, 'r') as f:
+                    data = json.load(f)
+                if data.get("version") == SCAN_HISTORY_VERSION:
+                    self._repos = data.get("repos", {})
+            except (OSError, ValueError):
+                self._repos = {}
+
+    def known_repos(self):
+        return len(self._repos)
+
+    # Summary
+    # Records the costs of one scanned repository. Values that are None (for example the
+    # clone of a checkout that already existed, or the scanners of an --incremental scan
+    # that only saw new commits) keep their earlier record.
+    # Input:
+    #   tool_seconds: dict of tool to the seconds of its scan of the whole history
+    def record_repo(self, owner, repo_name, size_kb, disk_kb=None, clone_seconds=None, clone_kb=None, tool_seconds=None):
+        with self._lock:
+            record = self._repos.setdefault(f"{owner}/{repo_name}", {"tool_seconds": {}})
+            record["size_kb"] = size_kb
+            for name, value in [("disk_kb", disk_kb), ("clone_seconds", clone_seconds), ("clone_kb", clone_kb)]:
+                if value is not None:
+                    record[name] = round(value, 3)
+            for tool, seconds in (tool_seconds or {}).items():
+                record["tool_seconds"][tool] = round(seconds, 3)
+            record["recorded_at"] = datetime.now().isoformat()
+            self._fits = None
+
+    def save(self):
+        if not self.history_file:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.history_file) or ".", exist_ok=True)
+            temp_file = f"{self.history_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump({"version": SCAN_HISTORY_VERSION, "repos": self._repos}, f, indent=2, sort_keys=True)
+            os.replace(temp_file, self.history_file)
+
+    # Fits of every cost against the size of the recorded repositories
+    def _get_fits(self):
+        with self._lock:
+            if self._fits is None:
+                points = {}
+                for record in self._repos.values():
+                    size_kb = record.get("size_kb")
+                    if size_kb is None:
+                        continue
+                    for name in ["disk_kb", "clone_seconds", "clone_kb"]:
+                        if record.get(name) is not None:
+                            points.setdefault(name, []).append((size_kb, record[name]))
+                    for tool, seconds in record.get("tool_seconds", {}).items():
+                        points.setdefault(tool, []).append((size_kb, seconds))
+                self._fits = {name: _fit(name_points) for name, name_points in points.items()}
+            return self._fits
+
+    def _predict(self, name, record, size_kb, default):
+        recorded = record.get("tool_seconds", {}).get(name) if name in DEFAULT_TOOL_SECONDS_PER_MB else record.get(name)
+        if recorded is not None:
+            recorded_size = record.get("size_kb") or 0
+            return recorded * size_kb / recorded_size if recorded_size > 0 and size_kb > 0 else recorded
+        fit = self._get_fits().get(name)
+        if fit is not None:
+            return fit[0] + fit[1] * size_kb
+        return default
+
+    # Summary
+    # Predicted costs of scanning one repository with the tools
+    # Input:
+    #   size_kb: size of the repository from the GitHub API
+    #   on_disk: True if the checkout exists already, so it is not cloned again
+    # Output:
+    #   dict of clone_seconds, clone_kb, disk_kb, tool_seconds (dict per tool) and seconds. The
+    #   scanners of a repository run at the same time, so seconds is the clone plus the slowest tool.
+    def estimate_repo(self, owner, repo_name, size_kb, tools, on_disk=False):
+        size_kb = size_kb or 0
+        record = self._repos.get(f"{owner}/{repo_name}", {})
+        tool_seconds = {tool: self._predict(tool, record, size_kb, DEFAULT_TOOL_STARTUP_SECONDS + DEFAULT_TOOL_SECONDS_PER_MB[tool] * size_kb / 1024)
+                        for tool in tools}
+        clone_kb = 0 if on_disk else self._predict("clone_kb", record, size_kb, DEFAULT_CLONE_KB_PER_SIZE_KB * size_kb)
+        clone_seconds = 0 if on_disk else self._predict("clone_seconds", record, size_kb, clone_kb / DEFAULT_CLONE_KB_PER_SECOND)
+        return {
+            "clone_seconds": clone_seconds,
+            "clone_kb": clone_kb,
+            "disk_kb": self._predict("disk_kb", record, size_kb, DEFAULT_DISK_KB_PER_SIZE_KB * size_kb),
+            "tool_seconds": tool_seconds,
+            "seconds": clone_seconds + max(tool_seconds.values(), default=0)
+        }
+
+    # Returns the repos (dicts of the GitHub API) of the owner with the longest predicted scan first.
+    # repo_name_of(repo) returns the name of the checkout of a repo.
+    def longest_first(self, owner, repos, tools, repo_name_of):
+        estimates = [self.estimate_repo(owner, repo_name_of(repo), repo.get("size"), tools)["seconds"] for repo in repos]
+        order = sorted(range(len(repos)), key=lambda index: -estimates[index])
+        return [repos[index] for index in order]
+
+    # Summary
+    # Estimates a run over repositories that are scanned in the given order, owner by owner,
+    # jobs repositories at a time, each one on the first worker that is free.
+    # Input:
+    #   repos_by_owner: dict of owner to a list of (repo_name, size_kb, on_disk) in scan order
+    # Output:
+    #   dict of wall_seconds, tool_seconds (summed per tool), clone_kb, disk_kb, disk_kb_on_disk,
+    #   repos, known_repos, and longest (the 5 longest repos as (owner/repo, seconds))
+    def estimate_run(self, repos_by_owner, tools, jobs):
+        estimate = {"wall_seconds": 0.0, "tool_seconds": {tool: 0.0 for tool in tools}, "clone_kb": 0.0, "disk_kb": 0.0,
+                    "disk_kb_on_disk": 0.0, "repos": 0, "known_repos": 0}
+        durations = []
+        for owner, repos in repos_by_owner.items():
+            workers = [0.0] * max(1, jobs)
+            for repo_name, size_kb, on_disk in repos:
+                repo_estimate = self.estimate_repo(owner, repo_name, size_kb, tools, on_disk)
+                start = heapq.heappop(workers)
+                heapq.heappush(workers, start + repo_estimate["seconds"])
+                for tool, seconds in repo_estimate["tool_seconds"].items():
+                    estimate["tool_seconds"][tool] += seconds
+                estimate["clone_kb"] += repo_estimate["clone_kb"]
+                estimate["disk_kb" if not on_disk else "disk_kb_on_disk"] += repo_estimate["disk_kb"]
+                estimate["repos"] += 1
+                estimate["known_repos"] += f"{owner}/{repo_name}" in self._repos
+                durations.append((f"{owner}/{repo_name}", repo_estimate["seconds"]))
+            estimate["wall_seconds"] += max(workers)
+        estimate["longest"] = sorted(durations, key=lambda duration: -duration[1])[:5]
+        return estimate
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from utils.tracing import span
+
+# Base URL of the GitHub REST API. Set GITHUB_API_URL for GitHub Enterprise Server.
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+# Start spacing requests out once fewer than this many remain in the rate limit window
+RATE_LIMIT_PACE_THRESHOLD = 100
+
+# GitHub asks to wait at least a minute after a secondary rate limit without Retry-After
+SECONDARY_RATE_LIMIT_WAIT_SECONDS = 60
+
+MAX_SERVER_ERROR_BACKOFF_SECONDS = 60
+
+# Summary
+# Shared transport for every GitHub REST call of a run. One requests.Session pools and
+# reuses connections across the scan, inventory and GHAS phases. Requests are paced from
+# the X-RateLimit-Remaining/X-RateLimit-Reset headers, so the remaining requests are
+# spread evenly until the window resets instead of failing halfway through a big run.
+# Primary and secondary rate limits (403/429) wait for Retry-After or the reset time and
+# are retried, and 5xx responses are retried with exponential backoff.
+# Input:
+#   headers: headers sent with every request (token, API version, accept)
+#   http_cache (optional): utils.http_cache.HttpCache to serve unchanged responses from
+#   pool_size (optional): connections kept open to the API, at least the number of concurrent callers
+#   max_retries (optional): retries of one request after rate limits or server errors
+class GitHubClient:
+    def __init__(self, headers, http_cache=None, pool_size=16, max_retries=5):
+        self.headers = headers
+        self.http_cache = http_cache
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._next_request_at = 0
+        self.rate_limit = None
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "rate_limit_wait_seconds": 0.0}
+
+    # Same as requests.get(url, headers=headers) with the client's headers, served from
+    # the cache when possible. Traced as a github_api_request span, waits and retries included.
+    def get(self, url):
+        with span("github_api_request", "api", url=url):
+            if self.http_cache:
+                return self.http_cache.get(url, self.headers, self._send)
+            return self._send(url, headers=self.headers)
+
+    def _update_rate_limit(self, response):
+        with self._lock:
+            if 'X-RateLimit-Remaining' in response.headers:
+                self.rate_limit_remaining = int(response.headers['X-RateLimit-Remaining'])
+            if 'X-RateLimit-Limit' in response.headers:
+                self.rate_limit = int(response.headers['X-RateLimit-Limit'])
+            if 'X-RateLimit-Reset' in response.headers:
+                self.rate_limit_reset = int(response.headers['X-RateLimit-Reset'])
+
+    def _wait(self, seconds, reason, rate_limited=True):
+        if seconds <= 0:
+            return
+        print(f"GitHub API: {reason}, waiting {seconds:.0f} seconds...")
+        if rate_limited:
+            with self._lock:
+                self.stats["rate_limit_wait_seconds"] += seconds
+        time.sleep(seconds)
+
+    # Reserves the next request slot. Once the remaining requests run low, slots are
+    # spaced so the rest of the window lasts until the reset time.
+    def _pace(self):
+        with self._lock:
+            now = time.time()
+            interval = 0
+            if self.rate_limit_remaining is not None and self.rate_limit_reset is not None \
+                    and self.rate_limit_remaining < RATE_LIMIT_PACE_THRESHOLD:
+                interval = max(0, self.rate_limit_reset - now) / max(1, self.rate_limit_remaining)
+            slot = max(now, self._next_request_at)
+            self._next_request_at = slot + interval
+            delay = slot - now
+        if delay > 0:
+            with self._lock:
+                self.stats["rate_limit_wait_seconds"] += delay
+            time.sleep(delay)
+
+    # Returns the seconds to wait before retrying a rate limited response, or None if the
+    # response is not a rate limit (for example a 403 for a missing permission)
+    def _rate_limit_wait(self, response):
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            return int(retry_after)
+        if response.headers.get('X-RateLimit-Remaining') == '0' and response.headers.get('X-RateLimit-Reset'):
+            return max(1, int(response.headers['X-RateLimit-Reset']) - int(time.time()))
+        try:
+            message = response.json().get('message', '')
+        except (ValueError, AttributeError):
+            message = ''
+        if 'rate limit' in message.lower():
+            return SECONDARY_RATE_LIMIT_WAIT_SECONDS
+        if response.status_code == 429:
+            return SECONDARY_RATE_LIMIT_WAIT_SECONDS
+        return None
+
+    def _send(self, url, headers=None):
+        attempt = 0
+        while True:
+            self._pace()
+            response = self.session.get(url, headers=headers)
+            with self._lock:
+                self.stats["requests"] += 1
+            self._update_rate_limit(response)
+
+            if attempt >= self.max_retries:
+                return response
+
+            wait_seconds = self._rate_limit_wait(response)
+            if wait_seconds is not None:
+                with self._lock:
+                    self.stats["rate_limited"] += 1
+                    self.stats["retries"] += 1
+                self._wait(wait_seconds, f"rate limited on {url}")
+            elif response.status_code >= 500:
+                with self._lock:
+                    self.stats["retries"] += 1
+                self._wait(min(MAX_SERVER_ERROR_BACKOFF_SECONDS, 2 ** attempt), f"server error {response.status_code} on {url}", rate_limited=False)
+            else:
+                return response
+            attempt += 1
+
+    # Rate limit use of the run, for the metrics table of the report
+    def summary(self):
+        summary = {
+            "GitHub API Requests": self.stats["requests"],
+            "GitHub API Retries": self.stats["retries"],
+            "GitHub API Rate Limited Responses": self.stats["rate_limited"],
+            "GitHub API Rate Limit Wait (seconds)": round(self.stats["rate_limit_wait_seconds"], 2),
+            "GitHub API Rate Limit Remaining": f"{self.rate_limit_remaining} of {self.rate_limit}" if self.rate_limit is not None else "unknown"
+        }
+        if self.http_cache:
+            summary["GitHub API Responses from Cache"] = self.http_cache.stats["hits"] + self.http_cache.stats["not_modified"]
+        return summary
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+# Response headers kept with a cached body
+CACHED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified', 'Link']
+
+# GHAS secret scanning alerts hold the secrets in plain text
+SECRET_ALERTS_PATH = "/secret-scanning/alerts"
+
+# Summary
+# On-disk cache for GitHub REST GET calls, keyed by URL (and token, since what a token
+# can see differs). Every entry keeps the ETag/Last-Modified validators and the body.
+# Within ttl_seconds of the last fetch an entry is served without calling the API. After
+# that the request is sent with If-None-Match/If-Modified-Since, and a 304 Not Modified,
+# which GitHub does not count against the rate limit, is served from the cache.
+# GHAS secret scanning alerts hold plain text secrets, so they are only cached with
+# cache_secret_alerts, and cache files are only readable by the current user.
+# Input:
+#   cache_dir: directory of the cache files
+#   ttl_seconds: seconds an entry is served without revalidation (0 = always revalidate)
+#   cache_secret_alerts (optional): also cache the responses of the secret scanning alerts
+#     endpoints. Off by default, like secrets are kept out of the reports by default.
+class HttpCache:
+    def __init__(self, cache_dir, ttl_seconds=0, cache_secret_alerts=False):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.cache_secret_alerts = cache_secret_alerts
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "not_modified": 0, "misses": 0}
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        if not cache_secret_alerts:
+            self._remove_secret_alerts()
+
+    # Deletes the secret scanning alerts cached by runs that kept the secrets
+    def _remove_secret_alerts(self):
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            entry = self._load(path) if name.endswith(".json") else None
+            if entry and SECRET_ALERTS_PATH in entry.get('url', ''):
+                os.remove(path)
+
+    def _entry_path(self, url, headers):
+        key = f"{url}\n{(headers or {}).get('Authorization', '')}"
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def _load(self, path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, path, entry):
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, path)
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    # Builds a requests Response from a cache entry, so callers can use .json() and .links as usual
+    def _to_response(self, entry):
+        response = Response()
+        response.url = entry['url']
+        response.status_code = entry['status_code']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = 'utf-8'
+        response._content = entry['body'].encode('utf-8')
+        response.from_cache = True
+        return response
+
+    # Same as requests.get(url, headers=headers), served from the cache when possible.
+    # get_fn (optional) sends the request, for callers that use a session.
+    def get(self, url, headers=None, get_fn=None):
+        get_fn = get_fn or requests.get
+        if not self.cache_secret_alerts and SECRET_ALERTS_PATH in url:
+            return get_fn(url, headers=headers)
+        path = self._entry_path(url, headers)
+        entry = self._load(path)
+
+        if entry and time.time() - entry['fetched_at'] < self.ttl_seconds:
+            self._count("hits")
+            return self._to_response(entry)
+
+        request_headers = dict(headers or {})
+        if entry:
+            if entry['headers'].get('ETag'):
+                request_headers['If-None-Match'] = entry['headers']['ETag']
+            if entry['headers'].get('Last-Modified'):
+                request_headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+
+        response = get_fn(url, headers=request_headers)
+
+        if response.status_code == 304 and entry:
+            self._count("not_modified")
+            entry['fetched_at'] = time.time()
+            self._store(path, entry)
+            return self._to_response(entry)
+
+        self._count("misses")
+        if response.status_code == 200 and (response.headers.get('ETag') or response.headers.get('Last-Modified') or self.ttl_seconds):
+            self._store(path, {
+                'url': url,
+                'status_code': response.status_code,
+                'headers': {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers},
+                'body': response.text,
+                'fetched_at': time.time()
+            })
+        return response
@@ -1,6 +1,24 @@
 import logging
 import os
 
+# Counts the records logged, so the number of errors of a run is known without reading the log file
+class ErrorCountHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+# Returns the number of errors logged to a logger set up with setup_error_logger, or None
+def logged_error_count(logger):
+    if logger is None:
+        return None
+    for handler in logger.handlers:
+        if isinstance(handler, ErrorCountHandler):
+            return handler.count
+    return None
+
 def setup_error_logger(error_logfile):
     # Create a logger
     logger = logging.getLogger('secretsynth-logger')
@@ -21,5 +39,6 @@ def setup_error_logger(error_logfile):
 
     # Add the handler to the logger
     logger.addHandler(handler)
+    logger.addHandler(ErrorCountHandler())
 
     return logger
\ No newline at end of file
@@ -0,0 +1,54 @@
+import json
+import os
+from datetime import datetime
+
+# Summary
+# The repositories of every owner of a run, with the full metadata the GitHub API returns
+# for each of them. It is built once per run and used by both the clone/scan loop and the
+# GHAS alert fetch, and it is saved next to the reports so later stages and reruns
+# (see --inventory-file) don't need to call the API again.
+# Input:
+#   owner_type: "users" or "orgs"
+#   internal_type: True if the repo lists were fetched with type=internal
+class RepoInventory:
+    def __init__(self, owner_type, internal_type=False):
+        self.owner_type = owner_type
+        self.internal_type = internal_type
+        self.fetched_at = datetime.now().isoformat()
+        self._repos_by_owner = {}
+
+    def add_owner(self, owner, repos):
+        self._repos_by_owner[owner] = list(repos or [])
+
+    def has_owner(self, owner):
+        return owner in self._repos_by_owner
+
+    def owners(self):
+        return list(self._repos_by_owner.keys())
+
+    # Returns the repo metadata of the owner, or an empty list if the owner has none
+    def repos(self, owner):
+        return self._repos_by_owner.get(owner, [])
+
+    def total_repos(self):
+        return sum(len(repos) for repos in self._repos_by_owner.values())
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({
+                "owner_type": self.owner_type,
+                "internal_type": self.internal_type,
+                "fetched_at": self.fetched_at,
+                "repos_by_owner": self._repos_by_owner
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        inventory = cls(data["owner_type"], data.get("internal_type", False))
+        inventory.fetched_at = data.get("fetched_at", inventory.fetched_at)
+        for owner, repos in data["repos_by_owner"].items():
+            inventory.add_owner(owner, repos)
+        return inventory
@@ -0,0 +1,171 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.tracing import span
+
+# Tools whose scans the scheduler knows how to place
+SCHEDULED_TOOLS = ["gitleaks", "trufflehog", "noseyparker"]
+
+# Rough resident memory of one running instance of each tool, in MB.
+# Only used to keep concurrent scans within the memory budget.
+TOOL_MEMORY_ESTIMATES_MB = {
+    "gitleaks": 512,
+    "trufflehog": 1024,
+    "noseyparker": 1024
+}
+
+# gitleaks is single-threaded. trufflehog (--concurrency) and noseyparker (--jobs)
+# run their own worker threads, so each instance gets a slice of the CPU budget.
+MULTITHREADED_TOOLS = ["trufflehog", "noseyparker"]
+
+
+def _read_first_line(path):
+    try:
+        with open(path, 'r') as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+# Returns the number of CPUs this process may use, honoring the cgroup CPU quota
+# (v2 cpu.max or v1 cpu.cfs_quota_us) and the CPU affinity mask.
+# cgroup_root is where the cgroup filesystem is mounted.
+def get_cpu_limit(cgroup_root="/sys/fs/cgroup"):
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    cpu_max = _read_first_line(os.path.join(cgroup_root, "cpu.max"))
+    if cpu_max:
+        limit, period = cpu_max.split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    else:
+        limit = _read_first_line(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+        period = _read_first_line(os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+        if limit and period and int(limit) > 0:
+            quota = int(limit) / int(period)
+
+    if quota is not None:
+        cpus = min(cpus, max(1, int(quota)))
+    return cpus
+
+# Returns the memory available to this process in MB, honoring the cgroup memory limit
+# (v2 memory.max or v1 memory.limit_in_bytes). Falls back to physical memory.
+# cgroup_root is where the cgroup filesystem is mounted.
+def get_memory_limit_mb(cgroup_root="/sys/fs/cgroup"):
+    physical_mb = None
+    if hasattr(os, 'sysconf'):
+        try:
+            physical_mb = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+        except (ValueError, OSError):
+            physical_mb = None
+
+    limit = _read_first_line(os.path.join(cgroup_root, "memory.max"))
+    if limit is None:
+        limit = _read_first_line(os.path.join(cgroup_root, "memory", "memory.limit_in_bytes"))
+
+    if limit and limit != "max":
+        limit_mb = int(limit) // (1024 * 1024)
+        # cgroup v1 reports a huge number when there is no limit
+        if physical_mb is None or limit_mb < physical_mb:
+            return limit_mb
+    return physical_mb
+
+# Summary
+# Places the scanner runs of every repository on the machine. Each tool has its own
+# concurrency limit and thread budget, and a scan only starts when its tool has a free
+# slot and the CPU and memory it needs fit in the budgets. This lets the three scanners
+# of one repository run at the same time when there is capacity, without oversubscribing
+# the host when many repositories are in flight (see --jobs).
+# Input:
+#   cpu_budget: number of CPUs to use, defaults to get_cpu_limit()
+#   memory_budget_mb: memory to use in MB, defaults to get_memory_limit_mb()
+#   concurrency: dict of tool name to max concurrent scans of that tool (None or missing = automatic)
+#   threads: dict of tool name to threads given to each scan of a multithreaded tool (None or missing = automatic)
+class ScanScheduler:
+    def __init__(self, cpu_budget=None, memory_budget_mb=None, concurrency=None, threads=None):
+        self.cpu_budget = cpu_budget or get_cpu_limit()
+        self.memory_budget_mb = memory_budget_mb or get_memory_limit_mb()
+        concurrency = concurrency or {}
+        threads = threads or {}
+
+        self.threads = {}
+        self.concurrency = {}
+        for tool in SCHEDULED_TOOLS:
+            if tool in MULTITHREADED_TOOLS:
+                # By default two instances share the CPUs, so one slow repository
+                # does not hold up the rest
+                self.threads[tool] = threads.get(tool) or max(1, self.cpu_budget // 2)
+            else:
+                self.threads[tool] = 1
+
+            limit = concurrency.get(tool) or max(1, self.cpu_budget // self.threads[tool])
+            if self.memory_budget_mb:
+                limit = min(limit, max(1, self.memory_budget_mb // TOOL_MEMORY_ESTIMATES_MB[tool]))
+            self.concurrency[tool] = limit
+
+        self._condition = threading.Condition()
+        self._running = {tool: 0 for tool in SCHEDULED_TOOLS}
+        self._cpu_in_use = 0
+        self._memory_in_use_mb = 0
+        # One pool per tool, sized to its concurrency limit, so scans of one tool waiting
+        # for a slot never hold the threads another tool with free slots could use
+        self._executors = {tool: ThreadPoolExecutor(max_workers=self.concurrency[tool]) for tool in SCHEDULED_TOOLS}
+
+    def describe(self):
+        limits = ", ".join(f"{tool}={self.concurrency[tool]}x{self.threads[tool]} threads" for tool in SCHEDULED_TOOLS)
+        return f"cpu_budget={self.cpu_budget}, memory_budget_mb={self.memory_budget_mb}, {limits}"
+
+    def threads_for(self, tool):
+        return self.threads[tool]
+
+    def _fits(self, tool):
+        if self._running[tool] >= self.concurrency[tool]:
+            return False
+        # A scan always starts on an idle machine, even if it asks for more than the budget
+        if self._cpu_in_use == 0:
+            return True
+        if self._cpu_in_use + self.threads[tool] > self.cpu_budget:
+            return False
+        if self.memory_budget_mb and self._memory_in_use_mb + TOOL_MEMORY_ESTIMATES_MB[tool] > self.memory_budget_mb:
+            return False
+        return True
+
+    def _acquire(self, tool):
+        with self._condition:
+            self._condition.wait_for(lambda: self._fits(tool))
+            self._running[tool] += 1
+            self._cpu_in_use += self.threads[tool]
+            self._memory_in_use_mb += TOOL_MEMORY_ESTIMATES_MB[tool]
+
+    def _release(self, tool):
+        with self._condition:
+            self._running[tool] -= 1
+            self._cpu_in_use -= self.threads[tool]
+            self._memory_in_use_mb -= TOOL_MEMORY_ESTIMATES_MB[tool]
+            self._condition.notify_all()
+
+    # Runs fn(*args) once the tool has capacity, in a tracing span named after the tool
+    # with span_args as its args. Returns a tuple of the seconds spent running, not
+    # counting the time spent waiting for a slot, and the result of fn.
+    def run(self, tool, fn, *args, span_args=None):
+        self._acquire(tool)
+        try:
+            with span(tool, "scanner", **(span_args or {})) as tool_span:
+                result = fn(*args)
+            return tool_span.seconds, result
+        finally:
+            self._release(tool)
+
+    # Runs a list of (tool, fn, args) scans at the same time, as capacity allows,
+    # and waits for all of them. Returns a dict of tool name to (seconds spent running, result).
+    # span_args (optional) are the args of the tracing spans of the scans, e.g. the owner and repo
+    def run_tools(self, tool_tasks, span_args=None):
+        futures = {tool: self._executors[tool].submit(self.run, tool, fn, *args, span_args=span_args) for tool, fn, args in tool_tasks}
+        return {tool: future.result() for tool, future in futures.items()}
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
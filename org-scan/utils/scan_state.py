@@ -0,0 +1,119 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime
+
+csv.field_size_limit(sys.maxsize)
+
+# Returns the commit checked out in repo_path, or None if it cannot be resolved
+def get_head_commit(repo_path):
+    result = subprocess.run(["git", "-C", repo_path, "rev-parse", "HEAD"], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+# Returns True if commit is present in the repository at repo_path. A commit from an
+# earlier run can disappear after a force push or when the clone is shallow.
+def commit_exists(repo_path, commit):
+    result = subprocess.run(["git", "-C", repo_path, "cat-file", "-e", f"{commit}^{{commit}}"], capture_output=True, text=True)
+    return result.returncode == 0
+
+# Summary
+# Scan state that is kept between runs for --incremental scans. For every owner/repo and
+# tool it records the last commit the tool scanned, so a tool that earlier runs skipped
+# scans the full history, and it keeps the findings of every earlier scan per tool, so a
+# scan of only the new commits can be merged back into a complete report.
+# Layout of state_dir:
+#   scan_state.json                           {"owner/repo": {"<tool>": {"last_scanned_commit": ..., "scanned_at": ...}}}
+#   findings/<owner>/<repo>/<tool>.csv        all findings of the tool for the repo so far
+#   findings/<owner>/<repo>/<tool>.new.csv    findings of the current scan, before merging
+class ScanState:
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.state_file = os.path.join(state_dir, "scan_state.json")
+        self._lock = threading.Lock()
+        self._state = {}
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r') as f:
+                self._state = json.load(f)
+
+    # Returns the last commit of the repo the tool scanned, or None if the tool never scanned it
+    def last_scanned_commit(self, owner, repo_name, tool):
+        with self._lock:
+            tool_state = self._state.get(f"{owner}/{repo_name}", {}).get(tool)
+            return tool_state.get("last_scanned_commit") if isinstance(tool_state, dict) else None
+
+    # Records the commit for every tool in tools and writes the state file right away, so
+    # an interrupted run keeps the repos that were already scanned
+    def record_scanned_commit(self, owner, repo_name, tools, commit):
+        with self._lock:
+            repo_state = self._state.setdefault(f"{owner}/{repo_name}", {})
+            # Older state files have one commit for all tools, these tools scan the full history again
+            repo_state.pop("last_scanned_commit", None)
+            repo_state.pop("scanned_at", None)
+            for tool in tools:
+                repo_state[tool] = {
+                    "last_scanned_commit": commit,
+                    "scanned_at": datetime.now().isoformat()
+                }
+            os.makedirs(self.state_dir, exist_ok=True)
+            temp_file = f"{self.state_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(self._state, f, indent=2, sort_keys=True)
+            os.replace(temp_file, self.state_file)
+
+    def findings_file(self, owner, repo_name, tool):
+        findings_dir = os.path.join(self.state_dir, "findings", owner, repo_name)
+        os.makedirs(findings_dir, exist_ok=True)
+        return os.path.join(findings_dir, f"{tool}.csv")
+
+    # Returns an empty file for the findings of the current scan of the tool
+    def new_findings_file(self, owner, repo_name, tool):
+        new_file = self.findings_file(owner, repo_name, f"{tool}.new")
+        if os.path.exists(new_file):
+            os.remove(new_file)
+        return new_file
+
+    # Appends the rows of new_file that are not stored yet to the stored findings of the tool.
+    # Rows are identified by key_column when the files have a header row, or by the whole
+    # row when they do not. Returns the path of the stored findings file.
+    def merge_findings(self, owner, repo_name, tool, new_file, has_header=True, key_column=None):
+        stored_file = self.findings_file(owner, repo_name, tool)
+        if not os.path.exists(new_file) or os.stat(new_file).st_size == 0:
+            return stored_file
+
+        def row_key(row, fieldnames):
+            if key_column and fieldnames and key_column in fieldnames:
+                return row[fieldnames.index(key_column)]
+            return tuple(row)
+
+        stored_keys = set()
+        stored_fieldnames = None
+        if os.path.exists(stored_file) and os.stat(stored_file).st_size > 0:
+            with open(stored_file, 'r', newline='') as f:
+                reader = csv.reader(f)
+                if has_header:
+                    stored_fieldnames = next(reader, None)
+                for row in reader:
+                    stored_keys.add(row_key(row, stored_fieldnames))
+
+        with open(new_file, 'r', newline='') as f_in, open(stored_file, 'a', newline='') as f_out:
+            reader = csv.reader(f_in)
+            writer = csv.writer(f_out)
+            new_fieldnames = next(reader, None) if has_header else None
+            if has_header and new_fieldnames and stored_fieldnames is None:
+                writer.writerow(new_fieldnames)
+                stored_fieldnames = new_fieldnames
+            for row in reader:
+                if has_header and new_fieldnames != stored_fieldnames:
+                    # Put the columns in the stored order in case the tool changed its output
+                    row = [dict(zip(new_fieldnames, row)).get(name, '') for name in stored_fieldnames]
+                key = row_key(row, stored_fieldnames)
+                if key not in stored_keys:
+                    stored_keys.add(key)
+                    writer.writerow(row)
+
+        return stored_file
@@ -0,0 +1,235 @@
+import contextlib
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+import pandas as pd
+
+# Columns of the per-repo timing CSV, see Tracer.write_repo_timing_csv
+REPO_TIMING_COLUMNS = ['owner', 'repo', 'repo_seconds', 'clone_seconds', 'gitleaks_seconds', 'trufflehog_seconds',
+                       'noseyparker_seconds', 'child_cpu_seconds', 'peak_child_rss_mb']
+
+# Spans of these categories are about one repository and carry its owner and repo as args
+REPO_SPAN_CATEGORIES = ['repo', 'clone', 'scanner']
+
+# ru_maxrss is in KB on Linux and in bytes on macOS
+def _rss_mb(maxrss):
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+# Peak resident memory of this process in MB
+def peak_rss_mb():
+    return _rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+def _format_seconds(seconds):
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours)} hours {int(minutes)} minutes {seconds:.2f} seconds"
+
+# One timed section of the run. child_cpu_seconds and child_peak_rss_kb are the user and
+# system CPU time and the largest peak memory of the child processes waited for in the span.
+# On Linux the peak memory of a child is at least the memory of this process when it was started.
+class Span:
+    def __init__(self, name, category, args, thread_id, start):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.thread_id = thread_id
+        self.start = start
+        self.end = None
+        self.child_cpu_seconds = 0.0
+        self.child_peak_rss_kb = 0
+
+    @property
+    def seconds(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+# Summary
+# Records spans of the phases of a run (fetching repos, cloning, every scanner of every
+# repo, merging, matching, metrics, the HTML report...). Spans are opened with span() in
+# any thread, and the resources of the child processes a span waits for are added to the
+# innermost open span of the waiting thread (see TracedPopen). The spans are written as a
+# Chrome trace (chrome://tracing, https://ui.perfetto.dev) and a per-repo timing CSV, and
+# summed into the timing table of the HTML report.
+class Tracer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    # Context manager that records a span around its block, yields the Span
+    @contextlib.contextmanager
+    def span(self, name, category='phase', **args):
+        span = Span(name, category, args, threading.get_ident(), time.perf_counter())
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter()
+            stack.pop()
+            with self._lock:
+                self.spans.append(span)
+
+    # Adds the resource usage of a child process (from os.wait4) to the innermost open span of this thread
+    def record_child_rusage(self, rusage):
+        stack = self._stack()
+        if not stack:
+            return
+        span = stack[-1]
+        span.child_cpu_seconds += rusage.ru_utime + rusage.ru_stime
+        span.child_peak_rss_kb = max(span.child_peak_rss_kb, rusage.ru_maxrss)
+
+    def finished_spans(self, name=None, category=None):
+        with self._lock:
+            spans = list(self.spans)
+        return [span for span in spans if (name is None or span.name == name) and (category is None or span.category == category)]
+
+    # Seconds of all finished spans of a name, summed
+    def total_seconds(self, name):
+        return sum(span.seconds for span in self.finished_spans(name))
+
+    # Summary
+    # Timing table of the HTML report, one row per span name in the order the names were
+    # first seen. Time is summed over the spans, so spans that run in parallel (--jobs) can
+    # add up to more than the wall clock time, which only counts the time at least one span
+    # of the name was running.
+    # Input:
+    #   exclude_categories (optional): categories of spans to leave out
+    # Output:
+    #   DataFrame of Phase, Spans, Time, Wall Clock Time, Child CPU (seconds), Peak Child RSS (MB)
+    def timing_table(self, exclude_categories=()):
+        rows = {}
+        intervals = {}
+        for span in sorted(self.finished_spans(), key=lambda span: span.start):
+            if span.category in exclude_categories:
+                continue
+            row = rows.setdefault(span.name, {'Phase': span.name, 'Spans': 0, 'seconds': 0.0, 'Child CPU (seconds)': 0.0, 'peak_kb': 0})
+            row['Spans'] += 1
+            row['seconds'] += span.seconds
+            row['Child CPU (seconds)'] += span.child_cpu_seconds
+            row['peak_kb'] = max(row['peak_kb'], span.child_peak_rss_kb)
+            intervals.setdefault(span.name, []).append((span.start, span.end))
+
+        table = []
+        for name, row in rows.items():
+            wall_seconds = 0.0
+            covered_until = None
+            for start, end in intervals[name]:
+                if covered_until is None or start > covered_until:
+                    wall_seconds += end - start
+                    covered_until = end
+                elif end > covered_until:
+                    wall_seconds += end - covered_until
+                    covered_until = end
+            table.append({'Phase': name, 'Spans': row['Spans'], 'Time': _format_seconds(row['seconds']),
+                          'Wall Clock Time': _format_seconds(wall_seconds),
+                          'Child CPU (seconds)': round(row['Child CPU (seconds)'], 2),
+                          'Peak Child RSS (MB)': round(_rss_mb(row['peak_kb']), 1)})
+        return pd.DataFrame(table, columns=['Phase', 'Spans', 'Time', 'Wall Clock Time', 'Child CPU (seconds)', 'Peak Child RSS (MB)'])
+
+    # Writes the finished spans as a Chrome trace event JSON file
+    def write_chrome_trace(self, path):
+        pid = os.getpid()
+        thread_numbers = {}
+        events = []
+        for span in sorted(self.finished_spans(), key=lambda span: span.start):
+            tid = thread_numbers.setdefault(span.thread_id, len(thread_numbers) + 1)
+            args = dict(span.args)
+            if span.child_cpu_seconds or span.child_peak_rss_kb:
+                args['child_cpu_seconds'] = round(span.child_cpu_seconds, 3)
+                args['peak_child_rss_mb'] = round(_rss_mb(span.child_peak_rss_kb), 1)
+            events.append({'name': span.name, 'cat': span.category, 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': round((span.start - self.start) * 1e6, 1), 'dur': round(span.seconds * 1e6, 1), 'args': args})
+        events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': 'secretsynth'}})
+        events += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': f"thread {tid}"}}
+                   for tid in thread_numbers.values()]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'peak_rss_mb': round(peak_rss_mb(), 1)}}, f)
+
+    # Writes the seconds spent on every repository (REPO_TIMING_COLUMNS) as a CSV file
+    def write_repo_timing_csv(self, path):
+        repos = {}
+        for span in self.finished_spans():
+            if span.category not in REPO_SPAN_CATEGORIES:
+                continue
+            key = (span.args.get('owner'), span.args.get('repo'))
+            row = repos.setdefault(key, dict({column: 0.0 for column in REPO_TIMING_COLUMNS}, owner=key[0], repo=key[1]))
+            column = f"{span.name}_seconds"
+            if column in row:
+                row[column] += span.seconds
+            if span.category != 'repo':
+                row['child_cpu_seconds'] += span.child_cpu_seconds
+                row['peak_child_rss_mb'] = max(row['peak_child_rss_mb'], _rss_mb(span.child_peak_rss_kb))
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPO_TIMING_COLUMNS, lineterminator='\n')
+            writer.writeheader()
+            for key in sorted(repos, key=lambda key: (str(key[0]), str(key[1]))):
+                writer.writerow({column: round(value, 3) if isinstance(value, float) else value for column, value in repos[key].items()})
+
+# The tracer of the run
+TRACER = Tracer()
+
+def span(name, category='phase', **args):
+    return TRACER.span(name, category, **args)
+
+# Return code of a wait status, the way subprocess.Popen sets it (negative signal number
+# if the child was killed by a signal)
+def _returncode(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+# Summary
+# subprocess.Popen whose wait() reaps the child with os.wait4 where it is available, and adds
+# the child's CPU time and peak memory to the innermost open span of the waiting thread.
+# Only the public wait() is overridden: once returncode is set, Popen.wait() returns it
+# without waiting again. communicate() and the with block wait through wait(). A child
+# reaped by poll() first is not traced, since poll() has no rusage.
+class TracedPopen(subprocess.Popen):
+    def wait(self, timeout=None):
+        if self.returncode is None and hasattr(os, 'wait4'):
+            self._wait4(timeout)
+        return super().wait(timeout)
+
+    def _wait4(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.0005
+        while True:
+            try:
+                pid, status, rusage = os.wait4(self.pid, 0 if deadline is None else os.WNOHANG)
+            except ChildProcessError:
+                # Reaped elsewhere (SIGCHLD is ignored), like subprocess.Popen handles it
+                self.returncode = 0
+                return
+            if pid == self.pid:
+                TRACER.record_child_rusage(rusage)
+                self.returncode = _returncode(status)
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            delay = min(delay * 2, remaining, 0.05)
+            time.sleep(delay)
+
+# Same as subprocess.run, with the child process traced (see TracedPopen)
+def run_traced(args, check=False, capture_output=False, **kwargs):
+    if capture_output:
+        kwargs['stdout'] = subprocess.PIPE
+        kwargs['stderr'] = subprocess.PIPE
+    with TracedPopen(args, **kwargs) as process:
+        stdout, stderr = process.communicate()
+    if check and process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, args, stdout, stderr)
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)